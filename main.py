@@ -1,12 +1,29 @@
 import logging
 import time
 import sys
+from typing import Dict, List
 
-from src.communication.send_data import send_data
-from src.communication.influxdb import close_influxdb_client
-from src.sensors.bme280sensor import BME280Sensor
-from src.sensors.sds011sensor import SDS011Sensor
-from src.settings import LOOP_TIME, LOOP_ENABLED
+from src.startup import log_startup_report, timed_import
+from src.communication.send_data import close_send_data, load_enabled_sinks, log_sink_results, send_data
+from src.reading import Reading
+from src.rollup import add_to_rollups
+from src.scheduler import Scheduler
+from src.tsdb import close_tsdb, store_reading
+from src.sensors.acquisition import SensorRead, read_concurrently, read_per_bus, read_sequentially
+from src.sensors.registry import close_sensors, create_configured_sensors, create_sensor, load_sensor_configs
+from src.settings import (
+    BME280_READ_TIMEOUT,
+    LOOP_ENABLED,
+    LOOP_TIME,
+    MULTIRATE_ENABLE,
+    ROLLUP_ENABLE,
+    SAMPLING_ENABLE,
+    SDS011_READ_TIMEOUT,
+    SDS011_STREAM_ENABLE,
+    SENSOR_CONCURRENT_READ,
+    SENSORS,
+    TSDB_ENABLE,
+)
 from src.hardware import get_rpi_model
 
 # Configure logging
@@ -16,34 +33,84 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def process_data(sds_sensor, bme_sensor) -> None:
+def process_data(sds_sensor, bme_sensor, configured_sensors=()) -> None:
     try:
-        result = get_weather(sds_sensor, bme_sensor)
-        send_data(result)
+        # The reading is only turned into a dictionary where send_data encodes it for the sinks
+        reading = get_reading(sds_sensor, bme_sensor, configured_sensors)
+        store_reading(reading)
+        sink_results = send_data(reading)
+        log_sink_results(sink_results)
+        for rollup in add_to_rollups(reading):
+            log_sink_results(send_data(rollup))
     except Exception as e:
         logger.error(f"Error in main loop: {e}")
 
 
-def get_weather(sds_sensor, bme_sensor) -> dict:
-    weather = {
-        "timestamp": time.time(),
-    }
-    
-    try:
-        if sds_sensor:
-            air_quality = sds_sensor.get_measurement()
-            weather.update(air_quality)
-    except Exception as e:
-        logger.error(f"Error reading SDS011 sensor: {e}")
+def check_settings() -> None:
+    """
+    Reject setting combinations that would silently run without sensors or without rollups.
+    The multi-rate scheduler and the sampling engine only drive the single SDS011 and BME280.
+    """
+    if SENSORS and MULTIRATE_ENABLE:
+        raise ValueError("MULTIRATE_ENABLE cannot be combined with SENSORS, unset one of them")
+    if SENSORS and SAMPLING_ENABLE:
+        raise ValueError("SAMPLING_ENABLE cannot be combined with SENSORS, unset one of them")
+    # Every one-shot run sees a single reading, so buckets could only be finished from the stored readings
+    if ROLLUP_ENABLE and not LOOP_ENABLED and not TSDB_ENABLE:
+        raise ValueError("ROLLUP_ENABLE needs LOOP_ENABLED or TSDB_ENABLE")
+    if ROLLUP_ENABLE and not TSDB_ENABLE:
+        logger.warning("Rollups are not rebuilt after a restart without TSDB_ENABLE, the open buckets start empty")
 
-    try:
-        if bme_sensor:
-            temperature_humidity_pressure = bme_sensor.get_measurement()
-            weather.update(temperature_humidity_pressure)
-    except Exception as e:
-        logger.error(f"Error reading BME280 sensor: {e}")
 
-    return weather
+def get_weather(sds_sensor, bme_sensor, configured_sensors=()) -> dict:
+    return get_reading(sds_sensor, bme_sensor, configured_sensors).to_dict()
+
+
+def get_reading(sds_sensor, bme_sensor, configured_sensors=()) -> Reading:
+    reading = Reading(timestamp=time.time())
+
+    reads = []
+    if sds_sensor:
+        reads.append(("SDS011", sds_sensor.get_measurement, SDS011_READ_TIMEOUT))
+    if bme_sensor:
+        reads.append(("BME280", bme_sensor.get_measurement, BME280_READ_TIMEOUT))
+
+    if SENSOR_CONCURRENT_READ:
+        measurements = read_concurrently(reads)
+    else:
+        measurements = read_sequentially(reads)
+
+    for name, _read, _timeout in reads:
+        if name in measurements:
+            reading.update(measurements[name])
+
+    if configured_sensors:
+        read_configured_sensors(reading, configured_sensors)
+
+    return reading
+
+
+def read_configured_sensors(reading: Reading, configured_sensors) -> None:
+    """
+    Read the sensors of the SENSORS setting, concurrently per bus.
+    Every measurement is kept under "sensors" by sensor name, and the first sensor
+    of each kind also fills the flat keys used by the existing sinks.
+    """
+    reads_by_bus: Dict[str, List[SensorRead]] = {}
+    for configured in configured_sensors:
+        reads_by_bus.setdefault(configured.bus, []).append(
+            (configured.name, configured.sensor.get_measurement, configured.timeout)
+        )
+    measurements = read_per_bus(reads_by_bus)
+
+    namespaced = {}
+    for configured in configured_sensors:
+        measurement = measurements.get(configured.name)
+        if measurement is None:
+            continue
+        namespaced[configured.name] = measurement
+        reading.update({key: value for key, value in measurement.items() if reading.get(key) is None})
+    reading.update({"sensors": namespaced})
 
 
 if __name__ == "__main__":
@@ -53,30 +120,53 @@ if __name__ == "__main__":
     rpi_info = get_rpi_model()
     logger.info(f"Detected Hardware: {rpi_info['model']} (Family: {rpi_info['family']})")
 
-    # Initialize sensors
-    try:
-        sds_sensor = SDS011Sensor()
-    except Exception as e:
-        logger.error(f"Failed to initialize SDS011Sensor: {e}")
-        sds_sensor = None
+    check_settings()
 
-    try:
-        bme_sensor = BME280Sensor()
-    except Exception as e:
-        logger.error(f"Failed to initialize BME280Sensor: {e}")
-        bme_sensor = None
+    # Initialize sensors, importing only the enabled ones
+    configured_sensors = []
+    if SENSORS:
+        # Any number of sensors from the SENSORS setting instead of the single SDS011 and BME280
+        configured_sensors = create_configured_sensors(load_sensor_configs())
+        sds_sensor = bme_sensor = None
+    else:
+        sds_sensor = create_sensor("SDS011_STREAM" if SDS011_STREAM_ENABLE else "SDS011")
+        bme_sensor = create_sensor("BME280")
+    sensors = (sds_sensor, bme_sensor, *(configured.sensor for configured in configured_sensors))
+
+    # Sample the BME280 at a high rate and report one aggregated record per interval
+    sampling_engine = None
+    if SAMPLING_ENABLE and bme_sensor:
+        sampling_engine = timed_import("src.sampling").SamplingEngine(bme_sensor)
+        sampling_engine.start()
+        bme_sensor = sampling_engine
+
+    load_enabled_sinks()
+    log_startup_report()
 
     if LOOP_ENABLED:
         try:
-            while True:
-                process_data(sds_sensor, bme_sensor)
-                time.sleep((LOOP_TIME * 60 * 60) / 4)  # 15 minutes
+            if MULTIRATE_ENABLE:
+                # Every sensor and every sink on its own interval
+                multirate = timed_import("src.multirate")
+                scheduler = multirate.create_multirate_scheduler({"SDS011": sds_sensor, "BME280": bme_sensor})
+                scheduler.run()
+            else:
+                scheduler = Scheduler((LOOP_TIME * 60 * 60) / 4)  # 15 minutes
+                scheduler.run(lambda: process_data(sds_sensor, bme_sensor, configured_sensors))
         except KeyboardInterrupt:
             logger.info("Stopping Weather Station...")
         finally:
-            close_influxdb_client()
+            if sampling_engine:
+                sampling_engine.stop()
+            close_sensors(*sensors)
+            close_send_data()
+            close_tsdb()
     else:
         try:
-            process_data(sds_sensor, bme_sensor)
+            process_data(sds_sensor, bme_sensor, configured_sensors)
         finally:
-            close_influxdb_client()
+            if sampling_engine:
+                sampling_engine.stop()
+            close_sensors(*sensors)
+            close_send_data()
+            close_tsdb()
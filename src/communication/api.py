@@ -1,6 +1,60 @@
+import gzip
+import threading
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from src.communication.encoding import encode, encode_json, iter_encoded
+from src.communication.gorilla import encode_batch
+from src.reading import ReadingBatch, Readings
+from src.settings import (
+    API_BATCH_ENABLE,
+    API_BATCH_FORMAT,
+    API_CONNECT_TIMEOUT,
+    API_GZIP,
+    API_HEADER_TOKEN,
+    API_HOST,
+    API_METHOD,
+    API_POOL_SIZE,
+    API_READ_TIMEOUT,
+    API_URL_TOKEN,
+)
+
+GORILLA_CONTENT_TYPE = "application/vnd.weather-station.gorilla"
+
+_api_session = None
+_api_session_lock = threading.Lock()
+
+
+def _gzip_json(data) -> bytes:
+    return gzip.compress(encode_json(data))
 
-from src.settings import API_HEADER_TOKEN, API_HOST, API_METHOD, API_URL_TOKEN
+
+def get_api_session():
+    """
+    Helper function to get the shared HTTP session, creating it on first use.
+    Connections are kept alive so DNS, TCP and TLS are not paid on every reading.
+    """
+    global _api_session
+    with _api_session_lock:
+        if _api_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=API_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _api_session = session
+        return _api_session
+
+
+def close_api_session():
+    """
+    Helper function to close the HTTP session if it exists.
+    """
+    global _api_session
+    with _api_session_lock:
+        if _api_session is not None:
+            _api_session.close()
+            _api_session = None
 
 
 class SendDataAPI:
@@ -10,13 +64,38 @@ class SendDataAPI:
     def send(self):
         self._make_request()
 
+    @classmethod
+    def send_batch(cls, readings: Readings):
+        """
+        Send buffered readings as a single JSON array, or a Gorilla compressed batch,
+        when batch mode is enabled, otherwise one request per reading.
+        """
+        if API_BATCH_ENABLE:
+            cls(readings)._make_request()
+        else:
+            for reading in iter_encoded(readings):
+                cls(reading).send()
+
     def _make_request(self):
-        requests.request(
+        headers = self._get_headers()
+        if isinstance(self.data, (list, ReadingBatch)) and API_BATCH_FORMAT == "gorilla":
+            # Already compressed, gzip would not gain much
+            headers["Content-Type"] = GORILLA_CONTENT_TYPE
+            payload = {"data": encode_batch(self.data)}
+        elif API_GZIP:
+            headers["Content-Encoding"] = "gzip"
+            payload = {"data": encode(self.data, "json.gz", _gzip_json)}
+        else:
+            payload = {"data": encode_json(self.data)}
+
+        response = get_api_session().request(
             method=API_METHOD,
             url=self._get_url(),
-            headers=self._get_headers(),
-            json=self.data,
+            headers=headers,
+            timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+            **payload,
         )
+        response.raise_for_status()
 
     @staticmethod
     def _get_headers():
@@ -0,0 +1,121 @@
+"""
+Compact binary encoding of readings for metered links, and the matching decoder for consumers.
+
+Layout of version 1, little endian:
+    B   format version
+    I   presence mask, bit n is set when the field with ID n is in the reading
+    I   null mask, bit n is set when that field is None
+    the values of the present, non-null fields in field ID order, packed with their struct format
+
+Numbers are sent as 32-bit floats (about 7 significant digits), the timestamp as a 64-bit float.
+Only the standard library and the schema registry are used, so consumers need no other dependency.
+"""
+import json
+import struct
+from typing import Any, Dict
+
+from src.communication.schema import EXTRA, FIELDS, FIELDS_BY_ID, FIELDS_BY_NAME
+
+VERSION = 1
+
+_HEADER = struct.Struct("<BII")
+_LENGTH = struct.Struct("<H")
+_VALUES = {field.format: struct.Struct("<" + field.format) for field in FIELDS if field.format not in "sj"}
+
+_ORDERED_FIELDS = tuple(sorted((field for field in FIELDS if field.name != EXTRA), key=lambda field: field.id))
+_EXTRA_FIELD = FIELDS_BY_NAME[EXTRA]
+
+
+def _pack_bytes(value: bytes, formats: list, values: list) -> None:
+    if len(value) > 0xFFFF:
+        raise ValueError(f"Value of {len(value)} bytes is too long for the compact format")
+    formats.append(f"H{len(value)}s")
+    values += (len(value), value)
+
+
+def encode_compact(data: Dict[str, Any]) -> bytes:
+    """
+    Encode one reading in the compact format.
+    Keys outside the schema registry are kept in a JSON object, so nothing is lost.
+    """
+    present = 0
+    null = 0
+    formats = ["<BII"]
+    values: list = [VERSION, 0, 0]
+
+    for field in _ORDERED_FIELDS:
+        if field.name not in data:
+            continue
+        bit = 1 << field.id
+        present |= bit
+        value = data[field.name]
+        if value is None:
+            null |= bit
+        elif field.format == "s":
+            _pack_bytes(str(value).encode("utf-8"), formats, values)
+        elif field.format == "j":
+            _pack_bytes(json.dumps(value, separators=(",", ":")).encode("utf-8"), formats, values)
+        else:
+            formats.append(field.format)
+            values.append(value)
+
+    extra = {key: value for key, value in data.items() if key not in FIELDS_BY_NAME or key == EXTRA}
+    if extra:
+        present |= 1 << _EXTRA_FIELD.id
+        _pack_bytes(json.dumps(extra, separators=(",", ":")).encode("utf-8"), formats, values)
+
+    values[1] = present
+    values[2] = null
+    try:
+        return struct.pack("".join(formats), *values)
+    except struct.error as e:
+        raise ValueError(f"Reading does not match the compact schema: {e}") from e
+
+
+def decode_compact(payload: bytes) -> Dict[str, Any]:
+    """
+    Decode a compact payload back into a reading dictionary.
+    Raises ValueError for an unknown version or field ID, the schema registry has to be updated first.
+    """
+    try:
+        version, present, null = _HEADER.unpack_from(payload)
+    except struct.error as e:
+        raise ValueError(f"Invalid compact payload: {e}") from e
+    if version != VERSION:
+        raise ValueError(f"Unsupported compact payload version {version}")
+
+    data: Dict[str, Any] = {}
+    offset = _HEADER.size
+    try:
+        for field_id in range(present.bit_length()):
+            bit = 1 << field_id
+            if not present & bit:
+                continue
+            field = FIELDS_BY_ID.get(field_id)
+            if field is None:
+                raise ValueError(f"Unknown field ID {field_id} in compact payload")
+            if null & bit:
+                data[field.name] = None
+                continue
+
+            if field.format in "sj":
+                (length,) = _LENGTH.unpack_from(payload, offset)
+                offset += _LENGTH.size
+                raw = bytes(payload[offset:offset + length])
+                if len(raw) != length:
+                    raise ValueError("Truncated compact payload")
+                offset += length
+                value = raw.decode("utf-8") if field.format == "s" else json.loads(raw)
+            else:
+                value_struct = _VALUES[field.format]
+                (value,) = value_struct.unpack_from(payload, offset)
+                offset += value_struct.size
+
+            if field.name == EXTRA:
+                data.update(value)
+            else:
+                data[field.name] = value
+    except struct.error as e:
+        raise ValueError(f"Truncated compact payload: {e}") from e
+
+    return data
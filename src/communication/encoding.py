@@ -0,0 +1,170 @@
+"""
+Wire format encoding shared by the sinks.
+A reading is wrapped once in send_data, and every wire format it is sent in is built at most once
+and handed as the same bytes to every sink that needs it.
+"""
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping
+
+from src.communication.compact import encode_compact
+from src.reading import ReadingBatch
+from src.settings import JSON_BACKEND
+
+logger = logging.getLogger(__name__)
+
+JSON_BACKENDS = ("json", "orjson")
+# Payload formats of the MQTT and SQS sinks
+PAYLOAD_FORMATS = ("json", "compact")
+
+_orjson = None
+_orjson_options = 0
+
+
+def _load_backend(name: str) -> str:
+    """
+    Import the optional JSON backend, falling back to the standard library when it is not installed.
+    """
+    global _orjson, _orjson_options
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"JSON_BACKEND must be one of {', '.join(JSON_BACKENDS)}, got {name!r}")
+    if name == "json":
+        return name
+    try:
+        import orjson
+    except ImportError:
+        logger.warning("orjson is not installed, using the json module")
+        return "json"
+    _orjson = orjson
+    # NumPy floats come from the sampling engine
+    _orjson_options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    return name
+
+
+_backend = _load_backend(JSON_BACKEND)
+
+
+def json_bytes(data: Any) -> bytes:
+    """
+    Encode data as UTF-8 JSON with the configured backend.
+    """
+    if _orjson is not None and _backend == "orjson":
+        return _orjson.dumps(data, option=_orjson_options)
+    return json.dumps(data).encode("utf-8")
+
+
+class EncodedReading(dict):
+    """
+    A reading that caches its encoded wire formats.
+    It behaves as the plain dict it wraps, and changing it drops the cached encodings.
+    """
+
+    __slots__ = ("_encoded", "_lock")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoded: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, fmt: str, encoder: Callable[[Any], Any]) -> Any:
+        """
+        Return the reading in format `fmt`, calling `encoder` only the first time.
+        Sinks running concurrently share one encoding.
+        """
+        with self._lock:
+            value = self._encoded.get(fmt)
+            if value is None:
+                value = self._encoded[fmt] = encoder(self)
+            return value
+
+    def prime(self, fmt: str, value: Any) -> None:
+        """
+        Store an encoding that is already known, such as the JSON stored in the outbox.
+        """
+        with self._lock:
+            self._encoded[fmt] = value
+
+    def _invalidate(self) -> None:
+        with self._lock:
+            self._encoded.clear()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._invalidate()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._invalidate()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._invalidate()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._invalidate()
+        return super().setdefault(key, default)
+
+    def pop(self, key, *args):
+        self._invalidate()
+        return super().pop(key, *args)
+
+    def popitem(self):
+        self._invalidate()
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._invalidate()
+
+    def __reduce__(self):
+        # Pickled and copied as a plain dict, the cache is not worth carrying
+        return dict, (dict(self),)
+
+
+def encode(data: Any, fmt: str, encoder: Callable[[Any], Any]) -> Any:
+    """
+    Encode data in format `fmt`, from the cache when data is an EncodedReading.
+    """
+    if isinstance(data, EncodedReading):
+        return data.encoded(fmt, encoder)
+    return encoder(data)
+
+
+def encode_json(data: Any) -> bytes:
+    """
+    Return data as JSON bytes, encoded once per reading.
+    A list of readings (a batch) is encoded by joining the cached JSON of every reading.
+    """
+    if isinstance(data, list):
+        return b"[" + b",".join(encode_json(reading) for reading in data) + b"]"
+    if isinstance(data, ReadingBatch):
+        return b"[" + b",".join(encode_json(reading) for reading in iter_encoded(data)) + b"]"
+    return encode(data, "json", json_bytes)
+
+
+def iter_encoded(readings: Iterable[Mapping[str, Any]]) -> Iterator[Any]:
+    """
+    Yield the readings of a batch one at a time, each one wrapped with the JSON the batch already knows.
+    Other iterables of readings are yielded as they are.
+    """
+    if not isinstance(readings, ReadingBatch):
+        yield from readings
+        return
+    for index, encoded in enumerate(readings.encoded):
+        reading = EncodedReading(readings.row(index))
+        if encoded is not None:
+            reading.prime("json", encoded)
+        yield reading
+
+
+def encode_payload(data: Any, payload_format: str) -> bytes:
+    """
+    Return a reading as JSON or in the compact binary format of src.communication.compact.
+    """
+    if payload_format == "compact":
+        return encode(data, "compact", encode_compact)
+    if payload_format == "json":
+        return encode_json(data)
+    raise ValueError(f"Payload format must be one of {', '.join(PAYLOAD_FORMATS)}, got {payload_format!r}")
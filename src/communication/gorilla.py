@@ -0,0 +1,323 @@
+"""
+Gorilla compression of reading batches, after "Gorilla: A Fast, Scalable, In-Memory Time Series Database".
+
+Timestamps are delta-of-delta encoded and every measurement is XOR encoded against the previous value
+of the same field, so slowly changing readings take a few bytes each. Values round-trip bit for bit.
+
+Layout of version 1, big endian:
+    3s  magic b"GRL"
+    B   format version
+    I   number of readings
+    a bit stream with, for every reading, the timestamp, the fields of FIELDS in order and the other keys
+
+Every timestamp and field starts with "1" when it holds a float, "00" when the key is missing and "01" when
+it is None. Timestamps are delta-of-delta encoded on their IEEE 754 bit patterns, which grow with the value,
+so float timestamps are kept exactly. The other keys of a reading are sent as JSON, or as a single "1" bit
+when they are the same as in the previous reading.
+"""
+import json
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from src.reading import NUMERIC_FIELDS
+
+MAGIC = b"GRL"
+VERSION = 1
+
+TIMESTAMP = NUMERIC_FIELDS[0]
+FIELDS = NUMERIC_FIELDS[1:]
+
+_HEADER = struct.Struct(">3sBI")
+_INTEGERS_HEADER = struct.Struct(">I")
+_DOUBLE = struct.Struct(">d")
+_UINT64 = struct.Struct(">Q")
+_MASK64 = (1 << 64) - 1
+
+# Delta-of-delta buckets: prefix, number of prefix bits and number of value bits
+_DOD_BUCKETS = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12), (0b11110, 5, 32))
+_DOD_BITS = (7, 9, 12, 32, 64)
+
+
+class BitWriter:
+    """
+    Appends values of any bit width, most significant bit first.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._bits = 0
+        self._count = 0
+
+    def write(self, value: int, width: int) -> None:
+        self._bits = (self._bits << width) | value
+        self._count += width
+        if self._count >= 64:
+            spare = self._count & 7
+            self._buffer += (self._bits >> spare).to_bytes(self._count >> 3, "big")
+            self._bits &= (1 << spare) - 1
+            self._count = spare
+
+    def getvalue(self) -> bytes:
+        padding = -self._count % 8
+        tail = (self._bits << padding).to_bytes((self._count + padding) >> 3, "big")
+        return bytes(self._buffer) + tail
+
+
+class BitReader:
+    """
+    Reads values written by BitWriter, starting at byte `offset`.
+    """
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self._data = data
+        self._position = offset * 8
+
+    def read(self, width: int) -> int:
+        start = self._position >> 3
+        end = (self._position + width + 7) >> 3
+        if end > len(self._data):
+            raise ValueError("Truncated Gorilla batch")
+        chunk = int.from_bytes(self._data[start:end], "big")
+        self._position += width
+        return (chunk >> (end * 8 - self._position)) & ((1 << width) - 1)
+
+
+def _float_bits(value: float) -> int:
+    return _UINT64.unpack(_DOUBLE.pack(value))[0]
+
+
+def _bits_float(bits: int) -> float:
+    return _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+
+def _signed(value: int) -> int:
+    value &= _MASK64
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _write_dod(writer: BitWriter, dod: int) -> None:
+    if dod == 0:
+        writer.write(0, 1)
+        return
+    for prefix, prefix_width, width in _DOD_BUCKETS:
+        # A bucket of n bits holds -(2^(n-1) - 1) to 2^(n-1)
+        if -(1 << (width - 1)) < dod <= 1 << (width - 1):
+            writer.write(prefix, prefix_width)
+            writer.write(dod & ((1 << width) - 1), width)
+            return
+    writer.write(0b11111, 5)
+    writer.write(dod & _MASK64, 64)
+
+
+def _read_dod(reader: BitReader) -> int:
+    prefix = 0
+    while prefix < 5 and reader.read(1):
+        prefix += 1
+    if prefix == 0:
+        return 0
+    width = _DOD_BITS[prefix - 1]
+    value = reader.read(width)
+    return value - (1 << width) if value > 1 << (width - 1) else value
+
+
+class _DeltaEncoder:
+    """
+    Delta-of-delta encoding of a sequence of 64-bit integers.
+    """
+
+    __slots__ = ("previous", "delta")
+
+    def __init__(self):
+        self.previous: Optional[int] = None
+        self.delta = 0
+
+    def write(self, writer: BitWriter, value: int) -> None:
+        if self.previous is None:
+            writer.write(value & _MASK64, 64)
+        else:
+            delta = _signed(value - self.previous)
+            _write_dod(writer, _signed(delta - self.delta))
+            self.delta = delta
+        self.previous = value
+
+    def read(self, reader: BitReader) -> int:
+        if self.previous is None:
+            value = reader.read(64)
+        else:
+            self.delta = _signed(self.delta + _read_dod(reader))
+            value = (self.previous + self.delta) & _MASK64
+        self.previous = value
+        return value
+
+
+class _XorEncoder:
+    """
+    XOR encoding of a sequence of floats against the previous value.
+    """
+
+    __slots__ = ("previous", "leading", "trailing")
+
+    def __init__(self):
+        self.previous: Optional[int] = None
+        self.leading = -1
+        self.trailing = 0
+
+    def write(self, writer: BitWriter, value: float) -> None:
+        bits = _float_bits(value)
+        if self.previous is None:
+            writer.write(bits, 64)
+            self.previous = bits
+            return
+
+        xor = bits ^ self.previous
+        self.previous = bits
+        if xor == 0:
+            writer.write(0, 1)
+            return
+
+        # The leading zero count is sent in 5 bits
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if self.leading >= 0 and leading >= self.leading and trailing >= self.trailing:
+            # The meaningful bits fit in the window of the previous value
+            writer.write(0b10, 2)
+            writer.write(xor >> self.trailing, 64 - self.leading - self.trailing)
+            return
+
+        size = 64 - leading - trailing
+        writer.write(0b11, 2)
+        writer.write(leading, 5)
+        writer.write(size - 1, 6)
+        writer.write(xor >> trailing, size)
+        self.leading = leading
+        self.trailing = trailing
+
+    def read(self, reader: BitReader) -> float:
+        if self.previous is None:
+            self.previous = reader.read(64)
+        elif reader.read(1):
+            if reader.read(1):
+                self.leading = reader.read(5)
+                size = reader.read(6) + 1
+                self.trailing = 64 - self.leading - size
+            else:
+                size = 64 - self.leading - self.trailing
+            self.previous ^= reader.read(size) << self.trailing
+        return _bits_float(self.previous)
+
+
+def _write_presence(writer: BitWriter, data: Dict[str, Any], key: str) -> bool:
+    """
+    Write the state of a key and return True when a float value has to follow.
+    """
+    if key not in data:
+        writer.write(0b00, 2)
+        return False
+    value = data[key]
+    if value is None:
+        writer.write(0b01, 2)
+        return False
+    writer.write(1, 1)
+    return True
+
+
+def encode_batch(readings: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    Compress a batch of readings, oldest first.
+    Timestamps and FIELDS that are not floats are kept with the other keys, so nothing is lost.
+    """
+    readings = list(readings)
+    writer = BitWriter()
+    timestamps = _DeltaEncoder()
+    columns = [_XorEncoder() for _field in FIELDS]
+    columnar = (TIMESTAMP,) + FIELDS
+    previous_rest = None
+
+    for data in readings:
+        # Values that are not floats, like an integer timestamp, go with the other keys
+        floats = {
+            key: data[key] for key in columnar if key in data and (data[key] is None or isinstance(data[key], float))
+        }
+
+        if _write_presence(writer, floats, TIMESTAMP):
+            timestamps.write(writer, _float_bits(floats[TIMESTAMP]))
+        for field, column in zip(FIELDS, columns):
+            if _write_presence(writer, floats, field):
+                column.write(writer, floats[field])
+
+        rest = {key: value for key, value in data.items() if key not in floats}
+        if rest == previous_rest:
+            writer.write(1, 1)
+        else:
+            encoded = json.dumps(rest).encode("utf-8")
+            writer.write(0, 1)
+            writer.write(len(encoded), 32)
+            writer.write(int.from_bytes(encoded, "big"), len(encoded) * 8)
+            previous_rest = rest
+
+    return _HEADER.pack(MAGIC, VERSION, len(readings)) + writer.getvalue()
+
+
+def _read_presence(reader: BitReader) -> Optional[bool]:
+    """
+    Return True when a float follows, False for None and None for a missing key.
+    """
+    if reader.read(1):
+        return True
+    return False if reader.read(1) else None
+
+
+def decode_batch(payload: bytes) -> List[Dict[str, Any]]:
+    """
+    Decompress a batch written by encode_batch.
+    """
+    try:
+        magic, version, count = _HEADER.unpack_from(payload)
+    except struct.error as e:
+        raise ValueError(f"Invalid Gorilla batch: {e}") from e
+    if magic != MAGIC:
+        raise ValueError("Not a Gorilla batch")
+    if version != VERSION:
+        raise ValueError(f"Unsupported Gorilla batch version {version}")
+
+    reader = BitReader(payload, _HEADER.size)
+    timestamps = _DeltaEncoder()
+    columns = [_XorEncoder() for _field in FIELDS]
+    rest: Dict[str, Any] = {}
+    readings = []
+
+    for _index in range(count):
+        data: Dict[str, Any] = {}
+        state = _read_presence(reader)
+        if state is not None:
+            data[TIMESTAMP] = _bits_float(timestamps.read(reader)) if state else None
+        for field, column in zip(FIELDS, columns):
+            state = _read_presence(reader)
+            if state is not None:
+                data[field] = column.read(reader) if state else None
+
+        if not reader.read(1):
+            length = reader.read(32)
+            rest = json.loads(reader.read(length * 8).to_bytes(length, "big"))
+        data.update(rest)
+        readings.append(data)
+
+    return readings
+
+
+def encode_integers(values: Sequence[int]) -> bytes:
+    """
+    Delta-of-delta encode a sequence of integers, such as the increasing ids of outbox readings.
+    """
+    writer = BitWriter()
+    encoder = _DeltaEncoder()
+    for value in values:
+        encoder.write(writer, value)
+    return _INTEGERS_HEADER.pack(len(values)) + writer.getvalue()
+
+
+def decode_integers(payload: bytes) -> List[int]:
+    (count,) = _INTEGERS_HEADER.unpack_from(payload)
+    reader = BitReader(payload, _INTEGERS_HEADER.size)
+    decoder = _DeltaEncoder()
+    return [_signed(decoder.read(reader)) for _index in range(count)]
@@ -1,21 +1,28 @@
 import logging
-import time
+import threading
 import atexit
-from datetime import datetime
-from typing import Dict, List, Optional, Union, Any
+from typing import Any, Dict, Optional, Union
 
-from influxdb_client import InfluxDBClient, Point, WriteOptions
+from influxdb_client import InfluxDBClient, WriteOptions, WritePrecision
 from influxdb_client.client.write_api import WriteType
 from influxdb_client.rest import ApiException
 from urllib3.exceptions import NewConnectionError
 
+from src.communication.line_protocol import MEASUREMENT, encode_lines
+from src.reading import ReadingBatch, Readings
+from src.rollup import parse_resolutions
 from src.settings import (
     INFLUXDB_BUCKET,
+    INFLUXDB_FLUSH_TIMEOUT,
+    INFLUXDB_HEALTH_CHECK,
+    INFLUXDB_HEALTH_MAX_BACKOFF,
     INFLUXDB_ORG,
     INFLUXDB_TIMEOUT,
     INFLUXDB_TOKEN,
     INFLUXDB_URL,
     INFLUXDB_VERIFY_SSL,
+    INFLUXDB_WRITE_MODE,
+    OUTBOX_ENABLE,
 )
 
 logger = logging.getLogger(__name__)
@@ -35,6 +42,8 @@ class InfluxDBWrapper:
     """
     Wrapper for InfluxDB client with batch processing, retries and error handling.
     Implemented as a Singleton to ensure connection reuse and proper cleanup.
+    The write mode (batching, synchronous or asynchronous) is chosen per deployment
+    with INFLUXDB_WRITE_MODE. Health checks run in the background and never block startup.
     """
 
     def __new__(cls):
@@ -55,9 +64,13 @@ class InfluxDBWrapper:
         self.timeout = INFLUXDB_TIMEOUT
         self.verify_ssl = INFLUXDB_VERIFY_SSL
         self._client: Optional[InfluxDBClient] = None
+        # The outbox acknowledges a reading once the write returns, so errors must not be deferred to a batch
+        self.write_mode = "synchronous" if OUTBOX_ENABLE else INFLUXDB_WRITE_MODE
+        self.healthy: Optional[bool] = None
         self._write_api = None
         self._query_api = None
-        
+        self._health_stop = threading.Event()
+
         self._initialized = True
         atexit.register(self.close)
 
@@ -77,11 +90,13 @@ class InfluxDBWrapper:
                 verify_ssl=self.verify_ssl,
             )
             
-            # Configure batch writes
+            # Configure writes
+            # write_type: batching, synchronous or asynchronous
             # flush_interval: Default 1000ms
             # batch_size: Default 1000
             # retry_interval: Default 5000ms
             write_options = WriteOptions(
+                write_type=WriteType[self.write_mode],
                 batch_size=500,
                 flush_interval=1000,
                 jitter_interval=0,
@@ -93,118 +108,101 @@ class InfluxDBWrapper:
             
             self._write_api = self._client.write_api(write_options=write_options)
             self._query_api = self._client.query_api()
-            
-            # Verify connection
-            health = self._client.health()
-            if health.status != "pass":
-                logger.error(f"InfluxDB health check failed: {health.message}")
-            else:
-                logger.info("Successfully connected to InfluxDB")
+
+            # Verify connection in the background
+            self._start_health_check()
 
         except Exception as e:
             logger.error(f"Failed to connect to InfluxDB: {e}")
             raise
 
+    def _start_health_check(self):
+        if not INFLUXDB_HEALTH_CHECK:
+            return
+        self._health_stop.clear()
+        thread = threading.Thread(
+            target=self._health_check_loop,
+            args=(self._client,),
+            name="influxdb-health",
+            daemon=True,
+        )
+        thread.start()
+
+    def _health_check_loop(self, client):
+        """
+        Check the server health until it passes, with exponential backoff between attempts.
+        """
+        delay = 1.0
+        while not self._health_stop.is_set():
+            try:
+                health = client.health()
+                if health.status == "pass":
+                    self.healthy = True
+                    logger.info("Successfully connected to InfluxDB")
+                    return
+                logger.error(f"InfluxDB health check failed: {health.message}")
+            except Exception as e:
+                logger.error(f"InfluxDB health check failed: {e}")
+
+            self.healthy = False
+            if self._health_stop.wait(delay):
+                return
+            delay = min(delay * 2, INFLUXDB_HEALTH_MAX_BACKOFF)
+
     def close(self):
         """
         Close the connection.
+        Pending batches are flushed for at most INFLUXDB_FLUSH_TIMEOUT seconds.
         """
+        self._health_stop.set()
         if self._write_api:
-            self._write_api.close()
+            self._flush(self._write_api)
         if self._client:
             self._client.close()
         self._client = None
         self._write_api = None
         self._query_api = None
 
-    def validate_data(self, data: Optional[Dict[str, Any]]) -> bool:
-        """
-        Validate data before insertion.
-        Ensure it has at least one field and expected structure.
-        """
-        if not data:
-            logger.warning("Empty data received")
-            return False
-
-        # Define valid fields and tags (simplified schema validation)
-        valid_fields = [
-            "temperature_celsius", "temperature_farenheit", "humidity", "pressure", 
-            "pm25", "pm10"
-        ]
-        
-        has_field = False
-        for key in data:
-            if key in valid_fields:
-                has_field = True
-                # Type check (simple)
-                if not isinstance(data[key], (int, float)) and data[key] is not None:
-                     logger.warning(f"Invalid type for field {key}: {type(data[key])}")
-                     return False
-        
-        if not has_field:
-            logger.warning("Data contains no valid fields for InfluxDB")
-            return False
-
-        return True
+    @staticmethod
+    def _flush(write_api):
+        flusher = threading.Thread(target=write_api.close, name="influxdb-flush", daemon=True)
+        flusher.start()
+        flusher.join(INFLUXDB_FLUSH_TIMEOUT)
+        if flusher.is_alive():
+            logger.warning(f"InfluxDB pending writes not flushed within {INFLUXDB_FLUSH_TIMEOUT}s")
 
-    def _convert_to_point(self, data: Dict[str, Any]) -> Point:
-        """
-        Convert dictionary data to InfluxDB Point.
-        """
-        point = Point("weather_data")
-        
-        # Add tags
-        if "sensor_temp_hum" in data:
-            point.tag("sensor_temp_hum", data["sensor_temp_hum"])
-        if "sensor_air_quality" in data:
-            point.tag("sensor_air_quality", data["sensor_air_quality"])
-            
-        # Add fields
-        fields_added = False
-        for key, value in data.items():
-            if key in ["temperature_celsius", "temperature_farenheit", "humidity", "pressure", "pm25", "pm10"]:
-                if value is not None:
-                    point.field(key, float(value))
-                    fields_added = True
-        
-        # Add timestamp (server time by default, but we could add it if provided)
-        # point.time(datetime.utcnow(), WritePrecision.NS)
-        
-        return point if fields_added else None
-
-    def write_data(self, data: Union[Dict[str, Any], List[Dict[str, Any]]]):
+    def write_data(self, data: Union[Dict[str, Any], Readings]):
         """
         Write data to InfluxDB.
-        Accepts a dictionary or a list of dictionaries.
+        Accepts a dictionary, a list of dictionaries or a ReadingBatch.
+        Readings are encoded straight to line protocol with their own timestamp in seconds.
+        Errors are logged and raised, so the reading is not reported as sent.
         """
         try:
             self.connect()
-            
-            points = []
+
             if isinstance(data, dict):
-                if self.validate_data(data):
-                    point = self._convert_to_point(data)
-                    if point:
-                        points.append(point)
-            elif isinstance(data, list):
-                for item in data:
-                    if self.validate_data(item):
-                        point = self._convert_to_point(item)
-                        if point:
-                            points.append(point)
-            
-            if not points:
+                data = [data]
+            lines = encode_lines(data) if isinstance(data, (list, ReadingBatch)) else []
+
+            if not lines:
                 logger.warning("No valid points to write")
                 return
 
-            self._write_api.write(bucket=self.bucket, org=self.org, record=points)
-            logger.debug(f"Written {len(points)} points to InfluxDB")
+            self._write_api.write(
+                bucket=self.bucket,
+                org=self.org,
+                record=lines,
+                write_precision=WritePrecision.S,
+            )
+            logger.debug(f"Written {len(lines)} points to InfluxDB")
 
         except (ApiException, NewConnectionError) as e:
             logger.error(f"Error writing to InfluxDB: {e}")
-            # Retry logic is handled by WriteOptions, but we log the error here.
+            raise
         except Exception as e:
             logger.error(f"Unexpected error writing to InfluxDB: {e}")
+            raise
 
     def read_data(self, query: str):
         """
@@ -218,15 +216,21 @@ class InfluxDBWrapper:
             logger.error(f"Error reading from InfluxDB: {e}")
             raise
 
-    def get_latest_measurements(self, minutes: int = 60):
+    def get_latest_measurements(self, minutes: int = 60, rollup: Optional[str] = None):
         """
         Get latest measurements for the last N minutes.
-        Example of an optimized query.
+        With `rollup`, such as "1h", the precomputed buckets of that resolution are read instead
+        of the raw points, so long ranges do not scan every reading.
         """
+        measurement = MEASUREMENT
+        if rollup is not None:
+            # Raises ValueError for anything but a resolution, as it goes into the query
+            (name, _seconds), = parse_resolutions(rollup)
+            measurement = f"{MEASUREMENT}_{name}"
         query = f'''
         from(bucket: "{self.bucket}")
           |> range(start: -{minutes}m)
-          |> filter(fn: (r) => r["_measurement"] == "weather_data")
+          |> filter(fn: (r) => r["_measurement"] == "{measurement}")
           |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
           |> sort(columns: ["_time"], desc: true)
         '''
@@ -247,3 +251,8 @@ class SendDataInfluxDB:
         # but the wrapper handles singleton-like behavior if instantiated once.
         # Since send_data instantiates SendDataInfluxDB every time, 
         # connection pooling inside InfluxDBClient handles this.
+
+    @classmethod
+    def send_batch(cls, readings: Readings):
+        # A batch of readings is encoded and written in one request
+        cls(readings).send()
@@ -0,0 +1,107 @@
+"""
+InfluxDB line protocol encoder for weather readings.
+"""
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.communication.encoding import encode
+from src.rollup import ROLLUP, ROLLUP_FIELDS
+
+logger = logging.getLogger(__name__)
+
+MEASUREMENT = "weather_data"
+
+# Tags in lexicographic order, as recommended by InfluxDB for faster ingestion
+# "sensor" is the name of a sensor instance from the SENSORS setting
+TAGS = ("sensor", "sensor_air_quality", "sensor_temp_hum")
+FIELDS = ("temperature_celsius", "temperature_farenheit", "humidity", "pressure", "pm25", "pm10")
+# Window statistics added by the sampling engine
+FIELDS += tuple(
+    f"{field}_{aggregate}"
+    for field in ("temperature_celsius", "humidity", "pressure")
+    for aggregate in ("min", "max", "stddev")
+) + ("sample_count",)
+
+# Precomputed "key=" prefixes so encoding a reading only formats the values
+_TAG_PREFIXES = tuple((tag, f",{tag}=") for tag in TAGS)
+_FIELD_PREFIXES = tuple((field, f"{field}=") for field in FIELDS)
+# Rollup records have their own fields: the number of readings and the statistics of every field
+_ROLLUP_FIELD_PREFIXES = tuple((field, f"{field}=") for field in ("count",) + ROLLUP_FIELDS)
+
+_TAG_ESCAPES = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ ", "\\": "\\\\"})
+_MEASUREMENT_ESCAPES = str.maketrans({",": r"\,", " ": r"\ ", "\\": "\\\\"})
+
+
+def encode_line(data: Dict[str, Any], measurement: str = MEASUREMENT) -> Optional[str]:
+    """
+    Encode one reading as a line protocol line with second precision.
+    The reading's own timestamp is used, so buffered and replayed points keep the time they were measured.
+    A rollup record goes to its own measurement, such as weather_data_1h, timestamped with the start of its bucket.
+    Returns None when the reading has no valid field.
+    """
+    prefixes = _FIELD_PREFIXES
+    rollup = data.get(ROLLUP)
+    if rollup:
+        prefixes = _ROLLUP_FIELD_PREFIXES
+        measurement = f"{measurement}_{rollup}"
+
+    fields = []
+    for field, prefix in prefixes:
+        value = data.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            logger.warning(f"Invalid type for field {field}: {type(value)}")
+            return None
+        value = float(value)
+        # NaN and infinity cannot be written to InfluxDB
+        if not math.isfinite(value):
+            continue
+        fields.append(prefix + repr(value))
+
+    if not fields:
+        return None
+
+    line = measurement.translate(_MEASUREMENT_ESCAPES)
+    for tag, prefix in _TAG_PREFIXES:
+        value = data.get(tag)
+        if value:
+            line += prefix + str(value).translate(_TAG_ESCAPES)
+
+    line += " " + ",".join(fields)
+
+    timestamp = data.get("timestamp")
+    if timestamp is not None:
+        line += f" {int(timestamp)}"
+
+    return line
+
+
+def encode_lines(readings: Iterable[Dict[str, Any]], measurement: str = MEASUREMENT) -> List[str]:
+    """
+    Encode many readings in one pass, skipping the ones without valid fields.
+    Every measurement under "sensors" gets its own point tagged with the sensor name.
+    The lines of a reading are encoded once and shared by every write of it.
+    """
+    lines = []
+    for data in readings:
+        if not data:
+            continue
+        if measurement == MEASUREMENT:
+            lines.extend(encode(data, "line", _reading_lines))
+        else:
+            lines.extend(_reading_lines(data, measurement))
+    return lines
+
+
+def _reading_lines(data: Dict[str, Any], measurement: str = MEASUREMENT) -> List[str]:
+    lines = []
+    line = encode_line(data, measurement)
+    if line is not None:
+        lines.append(line)
+    for name, sensor_data in (data.get("sensors") or {}).items():
+        line = encode_line({**sensor_data, "sensor": name, "timestamp": data.get("timestamp")}, measurement)
+        if line is not None:
+            lines.append(line)
+    return lines
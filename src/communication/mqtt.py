@@ -1,29 +1,234 @@
-import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple, Union
 
 import paho.mqtt.client as mqtt
 
-from src.settings import MQTT_HOST, MQTT_PASSWORD, MQTT_PORT, MQTT_TOPIC, MQTT_USER
+from src.communication.encoding import encode_payload
+from src.settings import (
+    MQTT_HOST,
+    MQTT_KEEPALIVE,
+    MQTT_PASSWORD,
+    MQTT_PAYLOAD_FORMAT,
+    MQTT_PORT,
+    MQTT_PUBLISH_TIMEOUT,
+    MQTT_QOS,
+    MQTT_QUEUE_SIZE,
+    MQTT_RECONNECT_MAX_DELAY,
+    MQTT_TOPIC,
+    MQTT_USER,
+    OUTBOX_ENABLE,
+)
 
+logger = logging.getLogger(__name__)
 
-class SendDataMQTT:
-    def __init__(self, data):
-        self.data = data
+_mqtt_session_instance = None
+_mqtt_session_lock = threading.Lock()
 
-    def send(self):
-        client = self._mqtt_client()
+
+def get_mqtt_session():
+    """
+    Helper function to get the shared MQTTSession instance, starting it on first use.
+    """
+    global _mqtt_session_instance
+    with _mqtt_session_lock:
+        if _mqtt_session_instance is None:
+            _mqtt_session_instance = MQTTSession()
+            _mqtt_session_instance.start()
+        return _mqtt_session_instance
+
+
+def close_mqtt_session():
+    """
+    Helper function to close the MQTTSession instance if it exists.
+    """
+    global _mqtt_session_instance
+    with _mqtt_session_lock:
+        if _mqtt_session_instance:
+            logger.info("Closing MQTT session...")
+            _mqtt_session_instance.close()
+            _mqtt_session_instance = None
+
+
+class MQTTSession:
+    """
+    Long-lived MQTT connection shared by every cycle.
+    The network loop runs in the background with keepalive and automatic reconnect.
+    Publishes that cannot be handed to the broker while offline are kept in a bounded
+    in-memory queue (oldest dropped first) and flushed once the connection comes back.
+    The lock only guards the queue and the unacknowledged messages. It is never held
+    while calling paho, whose network thread takes its own locks before calling back.
+    """
+
+    def __init__(self, qos: int = MQTT_QOS, queue_size: int = MQTT_QUEUE_SIZE):
+        self.qos = qos
+        self.queue_size = queue_size
+        self._client: Optional[mqtt.Client] = None
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._offline_queue: Deque[Tuple[str, str]] = deque(maxlen=queue_size)
+        # Publishes handed to paho but not acknowledged yet, by message id
+        self._unacknowledged: Dict[int, Tuple[str, str]] = {}
+        self._early_acks: Set[int] = set()
+        self._acknowledged = threading.Condition(self._lock)
+
+    def start(self):
+        """
+        Start the background network loop. The connection is made asynchronously.
+        """
+        with self._lock:
+            if self._client:
+                return
+            client = self._create_client()
+            client.on_connect = self._on_connect
+            client.on_disconnect = self._on_disconnect
+            client.on_publish = self._on_publish
+            client.max_queued_messages_set(self.queue_size)
+            client.reconnect_delay_set(min_delay=1, max_delay=MQTT_RECONNECT_MAX_DELAY)
+            self._client = client
+        client.connect_async(MQTT_HOST, int(MQTT_PORT), MQTT_KEEPALIVE)
         client.loop_start()
-        self._publish(client, MQTT_TOPIC, self.data)
-        client.disconnect()
 
     @staticmethod
-    def _mqtt_client():
-        client = mqtt.Client(transport="websockets")
+    def _create_client():
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, transport="websockets")
         client.tls_set()
         client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
-        client.connect(MQTT_HOST, int(MQTT_PORT), 30)
         return client
 
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def pending(self) -> int:
+        """
+        Return the number of publishes not acknowledged by the broker yet.
+        """
+        with self._lock:
+            return len(self._offline_queue) + len(self._unacknowledged)
+
+    def publish(self, topic: str, payload: Union[str, bytes]) -> Optional[mqtt.MQTTMessageInfo]:
+        """
+        Publish a message, or queue it if the client cannot take it right now.
+        Returns the paho message info, or None if the message was queued.
+        """
+        info = self._publish(topic, payload) if self._connected.is_set() else None
+        if info is None:
+            self._enqueue(topic, payload)
+        return info
+
+    def deliver(self, topic: str, payload: Union[str, bytes], timeout: float, queue: bool = True) -> None:
+        """
+        Publish a message and wait at most `timeout` seconds for the connection and the broker acknowledgement.
+        Raises TimeoutError when the message was not delivered in time. With `queue`, a message that could
+        not be handed to the broker is kept in the offline queue before raising.
+        """
+        deadline = time.monotonic() + timeout
+        info = None
+        if self._connected.wait(timeout):
+            info = self._publish(topic, payload)
+        if info is None:
+            if queue:
+                self._enqueue(topic, payload)
+            raise TimeoutError(f"MQTT broker not reachable within {timeout}s")
+        info.wait_for_publish(max(0.0, deadline - time.monotonic()))
+        if not info.is_published():
+            raise TimeoutError(f"MQTT message {info.mid} not acknowledged within {timeout}s")
+
+    def _publish(self, topic, payload) -> Optional[mqtt.MQTTMessageInfo]:
+        client = self._client
+        if client is None:
+            return None
+        info = client.publish(topic, payload, qos=self.qos)
+        # With QoS > 0 paho keeps the message itself and resends it after reconnecting
+        if info.rc == mqtt.MQTT_ERR_SUCCESS or (self.qos > 0 and info.rc == mqtt.MQTT_ERR_NO_CONN):
+            with self._lock:
+                if info.mid in self._early_acks:
+                    self._early_acks.discard(info.mid)
+                else:
+                    self._unacknowledged[info.mid] = (topic, payload)
+            return info
+        return None
+
+    def _enqueue(self, topic, payload):
+        with self._lock:
+            if len(self._offline_queue) == self._offline_queue.maxlen:
+                logger.warning("MQTT offline queue is full, dropping oldest message")
+            self._offline_queue.append((topic, payload))
+
+    def flush(self):
+        """
+        Publish every queued message while the connection is up.
+        """
+        while self._connected.is_set():
+            with self._lock:
+                if not self._offline_queue:
+                    return
+                topic, payload = self._offline_queue.popleft()
+            if self._publish(topic, payload) is None:
+                with self._lock:
+                    self._offline_queue.appendleft((topic, payload))
+                return
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            logger.error(f"MQTT connection refused: {reason_code}")
+            return
+        logger.info("Connected to MQTT broker")
+        self._connected.set()
+        self.flush()
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self._connected.clear()
+        logger.warning(f"Disconnected from MQTT broker: {reason_code}")
+        if self.qos == 0:
+            # QoS 0 messages not written yet are lost by paho, queue them again
+            with self._lock:
+                messages = list(self._unacknowledged.values())
+                self._unacknowledged.clear()
+            for topic, payload in messages:
+                self._enqueue(topic, payload)
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        # Called from the paho network thread with paho's own locks held, so it only touches the bookkeeping
+        with self._lock:
+            if self._unacknowledged.pop(mid, None) is None:
+                self._early_acks.add(mid)
+            self._acknowledged.notify_all()
+
+    def close(self, timeout: float = MQTT_PUBLISH_TIMEOUT):
+        """
+        Flush the offline queue, wait at most `timeout` seconds for the outstanding acknowledgements,
+        then disconnect. Messages still not acknowledged are logged as lost.
+        """
+        self.flush()
+        with self._lock:
+            self._acknowledged.wait_for(lambda: not self._unacknowledged, timeout)
+            lost = len(self._offline_queue) + len(self._unacknowledged)
+            client, self._client = self._client, None
+        if lost:
+            logger.warning(f"Closing MQTT session with {lost} messages not delivered")
+        if client:
+            client.disconnect()
+            client.loop_stop()
+        self._connected.clear()
+
+
+class SendDataMQTT:
+    def __init__(self, data):
+        self.data = data
+
+    def send(self):
+        """
+        Publish the reading and wait for the broker to acknowledge it, raising when it was not delivered.
+        With the outbox, the reading is left to the outbox instead of the in-memory queue.
+        """
+        self._publish(get_mqtt_session(), MQTT_TOPIC, self.data)
+
     @staticmethod
-    def _publish(client, topic, payload):
-        payload_string = json.dumps(payload)
-        client.publish(topic, payload_string).wait_for_publish()
+    def _publish(session, topic, payload):
+        session.deliver(
+            topic, encode_payload(payload, MQTT_PAYLOAD_FORMAT), MQTT_PUBLISH_TIMEOUT, queue=not OUTBOX_ENABLE
+        )
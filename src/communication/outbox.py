@@ -0,0 +1,248 @@
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.communication.encoding import EncodedReading, encode_json
+from src.communication.gorilla import decode_batch, decode_integers, encode_batch, encode_integers
+from src.reading import ReadingBatch
+from src.settings import OUTBOX_COMPRESS_BATCH, OUTBOX_COMPRESS_ENABLE, OUTBOX_MAX_READINGS, OUTBOX_PATH
+
+logger = logging.getLogger(__name__)
+
+_outbox_instance = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """
+    Helper function to get the shared Outbox instance, opening it on first use.
+    """
+    global _outbox_instance
+    with _outbox_lock:
+        if _outbox_instance is None:
+            _outbox_instance = Outbox()
+        return _outbox_instance
+
+
+def close_outbox():
+    """
+    Helper function to close the Outbox instance if it exists.
+    """
+    global _outbox_instance
+    with _outbox_lock:
+        if _outbox_instance:
+            logger.info("Closing outbox...")
+            _outbox_instance.close()
+            _outbox_instance = None
+
+
+class Outbox:
+    """
+    Durable store-and-forward queue between the sensors and the sinks.
+    Readings are appended to a SQLite database in WAL mode and every sink keeps its
+    own cursor, so a sink that was offline replays everything it missed.
+    With synchronous=NORMAL a commit only appends to the WAL file and the SD card is
+    fsynced at checkpoints, not on every reading.
+    With `compress`, a backlog that builds up during an outage is moved into Gorilla compressed
+    chunks of `compress_batch` readings, keeping the newest readings as plain rows.
+    """
+
+    def __init__(
+        self,
+        path: str = OUTBOX_PATH,
+        max_readings: int = OUTBOX_MAX_READINGS,
+        compress: bool = OUTBOX_COMPRESS_ENABLE,
+        compress_batch: int = OUTBOX_COMPRESS_BATCH,
+    ):
+        self.path = path
+        self.max_readings = max_readings
+        self.compress = compress
+        self.compress_batch = compress_batch
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS readings (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)"
+        )
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(readings)")]
+        if "sink" not in columns:
+            # Readings addressed to a single sink, NULL for readings sent to every sink
+            self._connection.execute("ALTER TABLE readings ADD COLUMN sink TEXT")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cursors (sink TEXT PRIMARY KEY, last_id INTEGER NOT NULL)"
+        )
+        # Compressed readings: ids and sinks of every reading, and the readings as a Gorilla batch
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (first_id INTEGER PRIMARY KEY, last_id INTEGER NOT NULL, "
+            "count INTEGER NOT NULL, ids BLOB NOT NULL, sinks TEXT NOT NULL, data BLOB NOT NULL)"
+        )
+        self._connection.commit()
+
+    def append(
+        self, data: Dict[str, Any], sink: Optional[str] = None, active_sinks: Optional[Sequence[str]] = None
+    ) -> int:
+        """
+        Store a reading and return its id.
+        With `sink`, the reading is only delivered to that sink.
+        Readings acknowledged by every sink of `active_sinks`, by default every sink with a cursor, are dropped,
+        so a sink that was disabled does not hold back the others. Readings beyond the retention limit are
+        dropped too, oldest first.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO readings (data, sink) VALUES (?, ?)", (encode_json(data).decode("utf-8"), sink)
+            )
+            reading_id = cursor.lastrowid
+            self._prune(reading_id, active_sinks)
+            if self.compress:
+                self._compact()
+            self._connection.commit()
+        return reading_id
+
+    def pending(self, sink: str, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Return up to `limit` readings the sink has not acknowledged yet, oldest first.
+        A sink seen for the first time starts at the latest reading.
+        """
+        return [
+            (reading_id, self._wrap(reading, encoded)) for reading_id, reading, encoded in self._pending(sink, limit)
+        ]
+
+    def pending_batch(self, sink: str, limit: int) -> Tuple[List[int], ReadingBatch]:
+        """
+        Like pending, for the sinks that send a whole batch at once: return the ids and the readings
+        as a columnar ReadingBatch.
+        """
+        ids = []
+        batch = ReadingBatch()
+        for reading_id, reading, encoded in self._pending(sink, limit):
+            ids.append(reading_id)
+            batch.append(reading, encoded)
+        return ids, batch
+
+    def _pending(self, sink: str, limit: int) -> List[Tuple[int, Dict[str, Any], Optional[bytes]]]:
+        """
+        Return the id, the reading and, for plain rows, the stored JSON of the pending readings.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO cursors (sink, last_id) "
+                "SELECT ?, COALESCE((SELECT MAX(id) FROM readings), (SELECT MAX(last_id) FROM chunks), 1) - 1",
+                (sink,),
+            )
+            (last_id,) = self._connection.execute(
+                "SELECT last_id FROM cursors WHERE sink = ?", (sink,)
+            ).fetchone()
+
+            # Chunks always hold older readings than the plain rows
+            pending: List[Tuple[int, Dict[str, Any], Optional[bytes]]] = []
+            chunks = self._connection.execute(
+                "SELECT ids, sinks, data FROM chunks WHERE last_id > ? ORDER BY first_id", (last_id,)
+            )
+            for ids, sinks, data in chunks:
+                readings = zip(decode_integers(ids), json.loads(sinks), decode_batch(data))
+                for reading_id, reading_sink, reading in readings:
+                    if reading_id > last_id and reading_sink in (None, sink) and len(pending) < limit:
+                        pending.append((reading_id, reading, None))
+                if len(pending) >= limit:
+                    break
+
+            rows = self._connection.execute(
+                "SELECT id, data FROM readings "
+                "WHERE id > ? AND (sink IS NULL OR sink = ?) "
+                "ORDER BY id LIMIT ?",
+                (last_id, sink, limit - len(pending)),
+            ).fetchall()
+            self._connection.commit()
+        # The stored text is the reading's JSON, so sinks do not encode it again
+        return pending + [(reading_id, json.loads(data), data.encode("utf-8")) for reading_id, data in rows]
+
+    @staticmethod
+    def _wrap(reading: Dict[str, Any], encoded: Optional[bytes]) -> EncodedReading:
+        wrapped = EncodedReading(reading)
+        if encoded is not None:
+            wrapped.prime("json", encoded)
+        return wrapped
+
+    def ack(self, sink: str, last_id: int) -> None:
+        """
+        Move the cursor of the sink past `last_id`.
+        """
+        with self._lock:
+            self._connection.execute(
+                "UPDATE cursors SET last_id = MAX(last_id, ?) WHERE sink = ?",
+                (last_id, sink),
+            )
+            self._connection.commit()
+
+    def count(self, sink: Optional[str] = None) -> int:
+        """
+        Return the number of stored readings, or the number pending for a sink.
+        """
+        with self._lock:
+            if sink is None:
+                (count,) = self._connection.execute(
+                    "SELECT (SELECT COUNT(*) FROM readings) + (SELECT COALESCE(SUM(count), 0) FROM chunks)"
+                ).fetchone()
+                return count
+
+            (last_id,) = self._connection.execute(
+                "SELECT COALESCE((SELECT last_id FROM cursors WHERE sink = ?), 0)", (sink,)
+            ).fetchone()
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM readings WHERE id > ? AND (sink IS NULL OR sink = ?)",
+                (last_id, sink),
+            ).fetchone()
+            chunks = self._connection.execute("SELECT ids, sinks FROM chunks WHERE last_id > ?", (last_id,))
+            for ids, sinks in chunks:
+                count += sum(
+                    1
+                    for reading_id, reading_sink in zip(decode_integers(ids), json.loads(sinks))
+                    if reading_id > last_id and reading_sink in (None, sink)
+                )
+        return count
+
+    def _prune(self, latest_id: int, active_sinks: Optional[Sequence[str]] = None) -> None:
+        # Readings acknowledged by every active sink are no longer needed
+        acknowledged = "SELECT MIN(last_id) FROM cursors"
+        params: Tuple[str, ...] = ()
+        if active_sinks is not None:
+            acknowledged += f" WHERE sink IN ({', '.join('?' * len(active_sinks))})"
+            params = tuple(active_sinks)
+        self._connection.execute(f"DELETE FROM readings WHERE id <= ({acknowledged})", params)
+        self._connection.execute(f"DELETE FROM chunks WHERE last_id <= ({acknowledged})", params)
+        # Size-bounded retention for sinks that stay offline, a chunk goes once all its readings are too old
+        self._connection.execute("DELETE FROM readings WHERE id <= ?", (latest_id - self.max_readings,))
+        self._connection.execute("DELETE FROM chunks WHERE last_id <= ?", (latest_id - self.max_readings,))
+
+    def _compact(self) -> None:
+        """
+        Move the oldest `compress_batch` plain rows into a compressed chunk once twice as many are stored.
+        The newest rows stay plain, they are usually sent right away.
+        """
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM readings").fetchone()
+        if count < 2 * self.compress_batch:
+            return
+        rows = self._connection.execute(
+            "SELECT id, data, sink FROM readings ORDER BY id LIMIT ?", (self.compress_batch,)
+        ).fetchall()
+        ids = [reading_id for reading_id, _data, _sink in rows]
+        self._connection.execute(
+            "INSERT INTO chunks (first_id, last_id, count, ids, sinks, data) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                ids[0],
+                ids[-1],
+                len(rows),
+                encode_integers(ids),
+                json.dumps([sink for _id, _data, sink in rows]),
+                encode_batch(json.loads(data) for _id, data, _sink in rows),
+            ),
+        )
+        self._connection.execute("DELETE FROM readings WHERE id <= ?", (ids[-1],))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
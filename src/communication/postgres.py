@@ -1,17 +1,96 @@
 import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
 import psycopg2
+from psycopg2.extras import Json, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 
+from src.reading import Readings
+from src.rollup import ROLLUP
 from src.settings import (
+    POSTGRES_BATCH_SIZE,
     POSTGRES_CHANNELBINDING,
     POSTGRES_DBNAME,
     POSTGRES_HOST,
     POSTGRES_PASSWORD,
+    POSTGRES_POOL_MAX,
+    POSTGRES_POOL_MIN,
     POSTGRES_PORT,
     POSTGRES_SSLMODE,
     POSTGRES_TABLE,
     POSTGRES_USER,
 )
 
+_postgres_pool = None
+_postgres_pool_lock = threading.Lock()
+
+
+def get_postgres_pool():
+    """
+    Helper function to get the shared connection pool, creating it on first use.
+    Connections live across cycles so the TLS and SCRAM handshake is paid once.
+    """
+    global _postgres_pool
+    with _postgres_pool_lock:
+        if _postgres_pool is None:
+            _postgres_pool = ThreadedConnectionPool(
+                POSTGRES_POOL_MIN,
+                POSTGRES_POOL_MAX,
+                user=POSTGRES_USER,
+                password=POSTGRES_PASSWORD,
+                host=POSTGRES_HOST,
+                port=POSTGRES_PORT,
+                dbname=POSTGRES_DBNAME,
+                sslmode=POSTGRES_SSLMODE,
+                channel_binding=POSTGRES_CHANNELBINDING,
+            )
+        return _postgres_pool
+
+
+def close_postgres_pool():
+    """
+    Helper function to close every pooled connection.
+    """
+    global _postgres_pool
+    with _postgres_pool_lock:
+        if _postgres_pool is not None:
+            _postgres_pool.closeall()
+            _postgres_pool = None
+
+
+def _adapt(value):
+    # Nested values, like the per-sensor measurements, go to JSON/JSONB columns
+    return Json(value) if isinstance(value, (dict, list)) else value
+
+
+def _table_and_columns(reading: Dict[str, Any]) -> Tuple[str, Tuple[str, ...]]:
+    # Rollup records go to a table per resolution, such as weather_1h
+    rollup = reading.get(ROLLUP)
+    if rollup:
+        if not re.match(r"^[a-zA-Z0-9_]+$", rollup):
+            raise ValueError(f"Invalid rollup name: {rollup}")
+        return f"{POSTGRES_TABLE}_{rollup}", tuple(column for column in reading.keys() if column != ROLLUP)
+    return POSTGRES_TABLE, tuple(reading.keys())
+
+
+@lru_cache(maxsize=32)
+def _build_insert_query(table: str, columns: Tuple[str, ...]) -> Tuple[str, str]:
+    """
+    Build the single-row and multi-row INSERT statements for a column set.
+    Column names are validated once per column set to prevent SQL injection.
+    """
+    for col in columns:
+        if not re.match(r"^[a-zA-Z0-9_]+$", col):
+            raise ValueError(f"Invalid column name: {col}")
+
+    columns_str = ', '.join(columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    single_query = f"INSERT INTO {table} ({columns_str}) VALUES ({placeholders})"
+    batch_query = f"INSERT INTO {table} ({columns_str}) VALUES %s"
+    return single_query, batch_query
+
 
 class SendDataPostgres:
     def __init__(self, data):
@@ -19,55 +98,74 @@ class SendDataPostgres:
 
     def send(self):
         """Send data to PostgreSQL database."""
+        self._execute(self._insert_data)
+
+    @classmethod
+    def send_batch(cls, readings: Readings):
+        """Send many readings to PostgreSQL in a single transaction with multi-row inserts."""
+        if readings:
+            sender = cls(readings)
+            sender._execute(sender._insert_batch)
+
+    def _execute(self, insert):
         try:
-            # Connect to the database
+            # Borrow a connection from the pool
             connection = self._get_connection()
-            
+        except Exception as e:
+            print(f"Failed to send data to PostgreSQL: {e}")
+            raise e
+
+        broken = False
+        try:
             # Create a cursor to execute SQL queries
             cursor = connection.cursor()
-            
+
             # Insert data into the table
-            self._insert_data(cursor)
-            
+            insert(cursor)
+
             # Commit the transaction
             connection.commit()
-            
-            # Close the cursor and connection
+
+            # Close the cursor
             cursor.close()
-            connection.close()
-            
+
         except Exception as e:
             print(f"Failed to send data to PostgreSQL: {e}")
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if not broken:
+                connection.rollback()
             raise e
+        finally:
+            # Return the connection, dropping it if the server went away
+            self._release_connection(connection, close=broken or bool(connection.closed))
+
+    @staticmethod
+    def _get_connection():
+        """Take a database connection from the pool."""
+        return get_postgres_pool().getconn()
+
+    @staticmethod
+    def _release_connection(connection, close=False):
+        """Give a database connection back to the pool."""
+        get_postgres_pool().putconn(connection, close=close)
 
-    def _get_connection(self):
-        """Create and return a database connection."""
-        return psycopg2.connect(
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            host=POSTGRES_HOST,
-            port=POSTGRES_PORT,
-            dbname=POSTGRES_DBNAME,
-            sslmode=POSTGRES_SSLMODE,
-            channel_binding=POSTGRES_CHANNELBINDING,
-        )
-    
     def _insert_data(self, cursor):
         """Insert data into the database."""
         # Get column names and values from the data dictionary
-        columns = list(self.data.keys())
-        
-        # Validate column names to prevent SQL injection
-        for col in columns:
-            if not re.match(r"^[a-zA-Z0-9_]+$", col):
-                raise ValueError(f"Invalid column name: {col}")
-
-        values = [self.data[column] for column in columns]
-        
-        # Build the SQL query
-        placeholders = ', '.join(['%s'] * len(columns))
-        columns_str = ', '.join(columns)
-        
+        table, columns = _table_and_columns(self.data)
+        values = [_adapt(self.data[column]) for column in columns]
+
         # Execute the query
-        query = f"INSERT INTO {POSTGRES_TABLE} ({columns_str}) VALUES ({placeholders})"
-        cursor.execute(query, values)
\ No newline at end of file
+        query, _batch_query = _build_insert_query(table, columns)
+        cursor.execute(query, values)
+
+    def _insert_batch(self, cursor):
+        """Insert a list of readings, one multi-row insert per table and column set."""
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[List[Any]]] = {}
+        for reading in self.data:
+            table, columns = _table_and_columns(reading)
+            groups.setdefault((table, columns), []).append([_adapt(reading[column]) for column in columns])
+
+        for (table, columns), rows in groups.items():
+            _query, batch_query = _build_insert_query(table, columns)
+            execute_values(cursor, batch_query, rows, page_size=POSTGRES_BATCH_SIZE)
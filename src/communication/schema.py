@@ -0,0 +1,55 @@
+"""
+Schema registry of the fields sent in compact binary payloads.
+Field IDs are part of the wire format: a field keeps its ID forever, new fields get the next free ID
+and removed fields leave their ID unused. This module only uses the standard library so consumers
+can copy it together with the decoder.
+"""
+from typing import Dict, NamedTuple
+
+
+class Field(NamedTuple):
+    """
+    A field of the compact format.
+    `format` is the struct format of the value, "s" for a UTF-8 string and "j" for a JSON object,
+    both prefixed with their length as an unsigned 16-bit integer.
+    """
+
+    id: int
+    name: str
+    format: str
+
+
+# Keys of a reading outside the registry are sent together as one JSON object in this field
+EXTRA = "_extra"
+
+FIELDS = (
+    Field(0, "timestamp", "d"),
+    Field(1, "sensor_air_quality", "s"),
+    Field(2, "pm25", "f"),
+    Field(3, "pm10", "f"),
+    Field(4, "sensor_temp_hum", "s"),
+    Field(5, "temperature_farenheit", "f"),
+    Field(6, "temperature_celsius", "f"),
+    Field(7, "humidity", "f"),
+    Field(8, "pressure", "f"),
+    # Window statistics added by the sampling engine
+    Field(9, "temperature_celsius_min", "f"),
+    Field(10, "temperature_celsius_max", "f"),
+    Field(11, "temperature_celsius_stddev", "f"),
+    Field(12, "humidity_min", "f"),
+    Field(13, "humidity_max", "f"),
+    Field(14, "humidity_stddev", "f"),
+    Field(15, "pressure_min", "f"),
+    Field(16, "pressure_max", "f"),
+    Field(17, "pressure_stddev", "f"),
+    Field(18, "sample_count", "I"),
+    # Measurements of the sensor instances from the SENSORS setting
+    Field(19, "sensors", "j"),
+    Field(31, EXTRA, "j"),
+)
+
+# Presence and null masks are 32-bit in version 1
+MAX_FIELD_ID = 31
+
+FIELDS_BY_ID: Dict[int, Field] = {field.id: field for field in FIELDS}
+FIELDS_BY_NAME: Dict[str, Field] = {field.name: field for field in FIELDS}
@@ -1,63 +1,323 @@
 import logging
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
-from src.communication.api import SendDataAPI
-from src.communication.mqtt import SendDataMQTT
-from src.communication.postgres import SendDataPostgres
-from src.communication.sqs import SQSClient
-from src.communication.sensor_community import SendDataSensorCommunity
-from src.communication.influxdb import SendDataInfluxDB
-from src.settings import (
-    API_ENABLE,
-    MQTT_ENABLE,
-    POSTGRES_ENABLE,
-    SQS_ENABLE,
-    SENSOR_COMMUNITY_ENABLE,
-    INFLUXDB_ENABLE,
-)
+from src import settings
+from src.communication.encoding import EncodedReading
+from src.communication.outbox import close_outbox, get_outbox
+from src.reading import Reading
+from src.rollup import ROLLUP
+from src.settings import OUTBOX_ENABLE, OUTBOX_REPLAY_BATCH, SEND_DATA_CONCURRENT, SEND_DATA_MAX_WORKERS
+from src.startup import timed_import
 
 logger = logging.getLogger(__name__)
 
+class Sink(NamedTuple):
+    """
+    Registry entry of a sink.
+    Settings and classes are looked up by name on every call so they can be changed at runtime,
+    and the sink module is only imported once the sink is enabled.
+    """
+
+    name: str
+    enable: str
+    module: str
+    sender: str
+    timeout: str
+    batch: bool
+    close: Optional[str] = None
+    interval: Optional[str] = None
+    # Whether the sink stores rollup records next to the readings
+    rollups: bool = True
+
+
+SINKS = (
+    Sink("API", "API_ENABLE", "src.communication.api", "SendDataAPI", "API_SEND_TIMEOUT", True,
+         "close_api_session", "API_SEND_INTERVAL"),
+    Sink("MQTT", "MQTT_ENABLE", "src.communication.mqtt", "SendDataMQTT", "MQTT_SEND_TIMEOUT", False,
+         "close_mqtt_session", "MQTT_SEND_INTERVAL"),
+    Sink("SQS", "SQS_ENABLE", "src.communication.sqs", "SQSClient", "SQS_SEND_TIMEOUT", True,
+         "reset_sqs_queue", "SQS_SEND_INTERVAL"),
+    Sink("Postgres", "POSTGRES_ENABLE", "src.communication.postgres", "SendDataPostgres", "POSTGRES_SEND_TIMEOUT",
+         True, "close_postgres_pool", "POSTGRES_SEND_INTERVAL"),
+    Sink("Sensor Community", "SENSOR_COMMUNITY_ENABLE", "src.communication.sensor_community",
+         "SendDataSensorCommunity", "SENSOR_COMMUNITY_SEND_TIMEOUT", False, None,
+         "SENSOR_COMMUNITY_SEND_INTERVAL", rollups=False),
+    Sink("InfluxDB", "INFLUXDB_ENABLE", "src.communication.influxdb", "SendDataInfluxDB", "INFLUXDB_SEND_TIMEOUT",
+         True, "close_influxdb_client", "INFLUXDB_SEND_INTERVAL"),
+)
+
+_SINKS_BY_SENDER = {sink.sender: sink for sink in SINKS}
+_ROLLUP_SINKS = frozenset(sink.name for sink in SINKS if sink.rollups)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Last submitted send of every sink, used to skip a sink whose previous send is still running
+_in_flight: Dict[str, "Future[SinkResult]"] = {}
+
 
-def send_data(data):
+class SinkResult(NamedTuple):
+    """
+    Outcome of sending one reading to one sink.
+    """
+
+    success: bool
+    latency: float
+    error: Optional[str] = None
+
+
+# Name, deliver function, its arguments and timeout of the send to one sink
+Job = Tuple[str, Callable[..., None], Tuple[Any, ...], float]
+
+
+def send_data(data, sink: Optional[str] = None) -> Dict[str, SinkResult]:
     """
     Intermediate method to send the information to API, MQTT, SQS, SupaBase, or PostgreSQL,
     otherwise just do a console print.
+    When the outbox is enabled the reading is stored first and every sink replays
+    whatever it has not acknowledged yet, including readings from previous outages.
+    With `sink`, the reading is only sent to that sink.
+    Returns the success and latency of every enabled sink.
+    The reading is wrapped once so every wire format is encoded at most once and shared by the sinks.
+    Rollup records only go to the sinks that store rollups.
     """
+    data, jobs = _prepare(data, sink)
 
-    if API_ENABLE:
-        try:
-            SendDataAPI(data).send()
-        except Exception as e:
-            logger.error(f"Failed to send data to API: {e}")
+    if SEND_DATA_CONCURRENT:
+        results = _send_concurrently(jobs)
+    else:
+        results = _send_sequentially(jobs)
 
-    if MQTT_ENABLE:
-        try:
-            SendDataMQTT(data).send()
-        except Exception as e:
-            logger.error(f"Failed to send data to MQTT: {e}")
+    logger.info("Data processed: timestamp %s, %d sinks", data.get("timestamp"), len(results))
+    logger.debug("Data processed: %s", data)
+    return results
 
-    if SQS_ENABLE:
-        try:
-            SQSClient(data).send()
-        except Exception as e:
-            logger.error(f"Failed to send data to SQS: {e}")
 
-    if POSTGRES_ENABLE:
-        try:
-            SendDataPostgres(data).send()
-        except Exception as e:
-            logger.error(f"Failed to send data to Postgres: {e}")
+def send_data_nowait(data, sink: Optional[str] = None) -> Dict[str, "Future[SinkResult]"]:
+    """
+    Like send_data, but submit every sink to the thread pool and return without waiting,
+    so a slow sink never holds up the caller. The result of every sink is logged when it finishes.
+    A sink whose previous send is still running is skipped.
+    """
+    data, jobs = _prepare(data, sink)
+    executor = _get_executor()
+    futures: Dict[str, "Future[SinkResult]"] = {}
+    for name, deliver, args, _timeout in jobs:
+        future = _submit(executor, name, deliver, args)
+        if future is None:
+            continue
+        future.add_done_callback(partial(_log_done, name))
+        futures[name] = future
+    logger.info("Data submitted: timestamp %s, %d sinks", data.get("timestamp"), len(futures))
+    logger.debug("Data submitted: %s", data)
+    return futures
+
+
+def _log_done(name: str, done: "Future[SinkResult]") -> None:
+    log_sink_results({name: done.result()})
+
+
+def _prepare(data, sink: Optional[str]) -> Tuple[EncodedReading, List[Job]]:
+    """
+    Wrap the reading, store it in the outbox when enabled and return the job of every sink to send it to.
+    """
+    if isinstance(data, Reading):
+        # The JSON boundary: the sinks get the reading as a dictionary that caches its encodings
+        data = EncodedReading(data.to_dict())
+    elif not isinstance(data, EncodedReading):
+        data = EncodedReading(data)
+    sinks = _enabled_sinks()
+    active_sinks = [enabled[0] for enabled in sinks]
+    if sink is not None:
+        sinks = [enabled for enabled in sinks if enabled[0] == sink]
+    rollup = ROLLUP in data
+    if rollup:
+        sinks = [enabled for enabled in sinks if enabled[0] in _ROLLUP_SINKS]
+
+    if OUTBOX_ENABLE:
+        outbox = get_outbox()
+        if rollup:
+            # Addressed to every sink that takes it, so the other sinks never replay it
+            for name, _sender, _timeout, _batch in sinks:
+                outbox.append(data, name, active_sinks)
+        else:
+            outbox.append(data, sink, active_sinks)
+        jobs: List[Job] = [
+            (name, _deliver_pending, (name, sender, batch, outbox), timeout)
+            for name, sender, timeout, batch in sinks
+        ]
+    else:
+        jobs = [(name, _deliver, (sender, data), timeout) for name, sender, timeout, _batch in sinks]
+    return data, jobs
+
+
+def log_sink_results(sink_results: Dict[str, SinkResult]) -> None:
+    for name, sink_result in sink_results.items():
+        status = "ok" if sink_result.success else f"failed ({sink_result.error})"
+        logger.info(f"Sink {name}: {status} in {sink_result.latency * 1000:.0f} ms")
+
+
+def __getattr__(name):
+    # Sender classes are resolved lazily, importing their module on first access
+    sink = _SINKS_BY_SENDER.get(name)
+    if sink is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(timed_import(sink.module), sink.sender)
+
+
+def _get_sender(sink: Sink):
+    # A sender set on this module (for example by a test) takes precedence over the registry
+    return getattr(sys.modules[__name__], sink.sender)
+
 
-    if SENSOR_COMMUNITY_ENABLE:
+def _enabled_sinks() -> List[Tuple[str, Any, float, bool]]:
+    """
+    Return the name, sender class, timeout and batch support of every enabled sink.
+    Only the modules of enabled sinks are imported.
+    """
+    sinks = []
+    for sink in SINKS:
+        if not getattr(settings, sink.enable):
+            continue
         try:
-            SendDataSensorCommunity(data).send()
-        except Exception as e:
-            logger.error(f"Failed to send data to Sensor Community: {e}")
+            sender = _get_sender(sink)
+        except ImportError as e:
+            logger.error(f"Failed to load {sink.name} sink: {e}")
+            continue
+        sinks.append((sink.name, sender, getattr(settings, sink.timeout), sink.batch))
+    return sinks
+
+
+def sink_intervals() -> Dict[str, float]:
+    """
+    Return the push interval in seconds of every enabled sink, for the multi-rate scheduler.
+    """
+    return {
+        sink.name: getattr(settings, sink.interval)
+        for sink in SINKS
+        if sink.interval is not None and getattr(settings, sink.enable)
+    }
+
+
+def load_enabled_sinks() -> None:
+    """
+    Import the modules of every enabled sink ahead of the first reading.
+    """
+    _enabled_sinks()
+
+
+def _deliver(sender, data) -> None:
+    sender(data).send()
+
+
+def _deliver_pending(name, sender, batch, outbox) -> None:
+    """
+    Send every reading the sink has not acknowledged yet, in batches of OUTBOX_REPLAY_BATCH.
+    Sinks with send_batch get the whole batch at once as a columnar ReadingBatch, the others one reading at a time.
+    The cursor only moves past readings that were sent, so a failure resumes from there.
+    """
+    while True:
+        if batch:
+            ids, readings = outbox.pending_batch(name, OUTBOX_REPLAY_BATCH)
+            if not ids:
+                return
+            sender.send_batch(readings)
+            outbox.ack(name, ids[-1])
+        else:
+            rows = outbox.pending(name, OUTBOX_REPLAY_BATCH)
+            if not rows:
+                return
+            for reading_id, data in rows:
+                sender(data).send()
+                outbox.ack(name, reading_id)
+            ids = [reading_id for reading_id, _data in rows]
+
+        if len(ids) < OUTBOX_REPLAY_BATCH:
+            return
+
+
+def _send(name, deliver, args) -> SinkResult:
+    start = time.perf_counter()
+    try:
+        deliver(*args)
+    except Exception as e:
+        logger.error(f"Failed to send data to {name}: {e}")
+        return SinkResult(False, time.perf_counter() - start, str(e))
+    return SinkResult(True, time.perf_counter() - start)
 
-    if INFLUXDB_ENABLE:
+
+def _send_sequentially(jobs) -> Dict[str, SinkResult]:
+    return {name: _send(name, deliver, args) for name, deliver, args, _timeout in jobs}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SEND_DATA_MAX_WORKERS, thread_name_prefix="sink")
+        return _executor
+
+
+def _submit(executor, name, deliver, args) -> Optional["Future[SinkResult]"]:
+    """
+    Submit the send of a sink, or return None while its previous send is still running.
+    """
+    previous = _in_flight.get(name)
+    if previous is not None and not previous.done():
+        logger.warning(f"Skipping {name}: previous send is still running")
+        return None
+    future = executor.submit(_send, name, deliver, args)
+    _in_flight[name] = future
+    return future
+
+
+def _send_concurrently(jobs) -> Dict[str, SinkResult]:
+    """
+    Run every sink on the bounded thread pool, each one with its own deadline.
+    A sink that misses its deadline keeps running in the background and is skipped
+    until it finishes, so a hung endpoint never holds more than one worker.
+    """
+    executor = _get_executor()
+    start = time.monotonic()
+
+    results = {}
+    futures = []
+    for name, deliver, args, timeout in jobs:
+        future = _submit(executor, name, deliver, args)
+        if future is None:
+            results[name] = SinkResult(False, 0.0, "previous send still running")
+            continue
+        futures.append((name, future, timeout))
+
+    for name, future, timeout in futures:
+        remaining = max(0.0, start + timeout - time.monotonic())
         try:
-            SendDataInfluxDB(data).send()
-        except Exception as e:
-            logger.error(f"Failed to send data to InfluxDB: {e}")
-    
-    logger.info(f"Data processed: {data}")
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            logger.error(f"Failed to send data to {name}: timeout after {timeout}s")
+            results[name] = SinkResult(False, time.monotonic() - start, f"timeout after {timeout}s")
+
+    return results
+
+
+def close_send_data():
+    """
+    Stop the sink thread pool without waiting for hung sends,
+    then close the outbox and the long-lived connections of every imported sink.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+        _in_flight.clear()
+    close_outbox()
+    for sink in SINKS:
+        module = sys.modules.get(sink.module)
+        if sink.close and module is not None:
+            getattr(module, sink.close)()
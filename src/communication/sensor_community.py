@@ -1,5 +1,6 @@
 import logging
 import requests
+from src.communication.encoding import encode, json_bytes
 from src.settings import SENSOR_COMMUNITY_SENSOR_SDS011_ID, SENSOR_COMMUNITY_SENSOR_BME280_ID
 
 logger = logging.getLogger(__name__)
@@ -10,6 +11,10 @@ class SendDataSensorCommunity:
         self.data = data
         
     def send(self):
+        """
+        Push the PM and BME data. Both are tried, and the error of a failed push is raised afterwards
+        so the reading is not reported as sent.
+        """
         api_url = "https://api.sensor.community/v1/push-sensor-data/"
         header_pm = {
             "X-PIN": "1",
@@ -21,24 +26,36 @@ class SendDataSensorCommunity:
             "X-Sensor": SENSOR_COMMUNITY_SENSOR_BME280_ID,
             "Content-Type": "application/json"
         }
+        error = None
         # Enviar partículas
         try:
             logger.info("Sending PM data to Sensor Community")
-            response_pm = requests.post(api_url, headers=header_pm, json=self.pm(), timeout=10)
+            response_pm = requests.post(api_url, headers=header_pm, data=self.encoded_pm(), timeout=10)
             response_pm.raise_for_status()
             logger.info(f"PM data sent successfully: {response_pm.status_code}")
         except requests.exceptions.RequestException as e:
             logger.error(f"Error sending PM data: {e}")
+            error = e
 
         # Enviar clima 
         try:
             logger.info("Sending BME data to Sensor Community")
-            response_bme = requests.post(api_url, headers=headers_bme, json=self.bme(), timeout=10)
+            response_bme = requests.post(api_url, headers=headers_bme, data=self.encoded_bme(), timeout=10)
             response_bme.raise_for_status()
             logger.info(f"BME data sent successfully: {response_bme.status_code}")
         except requests.exceptions.RequestException as e:
             logger.error(f"Error sending BME data: {e}")
-        
+            error = e
+
+        if error is not None:
+            raise error
+
+    def encoded_pm(self):
+        return encode(self.data, "sensor_community_pm", lambda data: json_bytes(self.pm()))
+
+    def encoded_bme(self):
+        return encode(self.data, "sensor_community_bme", lambda data: json_bytes(self.bme()))
+
     def pm(self):
         return {
             "software_version": "rpi-weather-station-1.0",
@@ -1,8 +1,52 @@
-import json
+import base64
+import logging
+import threading
+from typing import Any, Dict, List
 
 import boto3
 
-from src.settings import SQS_ACCESS_KEY, SQS_QUEUE_NAME, SQS_REGION, SQS_SECRET_KEY, SQS_URL
+from src.communication.encoding import encode, encode_payload, iter_encoded
+from src.reading import Readings
+from src.settings import (
+    SQS_ACCESS_KEY,
+    SQS_BATCH_RETRIES,
+    SQS_BATCH_SIZE,
+    SQS_PAYLOAD_FORMAT,
+    SQS_QUEUE_NAME,
+    SQS_REGION,
+    SQS_SECRET_KEY,
+    SQS_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+# SendMessageBatch accepts at most 10 entries
+SQS_MAX_BATCH_SIZE = 10
+
+_sqs_queue = None
+_sqs_queue_lock = threading.Lock()
+
+
+def _message_body(payload) -> str:
+    # SQS message bodies are text, so compact payloads are sent in base64
+    if not isinstance(payload, dict):
+        return payload
+    if SQS_PAYLOAD_FORMAT == "compact":
+        return encode(payload, "compact_base64", _compact_base64)
+    return encode_payload(payload, SQS_PAYLOAD_FORMAT).decode("utf-8")
+
+
+def _compact_base64(payload) -> str:
+    return base64.b64encode(encode_payload(payload, "compact")).decode("ascii")
+
+
+def reset_sqs_queue():
+    """
+    Helper function to drop the cached queue so the next send resolves it again.
+    """
+    global _sqs_queue
+    with _sqs_queue_lock:
+        _sqs_queue = None
 
 
 class SQSClient:
@@ -12,7 +56,30 @@ class SQSClient:
 
     def send(self):
         queue = self._get_queue()
-        self._publish(queue, self.data)
+        try:
+            self._publish(queue, self.data)
+        except Exception:
+            reset_sqs_queue()
+            raise
+
+    @classmethod
+    def send_batch(cls, readings: Readings):
+        """
+        Send readings with SendMessageBatch, up to 10 per call.
+        Entries the queue rejects are retried, and an error is raised if any are still failing.
+        """
+        queue = cls._get_queue()
+        batch_size = min(SQS_BATCH_SIZE, SQS_MAX_BATCH_SIZE)
+        failed = []
+        try:
+            for start in range(0, len(readings), batch_size):
+                failed.extend(cls._publish_batch(queue, readings[start:start + batch_size]))
+        except Exception:
+            reset_sqs_queue()
+            raise
+
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(readings)} messages were not sent to SQS: {failed[0]}")
 
     @staticmethod
     def _sqs_client():
@@ -24,11 +91,45 @@ class SQSClient:
             region_name=SQS_REGION,
         )
 
-    def _get_queue(self):
-        return self._sqs_client().get_queue_by_name(QueueName=SQS_QUEUE_NAME)
+    @classmethod
+    def _get_queue(cls):
+        """
+        Return the queue, creating the boto3 resource and resolving the queue URL only once.
+        """
+        global _sqs_queue
+        with _sqs_queue_lock:
+            if _sqs_queue is None:
+                _sqs_queue = cls._sqs_client().get_queue_by_name(QueueName=SQS_QUEUE_NAME)
+            return _sqs_queue
 
     @staticmethod
     def _publish(queue, payload) -> None:
-        if isinstance(payload, dict):
-            payload = json.dumps(payload)
-        queue.send_message(MessageBody=payload)
+        queue.send_message(MessageBody=_message_body(payload))
+
+    @staticmethod
+    def _publish_batch(queue, payloads) -> List[Dict[str, Any]]:
+        """
+        Send one SendMessageBatch call and retry the entries that failed on the server side.
+        Returns the entries that could not be sent.
+        """
+        entries = [
+            {"Id": str(index), "MessageBody": _message_body(payload)}
+            for index, payload in enumerate(iter_encoded(payloads))
+        ]
+
+        rejected = []
+        failed = []
+        for _attempt in range(SQS_BATCH_RETRIES + 1):
+            response = queue.send_messages(Entries=entries)
+            # Sender faults (such as an invalid message) will not succeed on retry
+            rejected.extend(entry for entry in response.get("Failed", []) if entry.get("SenderFault"))
+            failed = [entry for entry in response.get("Failed", []) if not entry.get("SenderFault")]
+            if not failed:
+                break
+            retry_ids = {entry["Id"] for entry in failed}
+            entries = [entry for entry in entries if entry["Id"] in retry_ids]
+
+        failed = rejected + failed
+        for entry in failed:
+            logger.error(f"Failed to send message {entry['Id']} to SQS: {entry.get('Message')}")
+        return failed
@@ -0,0 +1,130 @@
+"""
+Multi-rate acquisition: every sensor and every sink runs on its own interval.
+"""
+import logging
+import threading
+import time
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional
+
+from src import settings
+from src.communication.send_data import send_data_nowait, sink_intervals
+from src.rollup import add_to_rollups
+from src.scheduler import MultiRateScheduler
+from src.sensors.acquisition import read_concurrently
+from src.sensors.registry import get_sensor_type
+from src.tsdb import store_reading
+
+logger = logging.getLogger(__name__)
+
+SINK_DATA_MODES = ("latest", "mean")
+
+
+class ReadingCollector:
+    """
+    Collects sensor measurements between the pushes of every sink.
+    In "latest" mode a sink gets the latest value of every field, in "mean" mode it gets
+    the mean of the numeric fields measured since its own previous push.
+    A sink that has nothing new since its previous push gets None.
+    """
+
+    def __init__(self, sinks: Iterable[str], mode: str = "latest"):
+        if mode not in SINK_DATA_MODES:
+            raise ValueError(f"Invalid sink data mode: {mode}")
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Any] = {}
+        # Per sink: field -> [sum, count] of the numeric values since the previous push
+        self._sums: Dict[str, Dict[str, List[float]]] = {sink: {} for sink in sinks}
+        self._fresh: Dict[str, bool] = {sink: False for sink in self._sums}
+
+    def add(self, measurement: Dict[str, Any], timestamp: Optional[float] = None) -> None:
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._latest.update(measurement)
+            self._latest["timestamp"] = timestamp
+            for sink, sums in self._sums.items():
+                self._fresh[sink] = True
+                if self.mode != "mean":
+                    continue
+                for field, value in measurement.items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    total = sums.setdefault(field, [0.0, 0])
+                    total[0] += value
+                    total[1] += 1
+
+    def take(self, sink: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the data for the push of `sink` and start a new interval for it.
+        """
+        with self._lock:
+            if not self._fresh[sink]:
+                return None
+            self._fresh[sink] = False
+            data = dict(self._latest)
+            if self.mode == "mean":
+                sums = self._sums[sink]
+                # Fields without a new value since the previous push are left out
+                data = {
+                    key: value for key, value in data.items()
+                    if key == "timestamp" or isinstance(value, str) or key in sums
+                }
+                data.update({field: total[0] / total[1] for field, total in sums.items()})
+                self._sums[sink] = {}
+            return data
+
+
+def read_sensor(name: str, sensor, collector: ReadingCollector) -> None:
+    """
+    Read a sensor within its read timeout. Finished rollups are handed to the sink thread pool.
+    """
+    sensor_type = get_sensor_type(name)
+    timeout = getattr(settings, sensor_type.timeout)
+    measurements = read_concurrently([(name, sensor.get_measurement, timeout)])
+    if name in measurements:
+        timestamp = time.time()
+        collector.add(measurements[name], timestamp)
+        measurement = {**measurements[name], "timestamp": timestamp}
+        store_reading(measurement)
+        for rollup in add_to_rollups(measurement):
+            send_data_nowait(rollup)
+
+
+def push_sink(name: str, collector: ReadingCollector) -> None:
+    """
+    Hand the collected data of a sink to the sink thread pool without waiting, so a slow sink
+    never delays the other tasks of the scheduler.
+    """
+    data = collector.take(name)
+    if data is None:
+        logger.debug(f"No new data for {name}")
+        return
+    send_data_nowait(data, sink=name)
+
+
+def create_multirate_scheduler(
+    sensors: Dict[str, Any], mode: str = settings.MULTIRATE_SINK_DATA
+) -> MultiRateScheduler:
+    """
+    Schedule every sensor on its <SENSOR>_INTERVAL and every enabled sink on its <SINK>_SEND_INTERVAL.
+    Sensors are added first, so a sink due at the same time as a sensor gets its new measurement.
+    """
+    intervals = sink_intervals()
+    collector = ReadingCollector(intervals, mode)
+    scheduler = MultiRateScheduler()
+    schedule = []
+
+    for name, sensor in sensors.items():
+        if sensor is None:
+            continue
+        interval = getattr(settings, get_sensor_type(name).interval)
+        scheduler.add(name, interval, partial(read_sensor, name, sensor, collector))
+        schedule.append(f"{name} every {interval:g}s")
+
+    for name, interval in intervals.items():
+        scheduler.add(name, interval, partial(push_sink, name, collector))
+        schedule.append(f"{name} every {interval:g}s")
+
+    logger.info(f"Multi-rate schedule: {', '.join(schedule) or 'empty'}")
+    return scheduler
@@ -0,0 +1,240 @@
+"""
+Fixed-schema weather reading and columnar batch of readings.
+"""
+import math
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Union, overload
+
+# Numeric fields, in the order of the legacy reading dictionaries
+NUMERIC_FIELDS = (
+    "timestamp",
+    "pm25",
+    "pm10",
+    "temperature_farenheit",
+    "temperature_celsius",
+    "humidity",
+    "pressure",
+)
+TAG_FIELDS = ("sensor_air_quality", "sensor_temp_hum")
+
+# Key order of get_weather: timestamp, then SDS011 keys, then BME280 keys
+DICT_ORDER = (
+    "timestamp",
+    "sensor_air_quality",
+    "pm25",
+    "pm10",
+    "sensor_temp_hum",
+    "temperature_farenheit",
+    "temperature_celsius",
+    "humidity",
+    "pressure",
+)
+
+_SCHEMA_FIELDS = frozenset(DICT_ORDER)
+# Bit of every schema key in the presence mask of a batched reading
+_KEY_BITS = {key: 1 << bit for bit, key in enumerate(DICT_ORDER)}
+_MISSING = object()
+
+
+class Reading:
+    """
+    One weather reading with a fixed schema.
+    Uses __slots__ so a reading takes a fraction of the memory of a dictionary.
+    Fields that were never set are left out of to_dict(), fields set to None are kept,
+    and keys outside the schema are kept in `extra`.
+    """
+
+    __slots__ = DICT_ORDER + ("extra",)
+
+    def __init__(self, **fields):
+        self.extra: Optional[Dict[str, Any]] = None
+        self.update(fields)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Reading":
+        return cls(**data)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        """
+        Merge a sensor measurement into the reading, like dict.update.
+        """
+        for key, value in data.items():
+            if key in _SCHEMA_FIELDS:
+                setattr(self, key, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _SCHEMA_FIELDS:
+            return getattr(self, key, default)
+        if self.extra is None:
+            return default
+        return self.extra.get(key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the reading as a dictionary, for existing callers and sinks.
+        """
+        data = {}
+        for key in DICT_ORDER:
+            try:
+                data[key] = getattr(self, key)
+            except AttributeError:
+                continue
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other):
+        if not isinstance(other, Reading):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Reading({self.to_dict()})"
+
+
+class ReadingBatch:
+    """
+    Columnar batch of readings: one array('d') per numeric field, one list per tag, and the keys outside
+    the schema of every reading in `extra`. It holds the readings that build up between two sends, like an
+    outbox replay or a sampling window, in a fraction of the memory of a list of dictionaries.
+    view() returns a zero-copy memoryview of a column, which NumPy wraps with numpy.frombuffer. The batch
+    cannot grow or shrink while a view is alive, array raises BufferError.
+    Numeric fields that are missing or None are stored as NaN, and a mask per reading keeps which keys
+    the reading had, so to_dicts() returns the readings the batch was built from. Integers come back as
+    floats, and numeric fields holding anything else than a number are kept in `extra`.
+    `encoded` holds the JSON of every reading when it is already known, such as the text stored in the
+    outbox, so sinks do not encode it again.
+    """
+
+    __slots__ = ("columns", "tags", "extra", "encoded", "_present")
+
+    def __init__(self, readings: Iterable[Union[Reading, Mapping[str, Any]]] = ()):
+        self.columns = {field: array("d") for field in NUMERIC_FIELDS}
+        self.tags: Dict[str, List[Any]] = {tag: [] for tag in TAG_FIELDS}
+        self.extra: List[Optional[Dict[str, Any]]] = []
+        self.encoded: List[Optional[bytes]] = []
+        self._present = array("I")
+        self.extend(readings)
+
+    def append(self, reading: Union[Reading, Mapping[str, Any]], encoded: Optional[bytes] = None) -> None:
+        """
+        Append a Reading or a reading dictionary, with its JSON when it is known.
+        """
+        data = reading.to_dict() if isinstance(reading, Reading) else reading
+        present = 0
+        extra = {key: value for key, value in data.items() if key not in _SCHEMA_FIELDS}
+        numbers = []
+        for field in NUMERIC_FIELDS:
+            value = data.get(field, _MISSING)
+            if value is _MISSING:
+                numbers.append(math.nan)
+                continue
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                extra[field] = value
+                numbers.append(math.nan)
+                continue
+            present |= _KEY_BITS[field]
+            numbers.append(math.nan if value is None else float(value))
+        tags = []
+        for tag in TAG_FIELDS:
+            value = data.get(tag, _MISSING)
+            if value is not _MISSING:
+                present |= _KEY_BITS[tag]
+            tags.append(None if value is _MISSING else value)
+
+        # Every value is converted before the first column grows, and a column that cannot grow because
+        # a view of it is alive undoes the others, so the columns keep the same length
+        grown = []
+        try:
+            for field, number in zip(NUMERIC_FIELDS, numbers):
+                self.columns[field].append(number)
+                grown.append(self.columns[field])
+            self._present.append(present)
+        except BufferError:
+            for column in grown:
+                column.pop()
+            raise
+        for tag, value in zip(TAG_FIELDS, tags):
+            self.tags[tag].append(value)
+        self.extra.append(extra or None)
+        self.encoded.append(encoded)
+
+    def extend(self, readings: Iterable[Union[Reading, Mapping[str, Any]]]) -> None:
+        for reading in readings:
+            self.append(reading)
+
+    def view(self, field: str) -> memoryview:
+        """
+        Return the column of a numeric field without copying it.
+        """
+        return memoryview(self.columns[field])
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """
+        Rebuild the dictionary of the reading at `index`, for the sinks that send JSON.
+        """
+        present = self._present[index]
+        data: Dict[str, Any] = {}
+        for key in DICT_ORDER:
+            if not present & _KEY_BITS[key]:
+                continue
+            if key in self.columns:
+                value = self.columns[key][index]
+                data[key] = None if math.isnan(value) else value
+            else:
+                data[key] = self.tags[key][index]
+        extra = self.extra[index]
+        if extra:
+            data.update(extra)
+        return data
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [self.row(index) for index in range(len(self))]
+
+    def drop_oldest(self, count: int) -> None:
+        """
+        Remove the first `count` readings.
+        The columns are replaced rather than resized, so views of the old columns stay valid.
+        """
+        self.columns = {field: column[count:] for field, column in self.columns.items()}
+        self.tags = {tag: values[count:] for tag, values in self.tags.items()}
+        self.extra = self.extra[count:]
+        self.encoded = self.encoded[count:]
+        self._present = self._present[count:]
+
+    def __len__(self) -> int:
+        return len(self._present)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    @overload
+    def __getitem__(self, index: int) -> Dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "ReadingBatch": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], "ReadingBatch"]:
+        if not isinstance(index, slice):
+            return self.row(range(len(self))[index])
+        batch = ReadingBatch()
+        batch.columns = {field: column[index] for field, column in self.columns.items()}
+        batch.tags = {tag: values[index] for tag, values in self.tags.items()}
+        batch.extra = self.extra[index]
+        batch.encoded = self.encoded[index]
+        batch._present = self._present[index]
+        return batch
+
+    def __repr__(self):
+        return f"ReadingBatch({self.to_dicts()})"
+
+
+# A single reading, as built by the main loop or as a dictionary
+ReadingLike = Union[Reading, Mapping[str, Any]]
+# A batch of readings as the sinks with send_batch receive it
+Readings = Union[List[Dict[str, Any]], ReadingBatch]
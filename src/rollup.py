@@ -0,0 +1,181 @@
+"""
+Incremental rollups of the readings into 1-minute, 1-hour and 1-day buckets.
+"""
+import logging
+import math
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.reading import NUMERIC_FIELDS, TAG_FIELDS, ReadingLike
+from src.settings import ROLLUP_ENABLE, ROLLUP_RESOLUTIONS, TSDB_ENABLE
+from src.tsdb import get_tsdb
+
+logger = logging.getLogger(__name__)
+
+# Key holding the resolution of a rollup record, such as "1m"
+ROLLUP = "rollup"
+STATISTICS = ("min", "max", "mean", "count", "last")
+FIELDS = NUMERIC_FIELDS[1:]
+# Fields of a rollup record besides "timestamp", "count", the rollup key and the tags
+ROLLUP_FIELDS = tuple(f"{field}_{statistic}" for field in FIELDS for statistic in STATISTICS)
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_rollup_engine_instance = None
+_rollup_engine_lock = threading.Lock()
+
+
+def parse_resolutions(spec: str) -> List[Tuple[str, int]]:
+    """
+    Parse a comma separated list like "1m,1h,1d" into names and bucket sizes in seconds.
+    """
+    resolutions = []
+    for name in (part.strip() for part in spec.split(",")):
+        if not name:
+            continue
+        match = re.fullmatch(r"([1-9][0-9]*)([smhd])", name)
+        if match is None:
+            raise ValueError(f"Invalid rollup resolution {name!r}, expected a number and s, m, h or d")
+        resolutions.append((name, int(match.group(1)) * _UNITS[match.group(2)]))
+    return resolutions
+
+
+def get_rollup_engine(rebuild_until: Optional[float] = None):
+    """
+    Helper function to get the shared RollupEngine instance, creating it on first use.
+    With TSDB_ENABLE, a new engine is rebuilt from the readings stored before `rebuild_until`.
+    """
+    global _rollup_engine_instance
+    with _rollup_engine_lock:
+        if _rollup_engine_instance is None:
+            engine = RollupEngine(parse_resolutions(ROLLUP_RESOLUTIONS))
+            if TSDB_ENABLE and rebuild_until is not None:
+                engine.rebuild(get_tsdb(), rebuild_until)
+            _rollup_engine_instance = engine
+        return _rollup_engine_instance
+
+
+def add_to_rollups(data: ReadingLike) -> List[Dict[str, Any]]:
+    """
+    Add a reading to the rollups when ROLLUP_ENABLE is set and return the buckets it finished.
+    Errors are logged, never raised.
+    """
+    if not ROLLUP_ENABLE:
+        return []
+    try:
+        return get_rollup_engine(data.get("timestamp")).add(data)
+    except Exception as e:
+        logger.error(f"Failed to update rollups: {e}")
+        return []
+
+
+class _Bucket:
+    """
+    Running statistics of one bucket: count, sum, min, max and last value per field.
+    """
+
+    __slots__ = ("start", "count", "stats", "tags")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.stats: Dict[str, List[float]] = {}
+        self.tags: Dict[str, Any] = {}
+
+    def add(self, data: ReadingLike) -> None:
+        self.count += 1
+        for field in FIELDS:
+            value = data.get(field)
+            if value is None or isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+                continue
+            stats = self.stats.get(field)
+            if stats is None:
+                self.stats[field] = [1, value, value, value, value]
+                continue
+            stats[0] += 1
+            stats[1] += value
+            if value < stats[2]:
+                stats[2] = value
+            if value > stats[3]:
+                stats[3] = value
+            stats[4] = value
+        for tag in TAG_FIELDS:
+            if data.get(tag) is not None:
+                self.tags[tag] = data[tag]
+
+    def record(self, resolution: str) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"timestamp": self.start, ROLLUP: resolution, **self.tags, "count": self.count}
+        for field, (count, total, minimum, maximum, last) in self.stats.items():
+            record[f"{field}_min"] = minimum
+            record[f"{field}_max"] = maximum
+            record[f"{field}_mean"] = total / count
+            record[f"{field}_count"] = count
+            record[f"{field}_last"] = last
+        return record
+
+
+class RollupEngine:
+    """
+    Keeps one open bucket per resolution and updates it in O(1) as each reading arrives, without
+    rescanning. Buckets are aligned on the Unix epoch (UTC days). A bucket is finished, and returned
+    as a rollup record, when the first reading of a later bucket arrives. Readings older than the
+    open bucket are skipped for that resolution. Open buckets only live in memory; rebuild() restores
+    them from the time-series store after a restart.
+    """
+
+    def __init__(self, resolutions: Sequence[Tuple[str, int]]):
+        self.resolutions = tuple(resolutions)
+        self.late = 0
+        self._buckets: List[Optional[_Bucket]] = [None] * len(self.resolutions)
+        self._lock = threading.Lock()
+
+    def add(self, data: ReadingLike) -> List[Dict[str, Any]]:
+        """
+        Add a reading and return the records of the buckets it finished, finest resolution first.
+        """
+        timestamp = data.get("timestamp")
+        if timestamp is None:
+            return []
+        finished = []
+        with self._lock:
+            for index, (name, seconds) in enumerate(self.resolutions):
+                start = timestamp - timestamp % seconds
+                bucket = self._buckets[index]
+                if bucket is None or start > bucket.start:
+                    if bucket is not None:
+                        finished.append(bucket.record(name))
+                    bucket = self._buckets[index] = _Bucket(start)
+                elif start < bucket.start:
+                    self.late += 1
+                    continue
+                bucket.add(data)
+        return finished
+
+    def rebuild(self, store, until: float) -> int:
+        """
+        Replay the readings of `store` from the start of the previous bucket of the coarsest resolution
+        up to `until`, so the open buckets cover their whole interval after a restart. Buckets finished
+        during the replay were sent before and are not returned again, and the buckets left open, which
+        were never sent, are finished by the next reading. Returns the number of replayed readings.
+        """
+        if not self.resolutions:
+            return 0
+        seconds = max(seconds for _name, seconds in self.resolutions)
+        start = until - until % seconds - seconds
+        readings = store.query(start, until)
+        for data in readings:
+            self.add(data)
+        logger.info(f"Rebuilt rollups from {len(readings)} stored readings")
+        return len(readings)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """
+        Return the records of the open buckets, for example to show the current hour.
+        """
+        with self._lock:
+            return [
+                bucket.record(name)
+                for (name, _seconds), bucket in zip(self.resolutions, self._buckets)
+                if bucket is not None
+            ]
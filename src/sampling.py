@@ -0,0 +1,123 @@
+"""
+High-rate sampling engine with windowed aggregation per reporting interval.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from src.reading import NUMERIC_FIELDS, ReadingBatch
+from src.sensors.watchdog import SensorWatchdog
+from src.settings import SAMPLING_RATE_HZ, SAMPLING_WINDOW_SIZE
+from src.utils import celsius_to_fahrenheit
+
+logger = logging.getLogger(__name__)
+
+SAMPLED_FIELDS = ("temperature_celsius", "humidity", "pressure")
+
+
+class SamplingEngine:
+    """
+    Polls a sensor at a fixed rate in a background thread into a columnar ReadingBatch of at most
+    `window_size` samples, dropping the oldest ones once it is full.
+    get_measurement() reduces the window collected since the previous report, through zero-copy
+    NumPy views of its columns, to
+    mean, min, max, stddev and sample count, so short dips and spikes are not missed.
+    It has the same interface as a sensor and can be passed to get_weather in its place.
+    """
+
+    def __init__(
+        self,
+        sensor,
+        rate_hz: float = SAMPLING_RATE_HZ,
+        window_size: int = SAMPLING_WINDOW_SIZE,
+        fields: Tuple[str, ...] = SAMPLED_FIELDS,
+    ):
+        unknown = set(fields) - set(NUMERIC_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot sample fields outside the reading schema: {', '.join(sorted(unknown))}")
+        self.sensor = sensor
+        self.period = 1 / rate_hz
+        self.fields = fields
+        self.window_size = window_size
+        self._window = ReadingBatch()
+        self._sensor_name: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.period * 2)
+        self._thread = None
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._stop.is_set():
+            self.sample_once()
+            next_sample += self.period
+            delay = next_sample - time.monotonic()
+            if delay < 0:
+                # Sensor slower than the sampling rate, restart the schedule from now
+                next_sample = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def sample_once(self):
+        """
+        Read the sensor once and add the sample to the window.
+        A sensor the watchdog marked degraded is skipped until it is re-initialized, the watchdog logs both.
+        """
+        if isinstance(self.sensor, SensorWatchdog) and self.sensor.degraded:
+            return
+        try:
+            measurement = self.sensor.get_measurement()
+        except Exception as e:
+            logger.error(f"Error sampling sensor: {e}")
+            return
+
+        with self._lock:
+            if len(self._window) >= self.window_size:
+                self._window.drop_oldest(len(self._window) - self.window_size + 1)
+            self._window.append(measurement)
+            self._sensor_name = measurement.get("sensor_temp_hum", self._sensor_name)
+
+    def get_measurement(self) -> Dict[str, Any]:
+        """
+        Aggregate and clear the samples collected since the previous call.
+        """
+        with self._lock:
+            window, self._window = self._window, ReadingBatch()
+            sensor_name = self._sensor_name
+
+        if not len(window):
+            raise RuntimeError("No samples collected in this interval")
+
+        result: Dict[str, Any] = {"sensor_temp_hum": sensor_name, "sample_count": len(window)}
+        for field in self.fields:
+            column = np.frombuffer(window.view(field), dtype=np.float64)
+            # Missing values do not contribute to the mean, min, max or stddev
+            values = column[~np.isnan(column)]
+            if not len(values):
+                result[field] = None
+                continue
+            mean = values.mean()
+            result[field] = float(mean)
+            result[f"{field}_min"] = float(values.min())
+            result[f"{field}_max"] = float(values.max())
+            result[f"{field}_stddev"] = float(np.sqrt(((values - mean) ** 2).mean()))
+
+        if result.get("temperature_celsius") is not None:
+            result["temperature_farenheit"] = celsius_to_fahrenheit(result["temperature_celsius"])
+
+        return result
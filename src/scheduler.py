@@ -0,0 +1,222 @@
+"""
+Drift-free schedulers for the main loop.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from src.settings import LOOP_ALIGN, LOOP_OVERRUN_POLICY
+
+logger = logging.getLogger(__name__)
+
+OVERRUN_POLICIES = ("skip", "compress")
+
+# A change of the wall clock to monotonic offset above this many seconds is treated as a clock jump
+CLOCK_JUMP_THRESHOLD = 1.0
+
+
+class TickStats(NamedTuple):
+    """
+    Timing of one tick.
+    scheduled is the wall clock time the tick was due, lateness and duration are in seconds
+    and skipped is the number of ticks dropped after this one because it overran.
+    """
+
+    scheduled: float
+    lateness: float
+    duration: float
+    skipped: int = 0
+
+
+class Scheduler:
+    """
+    Runs a task every `interval` seconds on deadlines taken from time.monotonic(),
+    so the time spent in the task does not add up to the period.
+    With `align`, ticks fall on wall clock multiples of the interval (:00/:15/:30/:45 for 15 minutes)
+    and the schedule is realigned when the wall clock jumps, for example after an NTP sync.
+    When a tick overruns one or more deadlines, "skip" drops the missed ticks and waits for the next one,
+    "compress" runs one tick immediately in place of the missed ones.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        align: bool = LOOP_ALIGN,
+        overrun_policy: str = LOOP_OVERRUN_POLICY,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        if interval <= 0:
+            raise ValueError(f"Invalid scheduler interval: {interval}")
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Invalid overrun policy: {overrun_policy}")
+        self.interval = interval
+        self.align = align
+        self.overrun_policy = overrun_policy
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._offset = wall_clock() - clock()
+        self._stop = threading.Event()
+        self.last_tick: Optional[TickStats] = None
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+
+    def next_boundary(self, now: float) -> float:
+        """
+        Return the monotonic time of the first wall clock multiple of the interval after `now`.
+        """
+        wall = now + self._offset
+        boundary = (wall // self.interval + 1) * self.interval
+        return boundary - self._offset
+
+    def run(self, task: Callable[[], None], max_ticks: Optional[int] = None) -> None:
+        """
+        Run the task now and then on every tick until stop() is called or `max_ticks` ticks ran.
+        """
+        self._stop.clear()
+        deadline = self._clock()
+        ticks = 0
+        while max_ticks is None or ticks < max_ticks:
+            delay = deadline - self._clock()
+            if delay > 0 and self._wait(delay):
+                break
+            if self._stop.is_set():
+                break
+
+            start = self._clock()
+            jumped = self._check_clock_jump(start)
+            try:
+                task()
+            finally:
+                end = self._clock()
+                jumped = self._check_clock_jump(end) or jumped
+                deadline = self._next_deadline(deadline, start, end, jumped and self.align)
+                ticks += 1
+
+    def _next_deadline(self, deadline: float, start: float, end: float, realign: bool) -> float:
+        """
+        Record the stats of the tick that was due at `deadline` and return the next deadline.
+        """
+        scheduled = deadline + self._offset
+        lateness = max(start - deadline, 0.0)
+        duration = end - start
+
+        if realign or (self.align and self.ticks == 0):
+            next_deadline = self.next_boundary(start)
+        else:
+            next_deadline = deadline + self.interval
+
+        skipped = 0
+        if next_deadline <= end:
+            missed = int((end - next_deadline) // self.interval) + 1
+            last_missed = next_deadline + (missed - 1) * self.interval
+            if self.overrun_policy == "compress":
+                next_deadline = last_missed
+                skipped = missed - 1
+            else:
+                next_deadline = last_missed + self.interval
+                skipped = missed
+            self.overruns += 1
+            self.skipped_ticks += skipped
+            logger.warning(f"Tick took {duration:.2f}s and overran the schedule, skipping {skipped} tick(s)")
+
+        self.ticks += 1
+        self.last_tick = TickStats(scheduled, lateness, duration, skipped)
+        logger.debug(f"Tick was {lateness * 1000:.0f} ms late and took {duration * 1000:.0f} ms")
+        return next_deadline
+
+    def _check_clock_jump(self, now: float) -> bool:
+        offset = self._wall_clock() - now
+        jump = offset - self._offset
+        if abs(jump) <= CLOCK_JUMP_THRESHOLD:
+            return False
+        logger.warning(f"Wall clock jumped by {jump:.1f}s, realigning the schedule")
+        self._offset = offset
+        return True
+
+    def _wait(self, delay: float) -> bool:
+        """
+        Sleep until the next deadline, returns True when the scheduler was stopped.
+        """
+        return self._stop.wait(delay)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class MultiRateScheduler:
+    """
+    Runs many tasks, each on its own interval, from one event loop.
+    The next due time of every task is kept in a heapq priority queue, so each step only
+    looks at the earliest task. Tasks due at the same time run in the order they were added.
+    A task that overruns its next deadline skips the missed runs.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self._clock = clock
+        self._offset = wall_clock() - clock()
+        self._queue: List[Tuple[float, int, str]] = []
+        self._tasks: Dict[str, Tuple[float, Callable[[], None]]] = {}
+        self._order = itertools.count()
+        self._stop = threading.Event()
+        self.stats: Dict[str, TickStats] = {}
+
+    def add(self, name: str, interval: float, task: Callable[[], None], delay: float = 0.0) -> None:
+        """
+        Run `task` every `interval` seconds, the first time after `delay` seconds.
+        """
+        if interval <= 0:
+            raise ValueError(f"Invalid interval for {name}: {interval}")
+        self._tasks[name] = (interval, task)
+        heapq.heappush(self._queue, (self._clock() + delay, next(self._order), name))
+
+    def run(self, max_runs: Optional[int] = None) -> None:
+        """
+        Run the tasks as they come due until stop() is called or `max_runs` tasks ran.
+        """
+        self._stop.clear()
+        runs = 0
+        while self._queue and (max_runs is None or runs < max_runs):
+            due, _order, name = self._queue[0]
+            delay = due - self._clock()
+            if delay > 0 and self._wait(delay):
+                break
+            if self._stop.is_set():
+                break
+
+            heapq.heappop(self._queue)
+            interval, task = self._tasks[name]
+            start = self._clock()
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Error in {name} task: {e}")
+            end = self._clock()
+
+            next_due = due + interval
+            skipped = 0
+            if next_due <= end:
+                skipped = int((end - next_due) // interval) + 1
+                next_due += skipped * interval
+                logger.warning(f"{name} took {end - start:.2f}s and overran its interval, skipping {skipped} run(s)")
+            heapq.heappush(self._queue, (next_due, next(self._order), name))
+
+            self.stats[name] = TickStats(due + self._offset, max(start - due, 0.0), end - start, skipped)
+            runs += 1
+
+    def _wait(self, delay: float) -> bool:
+        """
+        Sleep until the next task is due, returns True when the scheduler was stopped.
+        """
+        return self._stop.wait(delay)
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,72 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (name, read function, timeout in seconds)
+SensorRead = Tuple[str, Callable[[], Dict[str, Any]], float]
+
+
+def read_sequentially(reads: Sequence[SensorRead]) -> Dict[str, Dict[str, Any]]:
+    """
+    Read each sensor one after another.
+    Returns a dictionary with the measurement of every sensor that succeeded.
+    """
+    results = {}
+    for name, read, _timeout in reads:
+        try:
+            results[name] = read()
+        except Exception as e:
+            logger.error(f"Error reading {name} sensor: {e}")
+    return results
+
+
+def read_concurrently(reads: Sequence[SensorRead]) -> Dict[str, Dict[str, Any]]:
+    """
+    Read every sensor in its own worker thread.
+    All reads start at the same time and each one has its own deadline, so the
+    cycle takes as long as the slowest sensor instead of the sum of all of them.
+    A read that misses its deadline is logged and left out of the result.
+    """
+    if not reads:
+        return {}
+
+    executor = ThreadPoolExecutor(max_workers=len(reads), thread_name_prefix="sensor")
+    start = time.monotonic()
+    futures = [(name, executor.submit(read), timeout) for name, read, timeout in reads]
+
+    results = {}
+    try:
+        for name, future, timeout in futures:
+            remaining = max(0.0, start + timeout - time.monotonic())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                logger.error(f"Timeout reading {name} sensor after {timeout}s")
+            except Exception as e:
+                logger.error(f"Error reading {name} sensor: {e}")
+    finally:
+        # Do not wait for reads that missed their deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def read_per_bus(reads_by_bus: Dict[str, List[SensorRead]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the buses concurrently and the sensors sharing a bus one after another,
+    since an I2C bus, multiplexer or serial port only serves one transaction at a time.
+    The deadline of a bus is the sum of the deadlines of its sensors.
+    """
+    bus_reads = [
+        (bus, partial(read_sequentially, reads), sum((timeout for _name, _read, timeout in reads), 0.0))
+        for bus, reads in reads_by_bus.items()
+    ]
+    results = {}
+    for measurements in read_concurrently(bus_reads).values():
+        results.update(measurements)
+    return results
@@ -0,0 +1,95 @@
+"""
+BME280 raw data parsing and compensation, following the floating point formulas of the Bosch datasheet.
+"""
+from typing import NamedTuple, Optional, Sequence
+
+# First data register, pressure, temperature and humidity follow in one 8-byte burst
+DATA_REGISTER = 0xF7
+DATA_LENGTH = 8
+
+
+class BME280Snapshot(NamedTuple):
+    """
+    Temperature, humidity and pressure compensated from one sample.
+    t_fine is the fine temperature shared by the pressure and humidity compensation.
+    """
+
+    temperature: float
+    humidity: Optional[float]
+    pressure: Optional[float]
+    t_fine: int
+
+
+def parse_burst(data: Sequence[int]):
+    """
+    Split the registers 0xF7-0xFE into the raw 20-bit pressure, 20-bit temperature and 16-bit humidity.
+    """
+    adc_p = (data[0] << 12) | (data[1] << 4) | (data[2] >> 4)
+    adc_t = (data[3] << 12) | (data[4] << 4) | (data[5] >> 4)
+    adc_h = (data[6] << 8) | data[7]
+    return adc_t, adc_p, adc_h
+
+
+def compensate_temperature(adc_t: int, calib: Sequence[int]) -> int:
+    """
+    Return t_fine, the temperature in degrees Celsius is t_fine / 5120.
+    """
+    t1, t2, t3 = calib
+    var1 = (adc_t / 16384.0 - t1 / 1024.0) * t2
+    var2 = (adc_t / 131072.0 - t1 / 8192.0) ** 2 * t3
+    return int(var1 + var2)
+
+
+def compensate_pressure(adc_p: int, t_fine: int, calib: Sequence[int]) -> Optional[float]:
+    """
+    Return the pressure in hPa, or None when the calibration would divide by zero.
+    """
+    p1, p2, p3, p4, p5, p6, p7, p8, p9 = calib
+    var1 = t_fine / 2.0 - 64000.0
+    var2 = var1 * var1 * p6 / 32768.0
+    var2 = var2 + var1 * p5 * 2.0
+    var2 = var2 / 4.0 + p4 * 65536.0
+    var3 = p3 * var1 * var1 / 524288.0
+    var1 = (var3 + p2 * var1) / 524288.0
+    var1 = (1.0 + var1 / 32768.0) * p1
+    if not var1:
+        return None
+    pressure = 1048576.0 - adc_p
+    pressure = ((pressure - var2 / 4096.0) * 6250.0) / var1
+    var1 = p9 * pressure * pressure / 2147483648.0
+    var2 = pressure * p8 / 32768.0
+    pressure = pressure + (var1 + var2 + p7) / 16.0
+    return pressure / 100
+
+
+def compensate_humidity(adc_h: int, t_fine: int, calib: Sequence[int]) -> float:
+    """
+    Return the relative humidity in percent, clamped to 0-100.
+    """
+    h1, h2, h3, h4, h5, h6 = calib
+    var1 = t_fine - 76800.0
+    var2 = h4 * 64.0 + (h5 / 16384.0) * var1
+    var3 = adc_h - var2
+    var4 = h2 / 65536.0
+    var5 = 1.0 + (h3 / 67108864.0) * var1
+    var6 = 1.0 + (h6 / 67108864.0) * var1 * var5
+    var6 = var3 * var4 * (var5 * var6)
+    humidity = var6 * (1.0 - h1 * var6 / 524288.0)
+    return min(max(humidity, 0.0), 100.0)
+
+
+def compensate(
+    data: Sequence[int],
+    temperature_calib: Sequence[int],
+    pressure_calib: Sequence[int],
+    humidity_calib: Sequence[int],
+) -> BME280Snapshot:
+    """
+    Compensate one 8-byte burst, computing t_fine once for all three values.
+    A skipped measurement (raw value 0x80000 or 0x8000) gives None.
+    """
+    adc_t, adc_p, adc_h = parse_burst(data)
+    t_fine = compensate_temperature(adc_t, temperature_calib)
+    pressure = None if adc_p == 0x80000 else compensate_pressure(adc_p, t_fine, pressure_calib)
+    humidity = None if adc_h == 0x8000 else compensate_humidity(adc_h, t_fine, humidity_calib)
+    return BME280Snapshot(t_fine / 5120.0, humidity, pressure, t_fine)
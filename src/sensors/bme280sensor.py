@@ -1,32 +1,130 @@
+import time
+
 import adafruit_bme280.advanced as adafruit_bme280
 import board
 
+from src.sensors.bme280_compensation import DATA_LENGTH, DATA_REGISTER, BME280Snapshot, compensate
+from src.settings import (
+    BME280_IIR_FILTER,
+    BME280_MODE,
+    BME280_OVERSAMPLING_HUMIDITY,
+    BME280_OVERSAMPLING_PRESSURE,
+    BME280_OVERSAMPLING_TEMPERATURE,
+)
+from src.startup import timed_import
 from src.utils import celsius_to_fahrenheit
 
+OVERSAMPLING_RATES = (0, 1, 2, 4, 8, 16)
+# The pressure and humidity compensation need t_fine from the temperature, so it cannot be skipped
+TEMPERATURE_OVERSAMPLING_RATES = (1, 2, 4, 8, 16)
+IIR_COEFFICIENTS = (0, 2, 4, 8, 16)
+STATUS_MEASURING = 0x08
+# Polling of the status register when a conversion takes longer than the typical time
+STATUS_POLL_INTERVAL = 0.002
+STATUS_POLL_LIMIT = 25
+
+
+def measurement_time(temperature: int, pressure: int, humidity: int) -> float:
+    """
+    Return the maximum duration in seconds of a forced conversion, from datasheet appendix B.
+    An oversampling of 0 skips that measurement.
+    """
+    milliseconds = 1.25 + 2.3 * temperature
+    if pressure:
+        milliseconds += 2.3 * pressure + 0.575
+    if humidity:
+        milliseconds += 2.3 * humidity + 0.575
+    return milliseconds / 1000
+
+
+def _oversampling(rate: int, rates=OVERSAMPLING_RATES):
+    if rate not in rates:
+        raise ValueError(f"Invalid BME280 oversampling: {rate}, expected one of {rates}")
+    return adafruit_bme280.OVERSCAN_DISABLE if rate == 0 else getattr(adafruit_bme280, f"OVERSCAN_X{rate}")
+
+
+def _iir_filter(coefficient: int):
+    if coefficient not in IIR_COEFFICIENTS:
+        raise ValueError(f"Invalid BME280 IIR filter: {coefficient}, expected one of {IIR_COEFFICIENTS}")
+    if coefficient == 0:
+        return adafruit_bme280.IIR_FILTER_DISABLE
+    return getattr(adafruit_bme280, f"IIR_FILTER_X{coefficient}")
+
+
+def _i2c_bus(mux_address=None, mux_channel=None):
+    i2c = board.I2C()  # uses board.SCL and board.SDA
+    if mux_address is None:
+        return i2c
+    # Channel of a TCA9548A multiplexer, the library is only needed on masts that have one
+    adafruit_tca9548a = timed_import("adafruit_tca9548a")
+    return adafruit_tca9548a.TCA9548A(i2c, address=int(str(mux_address), 0))[int(mux_channel)]
+
 
 class BME280Sensor:
-    def __init__(self):
-        self.address = 0x77
-        i2c = board.I2C()  # uses board.SCL and board.SDA
+    def __init__(self, address=0x77, mux_address=None, mux_channel=None):
+        self.address = int(str(address), 0)
+        i2c = _i2c_bus(mux_address, mux_channel)
         self.sensor = adafruit_bme280.Adafruit_BME280_I2C(i2c, address=self.address)
-        # Configure the sensor for higher accuracy
         self.sensor.sea_level_pressure = 1013.25  # Standard sea level pressure in hPa
-        self.sensor.mode = adafruit_bme280.MODE_NORMAL
-        self.sensor.standby_period = adafruit_bme280.STANDBY_TC_500
-        self.sensor.iir_filter = adafruit_bme280.IIR_FILTER_X16
-        self.sensor.overscan_pressure = adafruit_bme280.OVERSCAN_X16
-        self.sensor.overscan_humidity = adafruit_bme280.OVERSCAN_X1
-        self.sensor.overscan_temperature = adafruit_bme280.OVERSCAN_X2
+        self.sensor.iir_filter = _iir_filter(BME280_IIR_FILTER)
+        self.sensor.overscan_pressure = _oversampling(BME280_OVERSAMPLING_PRESSURE)
+        self.sensor.overscan_humidity = _oversampling(BME280_OVERSAMPLING_HUMIDITY)
+        self.sensor.overscan_temperature = _oversampling(
+            BME280_OVERSAMPLING_TEMPERATURE, TEMPERATURE_OVERSAMPLING_RATES
+        )
+        self.measurement_time = measurement_time(
+            BME280_OVERSAMPLING_TEMPERATURE, BME280_OVERSAMPLING_PRESSURE, BME280_OVERSAMPLING_HUMIDITY
+        )
+        # In forced mode the chip sleeps and only converts when a reading is due,
+        # in normal mode it converts continuously every standby period
+        self.forced = BME280_MODE == "forced"
+        if self.forced:
+            self.sensor.mode = adafruit_bme280.MODE_SLEEP
+        else:
+            self.sensor.mode = adafruit_bme280.MODE_NORMAL
+            self.sensor.standby_period = adafruit_bme280.STANDBY_TC_500
+        self.t_fine = None
 
     def get_measurement(self):
+        snapshot = self.read_snapshot()
         return {
             "sensor_temp_hum": "bme280",
-            "temperature_farenheit": celsius_to_fahrenheit(self.sensor.temperature),
-            "temperature_celsius": self.sensor.temperature,
-            "humidity": self.sensor.humidity,
-            "pressure": self.sensor.pressure,
+            "temperature_farenheit": celsius_to_fahrenheit(snapshot.temperature),
+            "temperature_celsius": snapshot.temperature,
+            "humidity": snapshot.humidity,
+            "pressure": snapshot.pressure,
         }
 
+    def read_snapshot(self) -> BME280Snapshot:
+        """
+        Read temperature, humidity and pressure from the same sample in one I2C burst,
+        compensated with the calibration coefficients the driver read at startup.
+        In forced mode a conversion is started first.
+        """
+        if self.forced:
+            self._convert()
+        data = self.sensor._read_register(DATA_REGISTER, DATA_LENGTH)
+        snapshot = compensate(
+            data,
+            self.sensor._temperature_calib,
+            self.sensor._pressure_calib,
+            self.sensor._humidity_calib,
+        )
+        self.t_fine = snapshot.t_fine
+        return snapshot
+
+    def _convert(self):
+        """
+        Start one forced conversion and wait the computed measurement time for it to finish.
+        """
+        self.sensor.mode = adafruit_bme280.MODE_FORCE
+        time.sleep(self.measurement_time)
+        for _ in range(STATUS_POLL_LIMIT):
+            if not self.sensor._get_status() & STATUS_MEASURING:
+                return
+            time.sleep(STATUS_POLL_INTERVAL)
+        raise TimeoutError("BME280 conversion did not finish")
+
     def _get_data(self):
         # This method is kept for compatibility but is no longer needed
         # as we can access sensor data directly through properties
@@ -1,12 +1,38 @@
+import logging
+import threading
 import time
 
 import adafruit_dht
 import board
 
+from src.settings import DHT22_MAX_AGE, DHT22_MAX_RETRIES, DHT22_PIN
+
+logger = logging.getLogger(__name__)
+
+# The DHT22 needs at least 2 seconds between two reads
+MIN_READ_INTERVAL = 2.0
+
 
 class DHT22Sensor:
-    def __init__(self):
-        self.dht = adafruit_dht.DHT22(board.D4, False)
+    """
+    DHT22 read without blocking the caller.
+    A read is only attempted when 2 seconds passed since the previous one. A failed read is retried
+    in the background on the next allowed slot, up to `max_retries` times, and meanwhile the last good
+    value is returned as long as it is not older than `max_age` seconds.
+    """
+
+    def __init__(self, pin=DHT22_PIN, max_retries=DHT22_MAX_RETRIES, max_age=DHT22_MAX_AGE):
+        self.dht = adafruit_dht.DHT22(getattr(board, pin), False)
+        self.max_retries = max_retries
+        self.max_age = max_age
+        self.attempts = 0
+        self.failures = 0
+        self._last_attempt = None
+        self._last_good = None  # (temperature_c, humidity, monotonic time)
+        self._retries_left = 0
+        self._retry_timer = None
+        self._closed = False
+        self._lock = threading.Lock()
 
     def get_measurement(self):
         temperature_f, temperature_c, humidity = self.get_temperature_humidity()
@@ -18,17 +44,80 @@ class DHT22Sensor:
         }
 
     def get_temperature_humidity(self):
-        temperature_c = None
-        temperature_f = None
-        humidity = None
-        try:
-            temperature_c = self.dht.temperature
-            temperature_f = temperature_c * (9 / 5) + 32
-            humidity = self.dht.humidity
-        except RuntimeError as error:
-            # Errors happen fairly often, DHT's are hard to read, just keep going
-            print(error.args[0])
-            time.sleep(2.0)
-        except Exception as error:
-            print(error)
-        return temperature_f, temperature_c, humidity
+        failed = self._attempt() is False
+        with self._lock:
+            if failed and self._retry_timer is None and self.max_retries and not self._closed:
+                self._retries_left = self.max_retries
+                self._schedule_retry()
+            last_good = self._last_good
+        if last_good is None or time.monotonic() - last_good[2] > self.max_age:
+            return None, None, None
+        temperature_c, humidity, _measured_at = last_good
+        return temperature_c * (9 / 5) + 32, temperature_c, humidity
+
+    @property
+    def age(self):
+        """
+        Seconds since the last good reading, or None if there was none yet.
+        """
+        with self._lock:
+            if self._last_good is None:
+                return None
+            return time.monotonic() - self._last_good[2]
+
+    @property
+    def failure_rate(self):
+        return self.failures / self.attempts if self.attempts else 0.0
+
+    def _attempt(self):
+        """
+        Read the sensor if the minimum spacing allows it.
+        Returns True when a new value was read, False when the read failed and None when it was too early.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._last_attempt is not None and now - self._last_attempt < MIN_READ_INTERVAL:
+                return None
+            self._last_attempt = now
+            self.attempts += 1
+            try:
+                temperature_c = self.dht.temperature
+                humidity = self.dht.humidity
+                if temperature_c is None or humidity is None:
+                    raise RuntimeError("DHT22 returned no data")
+            except RuntimeError as error:
+                # Errors happen fairly often, DHT's are hard to read, just keep going
+                logger.debug(f"DHT22 read failed: {error.args[0]}")
+                self.failures += 1
+                return False
+            except Exception as error:
+                logger.error(f"DHT22 read failed: {error}")
+                self.failures += 1
+                return False
+            self._last_good = (temperature_c, humidity, now)
+            return True
+
+    def _schedule_retry(self):
+        # Called with the lock held
+        delay = max(0.0, self._last_attempt + MIN_READ_INTERVAL - time.monotonic())
+        self._retry_timer = threading.Timer(delay, self._retry)
+        self._retry_timer.daemon = True
+        self._retry_timer.start()
+
+    def _retry(self):
+        # The timer stays set during the attempt, so a failed read meanwhile does not start a second one
+        succeeded = self._attempt() is True
+        with self._lock:
+            self._retries_left -= 1
+            if not succeeded and self._retries_left > 0 and not self._closed:
+                self._schedule_retry()
+            else:
+                self._retry_timer = None
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            timer, self._retry_timer = self._retry_timer, None
+        if timer is not None:
+            timer.cancel()
+        self.dht.exit()
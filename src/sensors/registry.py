@@ -0,0 +1,148 @@
+import json
+import logging
+from functools import partial
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from src import settings
+from src.sensors.watchdog import SensorWatchdog
+from src.startup import timed_import
+
+logger = logging.getLogger(__name__)
+
+
+class SensorType(NamedTuple):
+    """
+    Registry entry of a sensor.
+    The sensor module, and the hardware libraries it needs, is only imported once the sensor is enabled.
+    """
+
+    name: str
+    enable: str
+    module: str
+    sensor: str
+    timeout: str
+    interval: str
+
+
+SENSOR_TYPES = (
+    SensorType("SDS011", "SDS011_ENABLE", "src.sensors.sds011sensor", "SDS011Sensor", "SDS011_READ_TIMEOUT",
+               "SDS011_INTERVAL"),
+    SensorType("SDS011_STREAM", "SDS011_ENABLE", "src.sensors.sds011stream", "SDS011StreamSensor",
+               "SDS011_READ_TIMEOUT", "SDS011_INTERVAL"),
+    SensorType("BME280", "BME280_ENABLE", "src.sensors.bme280sensor", "BME280Sensor", "BME280_READ_TIMEOUT",
+               "BME280_INTERVAL"),
+    SensorType("DHT22", "DHT22_ENABLE", "src.sensors.dht22sensor", "DHT22Sensor", "DHT22_READ_TIMEOUT",
+               "DHT22_INTERVAL"),
+)
+
+_SENSOR_TYPES_BY_NAME = {sensor_type.name: sensor_type for sensor_type in SENSOR_TYPES}
+
+
+def get_sensor_type(name: str) -> SensorType:
+    return _SENSOR_TYPES_BY_NAME[name]
+
+
+def close_sensors(*sensors) -> None:
+    """
+    Release the background threads and ports of the sensors that have any.
+    """
+    for sensor in sensors:
+        close = getattr(sensor, "close", None)
+        if close is None:
+            continue
+        try:
+            close()
+        except Exception as e:
+            logger.error(f"Failed to close {type(sensor).__name__}: {e}")
+
+
+def create_sensor(name: str) -> Optional[object]:
+    """
+    Create the sensor registered under `name` if it is enabled.
+    With SENSOR_WATCHDOG_ENABLE the sensor is wrapped in a SensorWatchdog, which reads it under
+    its read timeout and re-initializes it after a hung read.
+    Returns None when the sensor is disabled or fails to initialize.
+    """
+    sensor_type = _SENSOR_TYPES_BY_NAME[name]
+    if not getattr(settings, sensor_type.enable):
+        logger.info(f"{name} sensor is disabled")
+        return None
+    return _create(name, sensor_type, {})
+
+
+def _create(name: str, sensor_type: SensorType, options: Dict[str, Any]) -> Optional[object]:
+    try:
+        factory = partial(getattr(timed_import(sensor_type.module), sensor_type.sensor), **options)
+        if settings.SENSOR_WATCHDOG_ENABLE:
+            return SensorWatchdog(name, factory, getattr(settings, sensor_type.timeout))
+        return factory()
+    except Exception as e:
+        logger.error(f"Failed to initialize {sensor_type.sensor}: {e}")
+        return None
+
+
+class SensorConfig(NamedTuple):
+    """
+    One sensor instance of the SENSORS setting.
+    Sensors on the same bus are read one after another, different buses are read concurrently.
+    """
+
+    name: str
+    type: str
+    bus: str
+    options: Dict[str, Any]
+
+
+class ConfiguredSensor(NamedTuple):
+    name: str
+    bus: str
+    timeout: float
+    sensor: Any
+
+
+def load_sensor_configs(spec: Optional[str] = None) -> List[SensorConfig]:
+    """
+    Parse the SENSORS setting, a JSON list of objects with a unique "name", a registered "type"
+    and the constructor options of the sensor, for example
+    [{"name": "mast", "type": "BME280", "address": "0x76", "mux_address": "0x70", "mux_channel": 3}].
+    The bus is taken from "bus" if given, otherwise from the serial "port" or GPIO "pin", or is the I2C bus.
+    """
+    spec = settings.SENSORS if spec is None else spec
+    configs = []
+    names = set()
+    for entry in json.loads(spec):
+        options = dict(entry)
+        name = options.pop("name")
+        sensor_type = options.pop("type").upper()
+        if sensor_type not in _SENSOR_TYPES_BY_NAME:
+            raise ValueError(f"Unknown sensor type {sensor_type} for sensor {name}")
+        if name in names:
+            raise ValueError(f"Duplicate sensor name {name}")
+        names.add(name)
+
+        bus = options.pop("bus", None)
+        if bus is None:
+            if "port" in options:
+                bus = options["port"]
+            elif "pin" in options:
+                bus = f"gpio:{options['pin']}"
+            else:
+                bus = "i2c"
+        configs.append(SensorConfig(name, sensor_type, bus, options))
+    return configs
+
+
+def create_configured_sensors(configs: List[SensorConfig]) -> List[ConfiguredSensor]:
+    """
+    Create every configured sensor instance, skipping the ones that fail to initialize.
+    """
+    sensors = []
+    for config in configs:
+        sensor_type = _SENSOR_TYPES_BY_NAME[config.type]
+        sensor = _create(config.name, sensor_type, config.options)
+        if sensor is None:
+            continue
+        timeout = getattr(settings, sensor_type.timeout)
+        sensors.append(ConfiguredSensor(config.name, config.bus, timeout, sensor))
+    logger.info(f"Configured sensors: {', '.join(sensor.name for sensor in sensors) or 'none'}")
+    return sensors
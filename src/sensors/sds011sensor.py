@@ -1,9 +1,11 @@
 from sds011 import SDS011
 
+from src.settings import SDS011_PORT
+
 
 class SDS011Sensor:
-    def __init__(self):
-        self.sds = SDS011("/dev/ttyUSB0")
+    def __init__(self, port=SDS011_PORT):
+        self.sds = SDS011(port)
         self.sds.set_work_period(work_time=15)
 
     def get_measurement(self):
@@ -0,0 +1,205 @@
+"""
+Streaming SDS011 reader with a duty-cycle controller.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+import serial
+
+from src.settings import (
+    SDS011_INTERVAL,
+    SDS011_PORT,
+    SDS011_SETTLE_TIME,
+    SDS011_WARMUP,
+    SDS011_WINDOW_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+FRAME_SIZE = 10
+FRAME_HEADER = b"\xaa\xc0"
+FRAME_TAIL = 0xAB
+
+# Command ids and payloads from the SDS011 control protocol
+CMD_REPORT_MODE = 0x02
+CMD_SLEEP = 0x06
+CMD_WORK_PERIOD = 0x08
+SET = 0x01
+REPORT_ACTIVE = 0x00
+MODE_SLEEP = 0x00
+MODE_WORK = 0x01
+WORK_CONTINUOUS = 0x00
+
+SERIAL_TIMEOUT = 0.5
+
+
+def encode_command(command: int, *data: int) -> bytes:
+    """
+    Build a 19-byte command frame addressed to every sensor (device id FF FF).
+    """
+    body = bytes([command, *data]).ljust(13, b"\x00") + b"\xff\xff"
+    return b"\xaa\xb4" + body + bytes([sum(body) & 0xFF, FRAME_TAIL])
+
+
+class SDS011FrameParser:
+    """
+    Incremental parser of the 10-byte data frames AA C0 PM25L PM25H PM10L PM10H ID1 ID2 CS AB.
+    Bytes can be fed in chunks of any size. Command replies and corrupt frames are skipped
+    and the parser resynchronizes on the next frame header.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.errors = 0
+
+    def feed(self, data: bytes) -> List[Tuple[float, float]]:
+        """
+        Add bytes from the serial port and return the PM2.5 and PM10 values of every complete frame.
+        """
+        self._buffer += data
+        values = []
+        while True:
+            start = self._buffer.find(FRAME_HEADER)
+            if start < 0:
+                # Keep a trailing AA, it may be the first byte of the next header
+                del self._buffer[:-1 if self._buffer.endswith(b"\xaa") else len(self._buffer)]
+                break
+            if len(self._buffer) - start < FRAME_SIZE:
+                del self._buffer[:start]
+                break
+
+            frame = self._buffer[start:start + FRAME_SIZE]
+            if frame[9] != FRAME_TAIL or sum(frame[2:8]) & 0xFF != frame[8]:
+                self.errors += 1
+                del self._buffer[:start + 1]
+                continue
+
+            pm25 = int.from_bytes(frame[2:4], "little") / 10
+            pm10 = int.from_bytes(frame[4:6], "little") / 10
+            values.append((pm25, pm10))
+            del self._buffer[:start + FRAME_SIZE]
+        return values
+
+
+class SDS011StreamSensor:
+    """
+    SDS011 in active reporting mode, read by a background thread.
+    The sensor sleeps between reports and is woken `warmup` seconds before each report,
+    which falls on a wall clock multiple of `interval` like the main loop ticks.
+    Frames from the first `settle` seconds after waking are dropped while the fan and laser settle,
+    the following ones go to a ring buffer and get_measurement returns their average without blocking.
+    """
+
+    def __init__(
+        self,
+        port: str = SDS011_PORT,
+        interval: float = SDS011_INTERVAL,
+        warmup: float = SDS011_WARMUP,
+        settle: float = SDS011_SETTLE_TIME,
+        window_size: int = SDS011_WINDOW_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+        start: bool = True,
+    ):
+        self.interval = interval
+        self.warmup = warmup
+        self.settle = settle
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._parser = SDS011FrameParser()
+        self._values = deque(maxlen=window_size)
+        self._new_window = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.serial = serial.Serial(port, baudrate=9600, timeout=SERIAL_TIMEOUT)
+        # The duty cycle is driven from here, not by the sensor's own work period
+        self.serial.write(encode_command(CMD_REPORT_MODE, SET, REPORT_ACTIVE))
+        self.serial.write(encode_command(CMD_WORK_PERIOD, SET, WORK_CONTINUOUS))
+
+        now = clock()
+        self.awake = False
+        self._settled_at = now
+        self._next_report = self.next_boundary(now)
+        self._set_awake(now >= self._next_report - warmup, now)
+        if start:
+            self.start()
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sds011", daemon=True)
+        self._thread.start()
+
+    def next_boundary(self, now: float) -> float:
+        """
+        Return the monotonic time of the first wall clock multiple of the interval after `now`.
+        """
+        offset = self._wall_clock() - now
+        return ((now + offset) // self.interval + 1) * self.interval - offset
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data = self.serial.read(self.serial.in_waiting or 1)
+            except serial.SerialException as e:
+                logger.error(f"Error reading SDS011 serial port: {e}")
+                self._stop.wait(SERIAL_TIMEOUT)
+                continue
+            now = self._clock()
+            if data:
+                self._store(self._parser.feed(data), now)
+            self._update_duty_cycle(now)
+
+    def _store(self, values: List[Tuple[float, float]], now: float) -> None:
+        if not values or not self.awake or now < self._settled_at:
+            return
+        with self._lock:
+            if self._new_window:
+                # First settled frame of this cycle, forget the previous report
+                self._values.clear()
+                self._new_window = False
+            self._values.extend(values)
+
+    def _update_duty_cycle(self, now: float) -> None:
+        if now >= self._next_report:
+            self._next_report = self.next_boundary(now)
+            # Only sleep when there is time left before the next warm-up
+            if self.awake and now < self._next_report - self.warmup:
+                self._set_awake(False, now)
+        if not self.awake and now >= self._next_report - self.warmup:
+            self._set_awake(True, now)
+
+    def _set_awake(self, awake: bool, now: float) -> None:
+        self.serial.write(encode_command(CMD_SLEEP, SET, MODE_WORK if awake else MODE_SLEEP))
+        self.awake = awake
+        if awake:
+            self._settled_at = now + self.settle
+            self._new_window = True
+        logger.debug(f"SDS011 {'woken up' if awake else 'put to sleep'}")
+
+    def get_measurement(self):
+        with self._lock:
+            values = list(self._values)
+        if not values:
+            raise RuntimeError("No settled SDS011 values yet")
+        return {
+            "sensor_air_quality": "sds011",
+            "pm25": sum(pm25 for pm25, _pm10 in values) / len(values),
+            "pm10": sum(pm10 for _pm25, pm10 in values) / len(values),
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(SERIAL_TIMEOUT * 2)
+        self._thread = None
+        try:
+            self.serial.write(encode_command(CMD_SLEEP, SET, MODE_SLEEP))
+        finally:
+            self.serial.close()
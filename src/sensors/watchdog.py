@@ -0,0 +1,152 @@
+"""
+Watchdog for sensor reads that can hang on a stuck serial adapter or a wedged I2C bus.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.settings import SENSOR_INIT_TIMEOUT, SENSOR_REINIT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# A read for the worker thread: the future to complete and the sensor to read, or None to stop the worker
+_ReadRequest = Optional[Tuple["Future[Dict[str, Any]]", Any]]
+
+
+class SensorWatchdog:
+    """
+    Runs every read of a sensor in its own daemon worker thread under a deadline.
+    When a read misses the deadline the sensor is marked degraded, reads fail fast,
+    and a background thread closes the old sensor, then creates a new one every `reinit_interval` seconds
+    until it succeeds. Closing and creating run under `init_timeout`, so a hung initialization cannot wedge
+    the re-initialization thread. The hung worker is abandoned, so the other sensors and the sinks keep going.
+    It has the same interface as a sensor.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        timeout: float,
+        reinit_interval: float = SENSOR_REINIT_INTERVAL,
+        init_timeout: float = SENSOR_INIT_TIMEOUT,
+    ):
+        self.name = name
+        self.factory = factory
+        self.timeout = timeout
+        self.reinit_interval = reinit_interval
+        self.init_timeout = init_timeout
+        self.sensor = factory()
+        self.degraded = False
+        self.timeouts = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._start_worker()
+
+    def _start_worker(self) -> None:
+        self._requests: "queue.Queue[_ReadRequest]" = queue.Queue()
+        threading.Thread(
+            target=self._work, args=(self._requests,), name=f"sensor-{self.name}", daemon=True
+        ).start()
+
+    @staticmethod
+    def _work(requests: "queue.Queue[_ReadRequest]") -> None:
+        while True:
+            request = requests.get()
+            if request is None:
+                return
+            future, sensor = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(sensor.get_measurement())
+            except Exception as e:
+                future.set_exception(e)
+
+    def get_measurement(self) -> Dict[str, Any]:
+        with self._lock:
+            if self.degraded:
+                raise RuntimeError(f"{self.name} sensor is degraded, re-initializing")
+            future: "Future[Dict[str, Any]]" = Future()
+            self._requests.put((future, self.sensor))
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._mark_degraded()
+            raise TimeoutError(f"{self.name} read timed out after {self.timeout}s")
+
+    def _mark_degraded(self) -> None:
+        with self._lock:
+            if self.degraded:
+                return
+            self.degraded = True
+            self.timeouts += 1
+            # The hung worker exits once its read returns, if it ever does
+            self._requests.put(None)
+        logger.error(f"{self.name} sensor missed its {self.timeout}s deadline, marked degraded")
+        threading.Thread(target=self._reinitialize, name=f"reinit-{self.name}", daemon=True).start()
+
+    def _reinitialize(self) -> None:
+        # Release the serial port or reader thread of the old sensor before opening a new one
+        close = getattr(self.sensor, "close", None)
+        if close is not None:
+            try:
+                self._call_with_deadline(close, f"closing {self.name} sensor")
+            except Exception as e:
+                logger.error(f"Failed to close {self.name} sensor: {e}")
+
+        while not self._stop.wait(self.reinit_interval):
+            try:
+                sensor = self._call_with_deadline(self.factory, f"initializing {self.name} sensor")
+            except Exception as e:
+                logger.error(f"Failed to re-initialize {self.name} sensor: {e}")
+                continue
+            with self._lock:
+                self.sensor = sensor
+                self._start_worker()
+                self.degraded = False
+            logger.info(f"{self.name} sensor re-initialized")
+            return
+
+    def _call_with_deadline(self, function: Callable[[], Any], action: str) -> Any:
+        """
+        Call `function` in a daemon thread and wait at most `init_timeout` seconds for it.
+        A sensor created after the deadline is closed, so it does not hold on to its port.
+        """
+        future: "Future[Any]" = Future()
+
+        def run():
+            try:
+                future.set_result(function())
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"init-{self.name}", daemon=True).start()
+        try:
+            return future.result(timeout=self.init_timeout)
+        except FutureTimeoutError:
+            future.add_done_callback(_close_late_result)
+            raise TimeoutError(f"{action} timed out after {self.init_timeout}s")
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self._requests.put(None)
+            close = getattr(self.sensor, "close", None)
+        if close is not None:
+            close()
+
+
+def _close_late_result(future: "Future[Any]") -> None:
+    if future.exception() is not None:
+        return
+    close = getattr(future.result(), "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception as e:
+            logger.error(f"Failed to close late sensor: {e}")
@@ -23,6 +23,8 @@ def get_bool_env(key, default=False):
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 LOOP_TIME = int(os.getenv("LOOP_TIME", 1))
 LOOP_ENABLED = get_bool_env("LOOP_ENABLED", False)
+LOOP_ALIGN = get_bool_env("LOOP_ALIGN", True)
+LOOP_OVERRUN_POLICY = os.getenv("LOOP_OVERRUN_POLICY", "skip").lower()
 
 # API CONFIG
 API_ENABLE = get_bool_env("API_CONFIG", False)
@@ -37,6 +39,13 @@ if API_HEADER_TOKEN:
         API_HEADER_TOKEN = {"Authorization": f"Bearer {API_HEADER_TOKEN}"}
 
 API_URL_TOKEN = os.getenv("API_URL_TOKEN", "")
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 5))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", 15))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", 2))
+API_BATCH_ENABLE = get_bool_env("API_BATCH_ENABLE", False)
+API_GZIP = get_bool_env("API_GZIP", False)
+# "json" or "gorilla", the format of batches sent with API_BATCH_ENABLE
+API_BATCH_FORMAT = os.getenv("API_BATCH_FORMAT", "json").lower()
 
 # MQTT CONFIG
 MQTT_ENABLE = get_bool_env("MQTT_ENABLE", False)
@@ -45,6 +54,14 @@ MQTT_PORT = os.getenv("MQTT_PORT", 1883)
 MQTT_TOPIC = os.getenv("MQTT_TOPIC", "topic")
 MQTT_USER = os.getenv("MQTT_USER", "user")
 MQTT_PASSWORD = os.getenv("MQTT_PASSWORD", "password")
+MQTT_QOS = int(os.getenv("MQTT_QOS", 1))
+MQTT_KEEPALIVE = int(os.getenv("MQTT_KEEPALIVE", 60))
+MQTT_QUEUE_SIZE = int(os.getenv("MQTT_QUEUE_SIZE", 1000))
+MQTT_RECONNECT_MAX_DELAY = int(os.getenv("MQTT_RECONNECT_MAX_DELAY", 120))
+# Seconds a send waits for the connection and the broker acknowledgement
+MQTT_PUBLISH_TIMEOUT = float(os.getenv("MQTT_PUBLISH_TIMEOUT", 10))
+# "json" or "compact", the binary format of src.communication.compact
+MQTT_PAYLOAD_FORMAT = os.getenv("MQTT_PAYLOAD_FORMAT", "json").lower()
 
 # SQS CONFIG
 SQS_ENABLE = get_bool_env("SQS_ENABLE", False)
@@ -53,6 +70,10 @@ SQS_ACCESS_KEY = os.getenv("SQS_ACCESS_KEY", "access_key")
 SQS_SECRET_KEY = os.getenv("SQS_SECRET_KEY", "secret_key")
 SQS_QUEUE_NAME = os.getenv("SQS_QUEUE_NAME", "queue_name")
 SQS_REGION = os.getenv("SQS_REGION", "fr-par")
+SQS_BATCH_SIZE = int(os.getenv("SQS_BATCH_SIZE", 10))
+SQS_BATCH_RETRIES = int(os.getenv("SQS_BATCH_RETRIES", 2))
+# "json" or "compact", compact payloads are base64 encoded because SQS message bodies are text
+SQS_PAYLOAD_FORMAT = os.getenv("SQS_PAYLOAD_FORMAT", "json").lower()
 
 
 # POSTGRES CONFIG
@@ -65,6 +86,9 @@ POSTGRES_DBNAME = os.getenv("POSTGRES_DBNAME", "postgres")
 POSTGRES_TABLE = os.getenv("POSTGRES_TABLE", "weather")
 POSTGRES_SSLMODE = os.getenv("POSTGRES_SSLMODE", "prefer")
 POSTGRES_CHANNELBINDING = os.getenv("POSTGRES_CHANNELBINDING", "prefer")
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", 1))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", 2))
+POSTGRES_BATCH_SIZE = int(os.getenv("POSTGRES_BATCH_SIZE", 100))
 
 
 # SENSOR COMMUNITY CONFIG
@@ -80,3 +104,95 @@ INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "my-org")
 INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather")
 INFLUXDB_TIMEOUT = int(os.getenv("INFLUXDB_TIMEOUT", 10000))
 INFLUXDB_VERIFY_SSL = get_bool_env("INFLUXDB_VERIFY_SSL", True)
+INFLUXDB_WRITE_MODE = os.getenv("INFLUXDB_WRITE_MODE", "batching").lower()  # batching, synchronous, asynchronous
+INFLUXDB_FLUSH_TIMEOUT = float(os.getenv("INFLUXDB_FLUSH_TIMEOUT", 5))
+INFLUXDB_HEALTH_CHECK = get_bool_env("INFLUXDB_HEALTH_CHECK", True)
+INFLUXDB_HEALTH_MAX_BACKOFF = float(os.getenv("INFLUXDB_HEALTH_MAX_BACKOFF", 300))
+
+# SENSOR ACQUISITION CONFIG
+SDS011_ENABLE = get_bool_env("SDS011_ENABLE", True)
+BME280_ENABLE = get_bool_env("BME280_ENABLE", True)
+SENSOR_CONCURRENT_READ = get_bool_env("SENSOR_CONCURRENT_READ", True)
+SDS011_READ_TIMEOUT = float(os.getenv("SDS011_READ_TIMEOUT", 10))
+BME280_READ_TIMEOUT = float(os.getenv("BME280_READ_TIMEOUT", 2))
+DHT22_ENABLE = get_bool_env("DHT22_ENABLE", False)
+DHT22_PIN = os.getenv("DHT22_PIN", "D4")
+DHT22_READ_TIMEOUT = float(os.getenv("DHT22_READ_TIMEOUT", 5))
+DHT22_MAX_RETRIES = int(os.getenv("DHT22_MAX_RETRIES", 3))
+DHT22_MAX_AGE = float(os.getenv("DHT22_MAX_AGE", 900))
+# JSON list of sensor instances, replaces the single SDS011 and BME280 when set
+SENSORS = os.getenv("SENSORS", "")
+SENSOR_WATCHDOG_ENABLE = get_bool_env("SENSOR_WATCHDOG_ENABLE", True)
+SENSOR_REINIT_INTERVAL = float(os.getenv("SENSOR_REINIT_INTERVAL", 30))
+SENSOR_INIT_TIMEOUT = float(os.getenv("SENSOR_INIT_TIMEOUT", 30))
+
+# SEND DATA CONFIG
+SEND_DATA_CONCURRENT = get_bool_env("SEND_DATA_CONCURRENT", True)
+SEND_DATA_MAX_WORKERS = int(os.getenv("SEND_DATA_MAX_WORKERS", 6))
+SINK_TIMEOUT = float(os.getenv("SINK_TIMEOUT", 30))
+API_SEND_TIMEOUT = float(os.getenv("API_SEND_TIMEOUT", SINK_TIMEOUT))
+MQTT_SEND_TIMEOUT = float(os.getenv("MQTT_SEND_TIMEOUT", SINK_TIMEOUT))
+SQS_SEND_TIMEOUT = float(os.getenv("SQS_SEND_TIMEOUT", SINK_TIMEOUT))
+POSTGRES_SEND_TIMEOUT = float(os.getenv("POSTGRES_SEND_TIMEOUT", SINK_TIMEOUT))
+SENSOR_COMMUNITY_SEND_TIMEOUT = float(os.getenv("SENSOR_COMMUNITY_SEND_TIMEOUT", SINK_TIMEOUT))
+INFLUXDB_SEND_TIMEOUT = float(os.getenv("INFLUXDB_SEND_TIMEOUT", SINK_TIMEOUT))
+# "json" or "orjson", orjson is only used when installed
+JSON_BACKEND = os.getenv("JSON_BACKEND", "json").lower()
+
+# OUTBOX CONFIG
+OUTBOX_ENABLE = get_bool_env("OUTBOX_ENABLE", False)
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", str(project_root / "outbox.sqlite3"))
+OUTBOX_MAX_READINGS = int(os.getenv("OUTBOX_MAX_READINGS", 100000))
+OUTBOX_REPLAY_BATCH = int(os.getenv("OUTBOX_REPLAY_BATCH", 100))
+# Gorilla compression of a backlog that builds up during an outage
+OUTBOX_COMPRESS_ENABLE = get_bool_env("OUTBOX_COMPRESS_ENABLE", False)
+OUTBOX_COMPRESS_BATCH = int(os.getenv("OUTBOX_COMPRESS_BATCH", 100))
+
+# TIME-SERIES STORE CONFIG
+TSDB_ENABLE = get_bool_env("TSDB_ENABLE", False)
+TSDB_PATH = os.getenv("TSDB_PATH", str(project_root / "tsdb"))
+TSDB_FLUSH_INTERVAL = float(os.getenv("TSDB_FLUSH_INTERVAL", 300))
+# 0 keeps every segment
+TSDB_RETENTION_DAYS = int(os.getenv("TSDB_RETENTION_DAYS", 3650))
+# Readings further ahead of the clock are dropped
+TSDB_MAX_FUTURE = float(os.getenv("TSDB_MAX_FUTURE", 300))
+# A clock step back larger than this discards the readings stored after the new time
+TSDB_REALIGN_AFTER = float(os.getenv("TSDB_REALIGN_AFTER", 86400))
+
+# ROLLUP CONFIG
+ROLLUP_ENABLE = get_bool_env("ROLLUP_ENABLE", False)
+# Comma separated bucket sizes, a number followed by s, m, h or d
+ROLLUP_RESOLUTIONS = os.getenv("ROLLUP_RESOLUTIONS", "1m,1h,1d")
+
+# SAMPLING CONFIG
+SAMPLING_ENABLE = get_bool_env("SAMPLING_ENABLE", False)
+SAMPLING_RATE_HZ = float(os.getenv("SAMPLING_RATE_HZ", 1))
+SAMPLING_WINDOW_SIZE = int(os.getenv("SAMPLING_WINDOW_SIZE", 3600))
+
+# MULTI-RATE CONFIG
+MULTIRATE_ENABLE = get_bool_env("MULTIRATE_ENABLE", False)
+MULTIRATE_SINK_DATA = os.getenv("MULTIRATE_SINK_DATA", "latest").lower()
+MULTIRATE_DEFAULT_INTERVAL = float(os.getenv("MULTIRATE_DEFAULT_INTERVAL", LOOP_TIME * 60 * 60 / 4))
+SDS011_INTERVAL = float(os.getenv("SDS011_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+BME280_INTERVAL = float(os.getenv("BME280_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+DHT22_INTERVAL = float(os.getenv("DHT22_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+API_SEND_INTERVAL = float(os.getenv("API_SEND_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+MQTT_SEND_INTERVAL = float(os.getenv("MQTT_SEND_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+SQS_SEND_INTERVAL = float(os.getenv("SQS_SEND_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+POSTGRES_SEND_INTERVAL = float(os.getenv("POSTGRES_SEND_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+SENSOR_COMMUNITY_SEND_INTERVAL = float(os.getenv("SENSOR_COMMUNITY_SEND_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+INFLUXDB_SEND_INTERVAL = float(os.getenv("INFLUXDB_SEND_INTERVAL", MULTIRATE_DEFAULT_INTERVAL))
+
+# SDS011 CONFIG
+SDS011_PORT = os.getenv("SDS011_PORT", "/dev/ttyUSB0")
+SDS011_STREAM_ENABLE = get_bool_env("SDS011_STREAM_ENABLE", False)
+SDS011_WARMUP = float(os.getenv("SDS011_WARMUP", 45))
+SDS011_SETTLE_TIME = float(os.getenv("SDS011_SETTLE_TIME", 30))
+SDS011_WINDOW_SIZE = int(os.getenv("SDS011_WINDOW_SIZE", 60))
+
+# BME280 CONFIG
+BME280_MODE = os.getenv("BME280_MODE", "forced").lower()
+BME280_OVERSAMPLING_TEMPERATURE = int(os.getenv("BME280_OVERSAMPLING_TEMPERATURE", 2))
+BME280_OVERSAMPLING_PRESSURE = int(os.getenv("BME280_OVERSAMPLING_PRESSURE", 16))
+BME280_OVERSAMPLING_HUMIDITY = int(os.getenv("BME280_OVERSAMPLING_HUMIDITY", 1))
+BME280_IIR_FILTER = int(os.getenv("BME280_IIR_FILTER", 0))
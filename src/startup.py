@@ -0,0 +1,48 @@
+"""
+Startup and import time tracking for the weather station.
+"""
+import importlib
+import logging
+import resource
+import sys
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+STARTED_AT = time.perf_counter()
+
+# Time in seconds spent importing each backend module, in import order
+IMPORT_TIMES: Dict[str, float] = {}
+
+
+def timed_import(module_name):
+    """
+    Import a module and record how long the first import took.
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    IMPORT_TIMES[module_name] = time.perf_counter() - start
+    logger.debug(f"Imported {module_name} in {IMPORT_TIMES[module_name] * 1000:.0f} ms")
+    return module
+
+
+def get_max_rss_mb() -> float:
+    """
+    Return the peak resident set size of the process in MB.
+    """
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def log_startup_report() -> None:
+    """
+    Log the time since startup, the peak memory and the import time of every backend.
+    """
+    elapsed = time.perf_counter() - STARTED_AT
+    imports = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in IMPORT_TIMES.items())
+    logger.info(f"Startup took {elapsed:.2f}s, peak RSS {get_max_rss_mb():.1f} MB")
+    logger.info(f"Backend imports: {imports or 'none'}")
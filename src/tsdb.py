@@ -0,0 +1,369 @@
+"""
+Embedded time-series store that keeps the readings on the station.
+
+Readings are stored as fixed-width records in one append-only, memory-mapped segment file per UTC day.
+A record is the timestamp and every measurement as 64-bit floats, NaN standing for a missing value.
+Records are buffered in memory and written a page at a time to limit SD card wear.
+Timestamps only grow within a segment, so a time range is found with a binary search.
+"""
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.reading import NUMERIC_FIELDS, ReadingLike
+from src.settings import (
+    TSDB_ENABLE,
+    TSDB_FLUSH_INTERVAL,
+    TSDB_MAX_FUTURE,
+    TSDB_PATH,
+    TSDB_REALIGN_AFTER,
+    TSDB_RETENTION_DAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"WSTS"
+VERSION = 1
+PAGE_SIZE = mmap.PAGESIZE
+SEGMENT_SUFFIX = ".tsdb"
+
+TIMESTAMP = NUMERIC_FIELDS[0]
+FIELDS = NUMERIC_FIELDS[1:]
+RECORD = struct.Struct("<" + "d" * len(NUMERIC_FIELDS))
+
+# magic, version, record size, number of records. The header has its own page so record flushes never touch it
+_HEADER = struct.Struct("<4sHHQ")
+HEADER_SIZE = PAGE_SIZE
+# Segments start with room for 16 pages of records and double when full
+_INITIAL_CAPACITY = 16 * PAGE_SIZE // RECORD.size
+
+_tsdb_instance = None
+_tsdb_lock = threading.Lock()
+
+
+def get_tsdb():
+    """
+    Helper function to get the shared TimeSeriesStore instance, opening it on first use.
+    """
+    global _tsdb_instance
+    with _tsdb_lock:
+        if _tsdb_instance is None:
+            _tsdb_instance = TimeSeriesStore()
+        return _tsdb_instance
+
+
+def close_tsdb():
+    """
+    Helper function to flush and close the TimeSeriesStore instance if it exists.
+    """
+    global _tsdb_instance
+    with _tsdb_lock:
+        if _tsdb_instance:
+            logger.info("Closing time-series store...")
+            _tsdb_instance.close()
+            _tsdb_instance = None
+
+
+def store_reading(data: ReadingLike) -> None:
+    """
+    Store a reading on the station when TSDB_ENABLE is set. Errors are logged, never raised.
+    """
+    if not TSDB_ENABLE:
+        return
+    try:
+        get_tsdb().append(data)
+    except Exception as e:
+        logger.error(f"Failed to store reading locally: {e}")
+
+
+def _utc_day(timestamp: float) -> date:
+    return datetime.fromtimestamp(timestamp, timezone.utc).date()
+
+
+def _pack(data: ReadingLike) -> bytes:
+    values = []
+    for field in NUMERIC_FIELDS:
+        value = data.get(field)
+        values.append(math.nan if value is None or isinstance(value, str) else float(value))
+    return RECORD.pack(*values)
+
+
+def _unpack(values) -> Dict[str, Any]:
+    return {field: None if math.isnan(value) else value for field, value in zip(NUMERIC_FIELDS, values)}
+
+
+class Segment:
+    """
+    The records of one UTC day in a memory-mapped file.
+    Only records counted in the header are valid, so a crash between a record flush and the header
+    update loses the unflushed records but never returns garbage. An empty file, left by a crash right
+    after it was created, is a new segment.
+    """
+
+    def __init__(self, path: str, day: date):
+        self.path = path
+        self.day = day
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        exists = os.fstat(self._file.fileno()).st_size > 0
+        if not exists:
+            self._file.truncate(HEADER_SIZE + _INITIAL_CAPACITY * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        if exists:
+            magic, version, record_size, self.count = _HEADER.unpack_from(self._map)
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                self.close()
+                raise ValueError(f"{path} is not a version {VERSION} segment")
+        else:
+            self.count = 0
+            self._write_header()
+
+    @property
+    def capacity(self) -> int:
+        return (len(self._map) - HEADER_SIZE) // RECORD.size
+
+    def _write_header(self) -> None:
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, self.count)
+        self._map.flush(0, PAGE_SIZE)
+
+    def _grow(self, count: int) -> None:
+        capacity = max(self.capacity, _INITIAL_CAPACITY)
+        while capacity < count:
+            capacity *= 2
+        self._map.close()
+        self._file.truncate(HEADER_SIZE + capacity * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def write(self, records: bytes) -> None:
+        """
+        Append packed records, sync the pages they touched and then the header.
+        """
+        count = self.count + len(records) // RECORD.size
+        if count > self.capacity:
+            self._grow(count)
+        start = HEADER_SIZE + self.count * RECORD.size
+        self._map[start:start + len(records)] = records
+        page_start = start - start % PAGE_SIZE
+        self._map.flush(page_start, start + len(records) - page_start)
+        self.count = count
+        self._write_header()
+
+    def truncate(self, count: int) -> None:
+        """
+        Keep only the first `count` records.
+        """
+        self.count = min(count, self.count)
+        self._write_header()
+
+    def timestamp(self, index: int) -> float:
+        return struct.unpack_from("<d", self._map, HEADER_SIZE + index * RECORD.size)[0]
+
+    def bisect(self, timestamp: float) -> int:
+        """
+        Return the index of the first record at or after `timestamp`.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def records(self, start: float, end: float) -> Iterator[Dict[str, Any]]:
+        index = self.bisect(start)
+        while index < self.count:
+            values = RECORD.unpack_from(self._map, HEADER_SIZE + index * RECORD.size)
+            if values[0] >= end:
+                return
+            yield _unpack(values)
+            index += 1
+
+    def last_timestamp(self) -> Optional[float]:
+        return self.timestamp(self.count - 1) if self.count else None
+
+    def close(self, truncate: bool = False) -> None:
+        """
+        Close the segment, with `truncate` giving back the unused preallocated space.
+        """
+        self._map.close()
+        if truncate:
+            self._file.truncate(HEADER_SIZE + self.count * RECORD.size)
+        self._file.close()
+
+
+class TimeSeriesStore:
+    """
+    Append-only store of readings in daily segments under `path`.
+    Readings older than the last stored one are dropped, so every segment stays sorted by time.
+    Readings more than `max_future` seconds ahead of the wall clock are dropped too. A reading more than
+    `realign_after` seconds older than the last stored one means the stored readings came from a clock
+    that was ahead, so they are discarded and the store continues from the new reading.
+    Records are written when a page is full or `flush_interval` seconds after the previous write,
+    and segments older than `retention_days` days are deleted when the day changes.
+    """
+
+    def __init__(
+        self,
+        path: str = TSDB_PATH,
+        flush_interval: float = TSDB_FLUSH_INTERVAL,
+        retention_days: int = TSDB_RETENTION_DAYS,
+        clock=time.monotonic,
+        max_future: float = TSDB_MAX_FUTURE,
+        realign_after: float = TSDB_REALIGN_AFTER,
+        wall_clock=time.time,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.clock = clock
+        self.max_future = max_future
+        self.realign_after = realign_after
+        self.wall_clock = wall_clock
+        self.dropped = 0
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segment: Optional[Segment] = None
+        self._pending = bytearray()
+        self._last_timestamp: Optional[float] = None
+        self._last_flush = clock()
+        # Continue in the newest segment, so readings older than what is stored are dropped after a restart
+        days = self.days()
+        if days:
+            self._segment = Segment(self._segment_path(days[-1]), days[-1])
+            self._last_timestamp = self._segment.last_timestamp()
+
+    def days(self) -> List[date]:
+        """
+        Return the days that have a segment, oldest first. This is the index of the segments.
+        """
+        days = []
+        for name in os.listdir(self.path):
+            if name.endswith(SEGMENT_SUFFIX):
+                try:
+                    days.append(date.fromisoformat(name[: -len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(days)
+
+    def _segment_path(self, day: date) -> str:
+        return os.path.join(self.path, day.isoformat() + SEGMENT_SUFFIX)
+
+    def append(self, data: ReadingLike) -> bool:
+        """
+        Buffer a reading and return False when it was dropped.
+        """
+        timestamp = data.get(TIMESTAMP)
+        if timestamp is None:
+            return False
+        if timestamp > self.wall_clock() + self.max_future:
+            self.dropped += 1
+            logger.warning(f"Dropping reading at {timestamp}, ahead of the clock")
+            return False
+        with self._lock:
+            if self._last_timestamp is not None and timestamp < self._last_timestamp - self.realign_after:
+                self._realign(timestamp)
+            day = _utc_day(timestamp)
+            if self._segment is None or self._segment.day != day:
+                if self._segment is not None and day < self._segment.day:
+                    return self._drop(timestamp)
+                self._rotate(day)
+            if self._last_timestamp is not None and timestamp < self._last_timestamp:
+                return self._drop(timestamp)
+
+            self._pending += _pack(data)
+            self._last_timestamp = timestamp
+            if len(self._pending) >= PAGE_SIZE or self.clock() - self._last_flush >= self.flush_interval:
+                self._flush()
+        return True
+
+    def _drop(self, timestamp: float) -> bool:
+        self.dropped += 1
+        logger.warning(f"Dropping reading at {timestamp}, older than the last stored reading")
+        return False
+
+    def _realign(self, timestamp: float) -> None:
+        """
+        Discard the stored readings at or after `timestamp`, after the clock went back by a large step.
+        """
+        logger.warning(
+            f"Clock went back from {self._last_timestamp} to {timestamp}, discarding the readings stored after it"
+        )
+        self._flush()
+        day = _utc_day(timestamp)
+        if self._segment is not None and self._segment.day > day:
+            self._segment.close()
+            self._segment = None
+        for stored_day in self.days():
+            if stored_day > day:
+                os.remove(self._segment_path(stored_day))
+        if self._segment is None and day in self.days():
+            self._segment = Segment(self._segment_path(day), day)
+        if self._segment is not None and self._segment.day == day:
+            self._segment.truncate(self._segment.bisect(timestamp))
+        self._last_timestamp = self._segment.last_timestamp() if self._segment is not None else None
+
+    def _rotate(self, day: date) -> None:
+        if self._segment is not None:
+            self._flush()
+            self._segment.close(truncate=True)
+        self._segment = Segment(self._segment_path(day), day)
+        self._last_timestamp = self._segment.last_timestamp()
+        self._apply_retention(day)
+
+    def _apply_retention(self, today: date) -> None:
+        if self.retention_days <= 0:
+            return
+        oldest = today - timedelta(days=self.retention_days)
+        for day in self.days():
+            if day >= oldest:
+                break
+            os.remove(self._segment_path(day))
+            logger.info(f"Deleted segment of {day.isoformat()}, older than {self.retention_days} days")
+
+    def _flush(self) -> None:
+        if self._pending and self._segment is not None:
+            self._segment.write(bytes(self._pending))
+            self._pending.clear()
+        self._last_flush = self.clock()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def query(self, start: float, end: float) -> List[Dict[str, Any]]:
+        """
+        Return the readings with start <= timestamp < end, oldest first, including unflushed ones.
+        Measurements that were missing are None.
+        """
+        with self._lock:
+            first_day, last_day = _utc_day(start), _utc_day(max(start, end))
+            readings: List[Dict[str, Any]] = []
+            for day in self.days():
+                if day < first_day or day > last_day:
+                    continue
+                if self._segment is not None and day == self._segment.day:
+                    readings.extend(self._segment.records(start, end))
+                    readings.extend(
+                        _unpack(values) for values in RECORD.iter_unpack(self._pending) if start <= values[0] < end
+                    )
+                    continue
+                segment = Segment(self._segment_path(day), day)
+                try:
+                    readings.extend(segment.records(start, end))
+                finally:
+                    segment.close()
+            return readings
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment is not None:
+                self._flush()
+                self._segment.close(truncate=True)
+                self._segment = None
@@ -0,0 +1,120 @@
+"""
+Tests for the acquisition module.
+"""
+import threading
+import time
+
+from src.sensors.acquisition import read_concurrently, read_per_bus, read_sequentially
+
+
+def test_read_sequentially():
+    """Test that every sensor is read and failures are skipped."""
+    def failing_read():
+        raise RuntimeError("Test error")
+
+    reads = [
+        ("SDS011", lambda: {"pm25": 10.5}, 1),
+        ("BME280", failing_read, 1),
+    ]
+
+    result = read_sequentially(reads)
+
+    assert result == {"SDS011": {"pm25": 10.5}}
+
+
+def test_read_concurrently_runs_in_parallel():
+    """Test that the cycle takes as long as the slowest sensor."""
+    barrier = threading.Barrier(2, timeout=1)
+
+    def read(value):
+        # Both reads must be in flight at the same time to pass the barrier
+        barrier.wait()
+        return {"value": value}
+
+    reads = [
+        ("SDS011", lambda: read(1), 2),
+        ("BME280", lambda: read(2), 2),
+    ]
+
+    result = read_concurrently(reads)
+
+    assert result == {"SDS011": {"value": 1}, "BME280": {"value": 2}}
+
+
+def test_read_concurrently_timeout():
+    """Test that a slow sensor misses its deadline without delaying the others."""
+    release = threading.Event()
+
+    def slow_read():
+        release.wait(5)
+        return {"pm25": 10.5}
+
+    reads = [
+        ("SDS011", slow_read, 0.1),
+        ("BME280", lambda: {"temperature_celsius": 25.0}, 1),
+    ]
+
+    start = time.monotonic()
+    result = read_concurrently(reads)
+    elapsed = time.monotonic() - start
+    release.set()
+
+    assert result == {"BME280": {"temperature_celsius": 25.0}}
+    assert elapsed < 1
+
+
+def test_read_concurrently_exception():
+    """Test that a failing sensor is left out of the result."""
+    def failing_read():
+        raise RuntimeError("Test error")
+
+    reads = [
+        ("SDS011", failing_read, 1),
+        ("BME280", lambda: {"humidity": 50.0}, 1),
+    ]
+
+    result = read_concurrently(reads)
+
+    assert result == {"BME280": {"humidity": 50.0}}
+
+
+def test_read_concurrently_empty():
+    """Test that no reads returns an empty result."""
+    assert read_concurrently([]) == {}
+
+
+def test_read_per_bus():
+    """Test that buses are read concurrently and the sensors on a bus one at a time."""
+    active = {"i2c": 0}
+    overlaps = []
+    barrier = threading.Barrier(2, timeout=1)
+
+    def i2c_read(value):
+        def read():
+            active["i2c"] += 1
+            overlaps.append(active["i2c"])
+            time.sleep(0.05)
+            active["i2c"] -= 1
+            return {"value": value}
+        return read
+
+    def serial_read():
+        barrier.wait()
+        return {"value": "serial"}
+
+    def first_i2c_read():
+        # The serial bus runs at the same time as the I2C bus
+        barrier.wait()
+        return i2c_read("outdoor")()
+
+    result = read_per_bus({
+        "i2c": [("outdoor", first_i2c_read, 1), ("mast", i2c_read("mast"), 1)],
+        "/dev/ttyUSB0": [("pm_north", serial_read, 1)],
+    })
+
+    assert result == {
+        "outdoor": {"value": "outdoor"},
+        "mast": {"value": "mast"},
+        "pm_north": {"value": "serial"},
+    }
+    assert max(overlaps) == 1
@@ -1,10 +1,14 @@
 """
 Tests for the SendDataAPI class.
 """
+import gzip
+import json
 from unittest.mock import patch
 
 import pytest
-from src.communication.api import SendDataAPI
+from requests.adapters import HTTPAdapter
+from src.communication.api import GORILLA_CONTENT_TYPE, SendDataAPI, get_api_session
+from src.communication.gorilla import decode_batch
 
 
 @pytest.fixture
@@ -51,22 +55,89 @@ def test_get_headers_with_token():
     }
 
 
-@patch('src.communication.api.requests.request')
+@pytest.fixture(autouse=True)
+def reset_session():
+    """Reset the HTTP session before each test."""
+    from src.communication import api
+    api._api_session = None
+    yield
+    api._api_session = None
+
+
+@patch('src.communication.api.get_api_session')
 @patch.object(SendDataAPI, '_get_url', return_value='https://example.com/api/weather')
 @patch.object(SendDataAPI, '_get_headers', return_value={'Content-Type': 'application/json'})
 @patch('src.communication.api.API_METHOD', 'POST')
-def test_make_request(mock_get_headers, mock_get_url, mock_request, sample_data):
+@patch('src.communication.api.API_GZIP', False)
+@patch('src.communication.api.API_CONNECT_TIMEOUT', 5)
+@patch('src.communication.api.API_READ_TIMEOUT', 15)
+def test_make_request(mock_get_headers, mock_get_url, mock_get_session, sample_data):
     """Test the _make_request method."""
     api = SendDataAPI(sample_data)
     api._make_request()
-    
-    # Check that requests.request was called with the correct arguments
+
+    # Check that the shared session was called with the correct arguments
+    mock_request = mock_get_session.return_value.request
     mock_request.assert_called_once_with(
         method='POST',
         url='https://example.com/api/weather',
         headers={'Content-Type': 'application/json'},
-        json=sample_data
+        timeout=(5, 15),
+        data=json.dumps(sample_data).encode('utf-8')
     )
+    mock_request.return_value.raise_for_status.assert_called_once()
+
+
+@patch('src.communication.api.get_api_session')
+@patch('src.communication.api.API_GZIP', True)
+def test_make_request_gzip(mock_get_session, sample_data):
+    """Test that the request body is gzip compressed."""
+    SendDataAPI(sample_data)._make_request()
+
+    kwargs = mock_get_session.return_value.request.call_args.kwargs
+    assert kwargs['headers']['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(kwargs['data'])) == sample_data
+    assert 'json' not in kwargs
+
+
+@patch('src.communication.api.get_api_session')
+@patch('src.communication.api.API_BATCH_FORMAT', 'gorilla')
+@patch('src.communication.api.API_GZIP', True)
+def test_make_request_gorilla_batch(mock_get_session, sample_data):
+    """Test that a batch is sent Gorilla compressed when enabled."""
+    SendDataAPI([sample_data, sample_data])._make_request()
+
+    kwargs = mock_get_session.return_value.request.call_args.kwargs
+    assert kwargs['headers']['Content-Type'] == GORILLA_CONTENT_TYPE
+    assert 'Content-Encoding' not in kwargs['headers']
+    assert decode_batch(kwargs['data']) == [sample_data, sample_data]
+
+
+def test_get_api_session_is_shared():
+    """Test that the session and its connection pool are reused."""
+    session = get_api_session()
+
+    assert get_api_session() is session
+    assert isinstance(session.get_adapter('https://example.com'), HTTPAdapter)
+
+
+@patch.object(SendDataAPI, '_make_request', autospec=True)
+@patch('src.communication.api.API_BATCH_ENABLE', True)
+def test_send_batch(mock_make_request, sample_data):
+    """Test that batch mode sends all readings in one request as a JSON array."""
+    SendDataAPI.send_batch([sample_data, sample_data])
+
+    mock_make_request.assert_called_once()
+    assert mock_make_request.call_args.args[0].data == [sample_data, sample_data]
+
+
+@patch.object(SendDataAPI, '_make_request', autospec=True)
+@patch('src.communication.api.API_BATCH_ENABLE', False)
+def test_send_batch_disabled(mock_make_request, sample_data):
+    """Test that without batch mode every reading is its own request."""
+    SendDataAPI.send_batch([sample_data, sample_data])
+
+    assert mock_make_request.call_count == 2
 
 
 @patch.object(SendDataAPI, '_make_request')
@@ -0,0 +1,42 @@
+"""
+Tests for the BME280 compensation formulas.
+"""
+import pytest
+from src.sensors.bme280_compensation import compensate, parse_burst
+
+TEMPERATURE_CALIB = [27504, 26435, -1000]
+PRESSURE_CALIB = [36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000]
+HUMIDITY_CALIB = [75, 362, 0, 313, 50, 30]
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture providing the registers 0xF7-0xFE with the raw values of the Bosch datasheet example."""
+    return bytearray([101, 90, 192, 126, 237, 0, 117, 48])
+
+
+def test_parse_burst(sample_data):
+    """Test that the burst is split into raw temperature, pressure and humidity."""
+    assert parse_burst(sample_data) == (519888, 415148, 30000)
+
+
+def test_compensate_datasheet_example(sample_data):
+    """Test the compensation against the datasheet example: 25.08 C and 100653.27 Pa."""
+    snapshot = compensate(sample_data, TEMPERATURE_CALIB, PRESSURE_CALIB, HUMIDITY_CALIB)
+
+    assert snapshot.t_fine == 128422
+    assert snapshot.temperature == pytest.approx(25.08, abs=0.01)
+    assert snapshot.pressure == pytest.approx(1006.5327, abs=0.001)
+    assert 0 <= snapshot.humidity <= 100
+
+
+def test_compensate_skipped_measurements(sample_data):
+    """Test that skipped pressure and humidity measurements give None."""
+    sample_data[0:3] = bytes([0x80, 0x00, 0x00])
+    sample_data[6:8] = bytes([0x80, 0x00])
+
+    snapshot = compensate(sample_data, TEMPERATURE_CALIB, PRESSURE_CALIB, HUMIDITY_CALIB)
+
+    assert snapshot.pressure is None
+    assert snapshot.humidity is None
+    assert snapshot.temperature == pytest.approx(25.08, abs=0.01)
@@ -28,12 +28,21 @@ def mock_adafruit_bme280():
         mock_sensor.temperature = 25.0
         mock_sensor.humidity = 50.0
         mock_sensor.pressure = 1013.25
+        # Calibration and raw registers of the Bosch datasheet example: 25.08 C, 1006.53 hPa
+        mock_sensor._temperature_calib = [27504, 26435, -1000]
+        mock_sensor._pressure_calib = [36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000]
+        mock_sensor._humidity_calib = [75, 362, 0, 313, 50, 30]
+        mock_sensor._read_register.return_value = bytearray([101, 90, 192, 126, 237, 0, 117, 48])
+        mock_sensor._get_status.return_value = 0
 
         # Configure the mock Adafruit_BME280_I2C class
         mock_bme280.Adafruit_BME280_I2C.return_value = mock_sensor
 
         # Set up the mode constants
         mock_bme280.MODE_NORMAL = 1
+        mock_bme280.MODE_SLEEP = 7
+        mock_bme280.MODE_FORCE = 8
+        mock_bme280.IIR_FILTER_DISABLE = 9
         mock_bme280.STANDBY_TC_500 = 2
         mock_bme280.IIR_FILTER_X16 = 3
         mock_bme280.OVERSCAN_X16 = 4
@@ -43,6 +52,8 @@ def mock_adafruit_bme280():
         yield mock_sensor
 
 
+@patch('src.sensors.bme280sensor.BME280_MODE', "normal")
+@patch('src.sensors.bme280sensor.BME280_IIR_FILTER', 16)
 def test_init(mock_adafruit_bme280):
     """Test the initialization of the BME280Sensor class."""
     sensor = BME280Sensor()
@@ -67,10 +78,85 @@ def test_get_measurement(mock_adafruit_bme280):
 
     # Check that the result contains the expected keys and values
     assert result["sensor_temp_hum"] == "bme280"
-    assert result["temperature_farenheit"] == 77.0  # 25.0 * (9/5) + 32
-    assert result["temperature_celsius"] == 25.0
-    assert result["humidity"] == 50.0
-    assert result["pressure"] == 1013.25
+    assert result["temperature_farenheit"] == pytest.approx(77.148, abs=0.001)  # 25.08 * (9/5) + 32
+    assert result["temperature_celsius"] == pytest.approx(25.08, abs=0.01)
+    assert result["humidity"] == pytest.approx(55.0, abs=0.01)
+    assert result["pressure"] == pytest.approx(1006.53, abs=0.01)
+
+
+def test_read_snapshot_single_burst(mock_adafruit_bme280):
+    """Test that a snapshot reads all data registers in one burst and keeps t_fine."""
+    sensor = BME280Sensor()
+    snapshot = sensor.read_snapshot()
+
+    mock_adafruit_bme280._read_register.assert_called_once_with(0xF7, 8)
+    assert snapshot.t_fine == 128422
+    assert sensor.t_fine == 128422
+
+
+def test_init_forced_mode(mock_adafruit_bme280):
+    """Test that in forced mode the sensor sleeps between readings with the IIR filter off."""
+    sensor = BME280Sensor()
+
+    assert sensor.forced is True
+    assert sensor.sensor.mode == 7  # MODE_SLEEP
+    assert sensor.sensor.iir_filter == 9  # IIR_FILTER_DISABLE
+    # 1.25 + 2.3 * 2 + (2.3 * 16 + 0.575) + (2.3 * 1 + 0.575) ms
+    assert sensor.measurement_time == pytest.approx(0.0461)
+
+
+@patch('src.sensors.bme280sensor.time.sleep')
+def test_forced_conversion_before_read(mock_sleep, mock_adafruit_bme280):
+    """Test that a forced conversion is started and waited for before the registers are read."""
+    sensor = BME280Sensor()
+    calls = []
+    mock_adafruit_bme280._read_register.side_effect = lambda *args: calls.append("read") or bytearray(
+        [101, 90, 192, 126, 237, 0, 117, 48]
+    )
+    mock_sleep.side_effect = lambda seconds: calls.append(("sleep", seconds))
+
+    sensor.get_measurement()
+
+    assert sensor.sensor.mode == 8  # MODE_FORCE
+    assert calls == [("sleep", sensor.measurement_time), "read"]
+
+
+@patch('src.sensors.bme280sensor.time.sleep')
+def test_forced_conversion_timeout(_mock_sleep, mock_adafruit_bme280):
+    """Test that a conversion that never finishes raises an error."""
+    sensor = BME280Sensor()
+    mock_adafruit_bme280._get_status.return_value = 0x08
+
+    with pytest.raises(TimeoutError):
+        sensor.get_measurement()
+
+
+@patch('src.sensors.bme280sensor.BME280_OVERSAMPLING_PRESSURE', 3)
+def test_invalid_oversampling(mock_adafruit_bme280):
+    """Test that an unsupported oversampling is rejected."""
+    with pytest.raises(ValueError):
+        BME280Sensor()
+
+
+@patch('src.sensors.bme280sensor.BME280_OVERSAMPLING_TEMPERATURE', 0)
+def test_temperature_oversampling_cannot_be_skipped(mock_adafruit_bme280):
+    """Test that skipping the temperature is rejected, the other measurements are compensated with it."""
+    with pytest.raises(ValueError):
+        BME280Sensor()
+
+
+@patch('src.sensors.bme280sensor.timed_import')
+def test_init_behind_multiplexer(mock_timed_import, mock_adafruit_bme280):
+    """Test that a sensor behind a TCA9548A uses the multiplexer channel as its bus."""
+    mux = mock_timed_import.return_value.TCA9548A.return_value
+
+    sensor = BME280Sensor(address="0x76", mux_address="0x70", mux_channel=3)
+
+    from src.sensors.bme280sensor import adafruit_bme280, board
+    mock_timed_import.return_value.TCA9548A.assert_called_once_with(board.I2C.return_value, address=0x70)
+    adafruit_bme280.Adafruit_BME280_I2C.assert_called_once_with(mux.__getitem__.return_value, address=0x76)
+    mux.__getitem__.assert_called_once_with(3)
+    assert sensor.address == 0x76
 
 
 def test_get_data(mock_adafruit_bme280):
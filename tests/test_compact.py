@@ -0,0 +1,116 @@
+"""
+Tests for the compact binary payload format and its schema registry.
+"""
+import json
+import struct
+import time
+
+import pytest
+from src.communication.compact import VERSION, decode_compact, encode_compact
+from src.communication.schema import FIELDS, FIELDS_BY_ID, MAX_FIELD_ID
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture to provide a full weather reading."""
+    return {
+        "timestamp": 1700000000.123456,
+        "sensor_air_quality": "sds011",
+        "pm25": 10.5,
+        "pm10": 20.25,
+        "sensor_temp_hum": "bme280",
+        "temperature_farenheit": 77.0,
+        "temperature_celsius": 25.0,
+        "humidity": 50.5,
+        "pressure": 1013.25,
+    }
+
+
+def test_schema_field_ids():
+    """Test that field IDs are unique and fit in the 32-bit field masks."""
+    assert len(FIELDS_BY_ID) == len(FIELDS)
+    assert all(0 <= field.id <= MAX_FIELD_ID for field in FIELDS)
+
+
+def test_round_trip(sample_data):
+    """Test that a reading is decoded to the values it was encoded from."""
+    payload = encode_compact(sample_data)
+
+    assert payload[0] == VERSION
+    assert decode_compact(payload) == sample_data
+
+
+def test_round_trip_float32_precision():
+    """Test that measurements are rounded to float32 and keep about 7 significant digits."""
+    data = {"pm25": 20.3, "pressure": 1013.2712345}
+    decoded = decode_compact(encode_compact(data))
+
+    for field, value in data.items():
+        # Neither value is representable in float32, so the round trip is lossy
+        assert decoded[field] != value
+        assert decoded[field] == struct.unpack("<f", struct.pack("<f", value))[0]
+        assert decoded[field] == pytest.approx(value, rel=1e-7)
+    assert decoded["pressure"] != pytest.approx(1013.2712345, rel=1e-9)
+
+
+def test_round_trip_none_and_extra_keys():
+    """Test that None values, sensor instances and keys outside the registry survive the round trip."""
+    data = {
+        "timestamp": 1700000000.0,
+        "pm25": None,
+        "sample_count": 12,
+        "sensors": {"outdoor": {"temperature_celsius": 21.5}},
+        "firmware": "1.2.3",
+        "_extra": 1,
+    }
+
+    assert decode_compact(encode_compact(data)) == data
+
+
+def test_invalid_value():
+    """Test that a value that does not match its field format is rejected."""
+    with pytest.raises(ValueError):
+        encode_compact({"pm25": "high"})
+
+
+@pytest.mark.parametrize("payload", [
+    b"",
+    struct.pack("<BII", VERSION + 1, 0, 0),
+    struct.pack("<BII", VERSION, 1 << 30, 0),
+    encode_compact({"timestamp": 1700000000.0, "sensor_temp_hum": "bme280"})[:-2],
+])
+def test_decode_invalid(payload):
+    """Test that empty, unknown version, unknown field and truncated payloads are rejected."""
+    with pytest.raises(ValueError):
+        decode_compact(payload)
+
+
+def test_size_compared_to_json(sample_data):
+    """Test that the compact payload is less than a third of the JSON payload."""
+    json_size = len(json.dumps(sample_data).encode("utf-8"))
+    compact_size = len(encode_compact(sample_data))
+
+    # 9 header bytes, 8 timestamp bytes, 6 floats and 2 short strings
+    assert compact_size == 9 + 8 + 6 * 4 + 2 * (2 + 6)
+    assert compact_size * 3 < json_size
+
+
+
+@pytest.mark.benchmark
+def test_throughput_compared_to_json(sample_data, record_property):
+    """Benchmark encoding and decoding against the json module, the rates are recorded as properties."""
+    count = 2000
+
+    start = time.perf_counter()
+    for _ in range(count):
+        json.loads(json.dumps(sample_data))
+    json_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        decoded = decode_compact(encode_compact(sample_data))
+    compact_seconds = time.perf_counter() - start
+
+    assert decoded == sample_data
+    record_property("json_round_trips_per_second", round(count / json_seconds))
+    record_property("compact_round_trips_per_second", round(count / compact_seconds))
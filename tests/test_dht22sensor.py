@@ -2,6 +2,7 @@
 Tests for the DHT22Sensor class.
 """
 import sys
+import time
 from unittest.mock import MagicMock, PropertyMock, patch
 
 import pytest
@@ -10,7 +11,7 @@ import pytest
 sys.modules['board'] = MagicMock()
 sys.modules['adafruit_dht'] = MagicMock()
 
-from src.sensors.dht22sensor import DHT22Sensor  # noqa: E402
+from src.sensors.dht22sensor import MIN_READ_INTERVAL, DHT22Sensor  # noqa: E402
 
 
 @pytest.fixture
@@ -88,3 +89,110 @@ def test_get_temperature_humidity_exception(mock_adafruit_dht):
     assert temperature_f is None
     assert temperature_c is None
     assert humidity is None
+
+
+def test_init_pin(mock_adafruit_dht):
+    """Test that the data pin is configurable."""
+    from src.sensors.dht22sensor import adafruit_dht, board
+    board.D17 = 17
+
+    DHT22Sensor(pin="D17")
+
+    adafruit_dht.DHT22.assert_called_once_with(17, False)
+
+
+@patch('src.sensors.dht22sensor.time.monotonic')
+def test_min_read_interval(mock_monotonic, mock_adafruit_dht):
+    """Test that the sensor is read at most once every 2 seconds and the cached value is returned in between."""
+    mock_monotonic.return_value = 100.0
+    sensor = DHT22Sensor()
+    sensor.get_measurement()
+
+    mock_adafruit_dht.temperature = 26.0
+    mock_monotonic.return_value = 101.0
+    assert sensor.get_measurement()["temperature_celsius"] == 25.0
+    assert sensor.age == 1.0
+
+    mock_monotonic.return_value = 102.0
+    assert sensor.get_measurement()["temperature_celsius"] == 26.0
+    assert sensor.attempts == 2
+
+
+@patch('src.sensors.dht22sensor.time.monotonic')
+def test_failure_returns_last_good_value(mock_monotonic, mock_adafruit_dht):
+    """Test that a failed read returns the last good value and counts the failure."""
+    mock_monotonic.return_value = 100.0
+    sensor = DHT22Sensor(max_age=60)
+    sensor.get_measurement()
+
+    type(mock_adafruit_dht).temperature = PropertyMock(side_effect=RuntimeError("Checksum did not validate"))
+    with patch.object(sensor, "_schedule_retry") as mock_schedule_retry:
+        mock_monotonic.return_value = 130.0
+        assert sensor.get_measurement()["temperature_celsius"] == 25.0
+        mock_schedule_retry.assert_called_once()
+
+        # Too old to be reported
+        mock_monotonic.return_value = 170.0
+        sensor._retry_timer = None
+        assert sensor.get_measurement()["temperature_celsius"] is None
+
+    assert sensor.failure_rate == 2 / 3
+
+
+def test_failed_read_is_retried_in_background(mock_adafruit_dht):
+    """Test that a failed read is retried on the next allowed slot without blocking the caller."""
+    sensor = DHT22Sensor(max_retries=2)
+    readings = iter([RuntimeError("Timed out"), 24.0])
+
+    def temperature():
+        value = next(readings)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    type(mock_adafruit_dht).temperature = PropertyMock(side_effect=temperature)
+
+    with patch('src.sensors.dht22sensor.MIN_READ_INTERVAL', 0.05):
+        start = time.monotonic()
+        assert sensor.get_measurement()["temperature_celsius"] is None
+        assert time.monotonic() - start < 0.05
+
+        deadline = time.monotonic() + 2
+        while sensor.age is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert sensor.get_measurement()["temperature_celsius"] == 24.0
+    assert sensor.attempts == 2
+    sensor.close()
+
+
+@patch('src.sensors.dht22sensor.threading.Timer')
+@patch('src.sensors.dht22sensor.time.monotonic')
+def test_failed_read_during_retry_does_not_start_second_timer(mock_monotonic, mock_timer, mock_adafruit_dht):
+    """Test that a read of the caller while a retry attempt runs does not schedule another retry."""
+    mock_monotonic.return_value = 100.0
+    type(mock_adafruit_dht).temperature = PropertyMock(side_effect=RuntimeError("Timed out"))
+    sensor = DHT22Sensor(max_retries=2)
+    sensor.get_measurement()
+    assert mock_timer.call_count == 1
+
+    attempt = sensor._attempt
+    concurrent_reads = []
+
+    def attempt_with_concurrent_read():
+        result = attempt()
+        if not concurrent_reads:
+            concurrent_reads.append(True)
+            mock_monotonic.return_value += MIN_READ_INTERVAL
+            sensor.get_measurement()
+        return result
+
+    mock_monotonic.return_value = 102.0
+    with patch.object(sensor, "_attempt", side_effect=attempt_with_concurrent_read):
+        sensor._retry()
+
+    # Only the retry rescheduled itself
+    assert mock_timer.call_count == 2
+    assert sensor._retries_left == 1
+    sensor.close()
+    assert sensor._retry_timer is None
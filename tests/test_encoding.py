@@ -0,0 +1,121 @@
+"""
+Tests for the wire format encoding cache.
+"""
+import json
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.communication import encoding
+from src.communication.encoding import EncodedReading, encode, encode_json, json_bytes
+from src.communication.line_protocol import encode_lines
+from src.communication.send_data import send_data
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture to provide sample weather data."""
+    return {
+        "timestamp": 1700000000.0,
+        "pm25": 10.5,
+        "pm10": 20.3,
+        "temperature_celsius": 25.0,
+        "humidity": 50.0,
+        "pressure": 1013.25,
+    }
+
+
+def test_json_bytes(sample_data):
+    """Test that data is encoded as UTF-8 JSON bytes."""
+    assert json.loads(json_bytes(sample_data)) == sample_data
+
+
+def test_encoded_reading_encodes_once(sample_data):
+    """Test that every format is encoded once and the same bytes are returned afterwards."""
+    reading = EncodedReading(sample_data)
+    encoder = MagicMock(return_value=b"encoded")
+
+    first = encode(reading, "custom", encoder)
+    second = encode(reading, "custom", encoder)
+
+    assert first is second
+    encoder.assert_called_once_with(reading)
+    assert reading == sample_data
+
+
+def test_encoded_reading_invalidated_on_change(sample_data):
+    """Test that changing the reading drops its cached encodings."""
+    reading = EncodedReading(sample_data)
+    encode_json(reading)
+
+    reading["pm25"] = 11.0
+
+    assert json.loads(encode_json(reading))["pm25"] == 11.0
+
+
+def test_plain_dict_is_not_cached(sample_data):
+    """Test that a plain dict is encoded on every call."""
+    encoder = MagicMock(return_value=b"encoded")
+
+    encode(sample_data, "custom", encoder)
+    encode(sample_data, "custom", encoder)
+
+    assert encoder.call_count == 2
+
+
+def test_encode_json_batch(sample_data):
+    """Test that a batch is a JSON array built from the JSON of every reading."""
+    readings = [EncodedReading(sample_data), {**sample_data, "pm25": 1.0}]
+
+    assert json.loads(encode_json(readings)) == readings
+    assert json.loads(encode_json([])) == []
+
+
+def test_line_protocol_cached(sample_data):
+    """Test that the line protocol of a reading is encoded once."""
+    reading = EncodedReading(sample_data)
+
+    with patch('src.communication.line_protocol.encode_line', return_value="line") as mock_encode_line:
+        assert encode_lines([reading]) == ["line"]
+        assert encode_lines([reading]) == ["line"]
+
+    mock_encode_line.assert_called_once()
+
+
+@patch('src.communication.send_data.OUTBOX_ENABLE', False)
+@patch('src.communication.send_data.SEND_DATA_CONCURRENT', False)
+@patch('src.communication.send_data._enabled_sinks')
+def test_send_data_shares_encoding(mock_enabled_sinks, sample_data):
+    """Test that every sink gets the same reading and the JSON is encoded once."""
+    payloads = []
+
+    def sender(data):
+        payloads.append(encode_json(data))
+        return MagicMock()
+
+    mock_enabled_sinks.return_value = [("MQTT", sender, 30, False), ("SQS", sender, 30, True)]
+
+    with patch('src.communication.encoding.json.dumps', wraps=json.dumps) as mock_dumps:
+        send_data(sample_data)
+
+    mock_dumps.assert_called_once_with(sample_data)
+    assert payloads[0] is payloads[1]
+
+
+def test_orjson_backend(sample_data):
+    """Test that the orjson backend gives the same JSON document."""
+    pytest.importorskip("orjson")
+    with patch.object(encoding, "_backend", encoding._load_backend("orjson")):
+        assert json.loads(json_bytes(sample_data)) == sample_data
+
+
+def test_orjson_not_installed():
+    """Test that the json module is used when orjson is not installed."""
+    with patch.dict(sys.modules, {"orjson": None}):
+        assert encoding._load_backend("orjson") == "json"
+
+
+def test_invalid_backend():
+    """Test that an unknown backend is rejected."""
+    with pytest.raises(ValueError):
+        encoding._load_backend("simplejson")
@@ -0,0 +1,146 @@
+"""
+Tests for the Gorilla batch codec.
+"""
+import json
+import math
+import random
+import struct
+import time
+
+import pytest
+from src.communication.gorilla import (
+    BitReader,
+    BitWriter,
+    decode_batch,
+    decode_integers,
+    encode_batch,
+    encode_integers,
+)
+
+
+def _bits(value):
+    return struct.pack(">d", value)
+
+
+def assert_bit_exact(decoded, readings):
+    """Compare readings key by key, floats by their bit pattern."""
+    assert len(decoded) == len(readings)
+    for got, expected in zip(decoded, readings):
+        assert got.keys() == expected.keys()
+        for key, value in expected.items():
+            if isinstance(value, float):
+                assert _bits(got[key]) == _bits(value), key
+            else:
+                assert got[key] == value, key
+
+
+@pytest.fixture
+def sample_readings():
+    """Fixture to provide a day of one-minute readings with scheduling jitter."""
+    rng = random.Random(42)
+    timestamp = 1700000000.0
+    readings = []
+    for index in range(1440):
+        timestamp += 60 + rng.uniform(-0.005, 0.005)
+        temperature = round(20 + 5 * math.sin(index / 200) + rng.gauss(0, 0.05), 2)
+        readings.append({
+            "timestamp": timestamp,
+            "sensor_air_quality": "sds011",
+            "pm25": round(8 + rng.random() * 2, 1),
+            "pm10": round(15 + rng.random() * 3, 1),
+            "sensor_temp_hum": "bme280",
+            "temperature_farenheit": temperature * (9 / 5) + 32,
+            "temperature_celsius": temperature,
+            "humidity": round(55 + rng.gauss(0, 0.5), 2),
+            "pressure": round(1013 + rng.gauss(0, 0.2), 2),
+        })
+    return readings
+
+
+def test_bit_writer_reader():
+    """Test that values of any width are read back in order."""
+    writer = BitWriter()
+    values = [(1, 1), (0, 2), (0x7F, 7), (2 ** 64 - 1, 64), (12345, 32), (0, 1)]
+    for value, width in values:
+        writer.write(value, width)
+
+    reader = BitReader(writer.getvalue())
+    assert [reader.read(width) for _value, width in values] == [value for value, _width in values]
+
+
+def test_round_trip(sample_readings):
+    """Test that every reading round-trips bit for bit."""
+    assert_bit_exact(decode_batch(encode_batch(sample_readings)), sample_readings)
+
+
+def test_round_trip_special_values():
+    """Test missing keys, None, special floats, non-float values and other keys."""
+    readings = [
+        {"timestamp": 1700000000.5, "pm25": 1.0, "humidity": -0.0, "sensor_temp_hum": "bme280"},
+        {"timestamp": 1700000060.5, "pm25": None, "humidity": float("inf"), "sensor_temp_hum": "bme280"},
+        {"timestamp": 1700000120, "pm25": 3, "humidity": float("-inf"), "sample_count": 12},
+        {"pm25": struct.unpack(">d", b"\x7f\xf8\x00\x00\x00\x00\x00\x01")[0], "sensors": {"a": {"pm25": 1.5}}},
+        {"timestamp": None, "pressure": 5e-324},
+        {},
+        {"timestamp": -1.0, "pressure": 1.7976931348623157e308},
+    ]
+
+    assert_bit_exact(decode_batch(encode_batch(readings)), readings)
+
+
+def test_empty_batch():
+    """Test that an empty batch round-trips."""
+    assert decode_batch(encode_batch([])) == []
+
+
+def test_compression_ratio(sample_readings):
+    """Test that a batch takes a fraction of the JSON documents it replaces."""
+    json_size = sum(len(json.dumps(reading)) for reading in sample_readings)
+    gorilla_size = len(encode_batch(sample_readings))
+
+    assert gorilla_size * 4 < json_size
+
+
+@pytest.mark.parametrize("payload", [b"", b"XYZ\x01\x00\x00\x00\x01", b"GRL\x02\x00\x00\x00\x00"])
+def test_decode_invalid(payload):
+    """Test that short, foreign and unknown version payloads are rejected."""
+    with pytest.raises(ValueError):
+        decode_batch(payload)
+
+
+def test_decode_truncated(sample_readings):
+    """Test that a truncated batch is rejected."""
+    with pytest.raises(ValueError):
+        decode_batch(encode_batch(sample_readings)[:-20])
+
+
+def test_integers_round_trip():
+    """Test that increasing ids take about a bit each and any integer round-trips."""
+    ids = list(range(1000, 2000))
+    assert decode_integers(encode_integers(ids)) == ids
+    assert len(encode_integers(ids)) < 4 + 8 + 1000 // 8 + 8
+
+    values = [0, -1, 2 ** 63 - 1, -2 ** 63, 17, 5]
+    assert decode_integers(encode_integers(values)) == values
+
+
+@pytest.mark.benchmark
+def test_throughput(sample_readings, record_property):
+    """Benchmark encoding and decoding against the json module, the rates are recorded as properties."""
+    start = time.perf_counter()
+    payload = encode_batch(sample_readings)
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = decode_batch(payload)
+    decode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    json.loads(json.dumps(sample_readings))
+    json_seconds = time.perf_counter() - start
+
+    assert decoded == sample_readings
+    count = len(sample_readings)
+    record_property("gorilla_encodes_per_second", round(count / encode_seconds))
+    record_property("gorilla_decodes_per_second", round(count / decode_seconds))
+    record_property("json_round_trips_per_second", round(count / json_seconds))
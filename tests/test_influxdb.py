@@ -1,4 +1,6 @@
 import sys
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 # Mock influxdb_client before importing the module under test
@@ -11,6 +13,7 @@ sys.modules["influxdb_client.rest"] = MagicMock()
 
 import pytest
 from src.communication.influxdb import InfluxDBWrapper, SendDataInfluxDB
+from src.reading import ReadingBatch
 
 @pytest.fixture(autouse=True)
 def reset_singleton():
@@ -64,24 +67,67 @@ def test_write_data(mock_client_class, sample_data):
     assert kwargs['bucket'] == wrapper.bucket
     assert len(kwargs['record']) == 1
     
-    # Check that points were created correctly
-    point = kwargs['record'][0]
-    # Depending on implementation, we can check basic properties if accessible
-    # But usually just ensuring write is called with a list of points is enough for unit test
+    # Check that points were encoded as line protocol
+    line = kwargs['record'][0]
+    assert line.startswith("weather_data,sensor_air_quality=sds011,sensor_temp_hum=bme280 ")
+    assert "pm25=10.5" in line
+
+
+@patch("src.communication.influxdb.InfluxDBClient")
+def test_write_data_batch_with_timestamps(mock_client_class, sample_data):
+    """Test that a list of readings is written at once with their own timestamps."""
+    mock_client = MagicMock()
+    mock_write_api = MagicMock()
+    mock_client.write_api.return_value = mock_write_api
+    mock_client.health.return_value.status = "pass"
+    mock_client_class.return_value = mock_client
+
+    wrapper = InfluxDBWrapper()
+    wrapper.write_data([
+        dict(sample_data, timestamp=1234567890.0),
+        dict(sample_data, timestamp=1234567900.0),
+        {"unknown_field": 1},
+    ])
+
+    mock_write_api.write.assert_called_once()
+    kwargs = mock_write_api.write.call_args.kwargs
+    assert [line.rsplit(" ", 1)[1] for line in kwargs['record']] == ["1234567890", "1234567900"]
+    from src.communication.influxdb import WritePrecision
+    assert kwargs['write_precision'] == WritePrecision.S
+
+@patch("src.communication.influxdb.InfluxDBClient")
+def test_write_data_reading_batch(mock_client_class, sample_data):
+    """Test that a ReadingBatch from the outbox replay is written in one request."""
+    wrapper = InfluxDBWrapper()
+    batch = ReadingBatch([dict(sample_data, timestamp=1234567890.0), dict(sample_data, timestamp=1234567900.0)])
+    wrapper.write_data(batch)
+
+    kwargs = mock_client_class.return_value.write_api.return_value.write.call_args.kwargs
+    assert [line.rsplit(" ", 1)[1] for line in kwargs['record']] == ["1234567890", "1234567900"]
+
+@patch("src.communication.influxdb.ApiException", type("ApiException", (Exception,), {}))
+@patch("src.communication.influxdb.InfluxDBClient")
+def test_write_data_error_is_raised(mock_client_class, sample_data):
+    """Test that a failed write is raised, so the reading is not reported as sent."""
+    mock_client_class.return_value.write_api.return_value.write.side_effect = Exception("Connection refused")
 
-def test_validate_data_valid(sample_data):
-    """Test data validation with valid data."""
     wrapper = InfluxDBWrapper()
-    assert wrapper.validate_data(sample_data) is True
+    with pytest.raises(Exception, match="Connection refused"):
+        wrapper.write_data(sample_data)
 
-def test_validate_data_invalid():
-    """Test data validation with invalid data."""
+@patch("src.communication.influxdb.InfluxDBClient")
+def test_write_data_invalid_readings_skipped(mock_client_class):
+    """Test that nothing is written when no reading has a valid field."""
     wrapper = InfluxDBWrapper()
-    assert wrapper.validate_data({}) is False
-    assert wrapper.validate_data(None) is False
-    assert wrapper.validate_data({"unknown_field": 123}) is False
-    # Data with some valid fields should be valid
-    assert wrapper.validate_data({"temperature_celsius": 20}) is True
+    wrapper.write_data([{}, {"unknown_field": 123}, {"pm25": "high"}])
+
+    mock_client_class.return_value.write_api.return_value.write.assert_not_called()
+
+@patch("src.communication.influxdb.OUTBOX_ENABLE", True)
+@patch("src.communication.influxdb.INFLUXDB_WRITE_MODE", "batching")
+def test_outbox_uses_synchronous_writes():
+    """Test that writes are synchronous with the outbox, which acknowledges a reading once the write returns."""
+    assert InfluxDBWrapper().write_mode == "synchronous"
 
 @patch("src.communication.influxdb.InfluxDBWrapper")
 def test_send_data_influxdb(mock_wrapper_class, sample_data):
@@ -108,3 +154,95 @@ def test_read_data(mock_client_class):
     wrapper.read_data(query)
     
     mock_query_api.query.assert_called_once_with(org=wrapper.org, query=query)
+
+@patch("src.communication.influxdb.InfluxDBClient")
+def test_connect_does_not_wait_for_health_check(mock_client_class):
+    """Test that the health check runs in the background and does not block connect."""
+    release = threading.Event()
+    mock_client = MagicMock()
+
+    def health():
+        release.wait(5)
+        return MagicMock(status="pass")
+
+    mock_client.health.side_effect = health
+    mock_client_class.return_value = mock_client
+
+    wrapper = InfluxDBWrapper()
+    start = time.monotonic()
+    wrapper.connect()
+
+    assert time.monotonic() - start < 1
+    assert wrapper.healthy is None
+
+    release.set()
+    deadline = time.monotonic() + 1
+    while wrapper.healthy is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert wrapper.healthy is True
+    wrapper.close()
+
+@patch("src.communication.influxdb.INFLUXDB_HEALTH_MAX_BACKOFF", 0.01)
+def test_health_check_backoff():
+    """Test that failed health checks are retried until they pass."""
+    mock_client = MagicMock()
+    mock_client.health.side_effect = [
+        Exception("Connection refused"),
+        MagicMock(status="fail", message="starting"),
+        MagicMock(status="pass"),
+    ]
+
+    wrapper = InfluxDBWrapper()
+    with patch.object(wrapper._health_stop, "wait", return_value=False) as mock_wait:
+        wrapper._health_check_loop(mock_client)
+
+    assert mock_client.health.call_count == 3
+    assert [c.args[0] for c in mock_wait.call_args_list] == [1, 0.01]
+    assert wrapper.healthy is True
+
+@patch("src.communication.influxdb.INFLUXDB_HEALTH_CHECK", False)
+@patch("src.communication.influxdb.WriteOptions")
+@patch("src.communication.influxdb.WriteType")
+@patch("src.communication.influxdb.InfluxDBClient")
+def test_connect_write_mode(mock_client_class, mock_write_type, mock_write_options):
+    """Test that the configured write mode is used and no health check is made when disabled."""
+    wrapper = InfluxDBWrapper()
+    wrapper.write_mode = "synchronous"
+    wrapper.connect()
+
+    mock_write_type.__getitem__.assert_called_once_with("synchronous")
+    assert mock_write_options.call_args.kwargs["write_type"] == mock_write_type.__getitem__.return_value
+    mock_client_class.return_value.health.assert_not_called()
+
+@patch("src.communication.influxdb.INFLUXDB_FLUSH_TIMEOUT", 0.1)
+@patch("src.communication.influxdb.InfluxDBClient")
+def test_close_flush_deadline(mock_client_class):
+    """Test that close does not wait longer than the flush deadline for pending batches."""
+    release = threading.Event()
+    mock_client = MagicMock()
+    mock_client.health.return_value.status = "pass"
+    mock_client.write_api.return_value.close.side_effect = lambda: release.wait(5)
+    mock_client_class.return_value = mock_client
+
+    wrapper = InfluxDBWrapper()
+    wrapper.connect()
+    start = time.monotonic()
+    wrapper.close()
+
+    assert time.monotonic() - start < 1
+    mock_client.close.assert_called_once()
+    assert wrapper._client is None
+    release.set()
+
+@patch("src.communication.influxdb.InfluxDBClient")
+def test_get_latest_measurements_rollup(mock_client_class):
+    """Test that the buckets of a resolution are read from their own measurement."""
+    mock_query_api = mock_client_class.return_value.query_api.return_value
+
+    wrapper = InfluxDBWrapper()
+    wrapper.get_latest_measurements(minutes=1440, rollup="1h")
+
+    query = mock_query_api.query.call_args.kwargs["query"]
+    assert 'r["_measurement"] == "weather_data_1h"' in query
+    with pytest.raises(ValueError):
+        wrapper.get_latest_measurements(rollup='1h") |> drop(')
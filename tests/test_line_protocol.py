@@ -0,0 +1,102 @@
+"""
+Tests for the line_protocol module.
+"""
+import pytest
+from src.communication.line_protocol import encode_line, encode_lines
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture to provide sample weather data."""
+    return {
+        "timestamp": 1234567890.7,
+        "sensor_air_quality": "sds011",
+        "pm25": 10.5,
+        "pm10": 25,
+        "sensor_temp_hum": "bme280",
+        "temperature_farenheit": 77.0,
+        "temperature_celsius": 25.0,
+        "humidity": 50.0,
+        "pressure": 1013.25,
+    }
+
+
+def test_encode_line(sample_data):
+    """Test encoding a full reading with tags, fields and its own timestamp in seconds."""
+    line = encode_line(sample_data)
+
+    assert line == (
+        "weather_data,sensor_air_quality=sds011,sensor_temp_hum=bme280 "
+        "temperature_celsius=25.0,temperature_farenheit=77.0,humidity=50.0,"
+        "pressure=1013.25,pm25=10.5,pm10=25.0 1234567890"
+    )
+
+
+def test_encode_line_without_timestamp():
+    """Test that a reading without timestamp has no timestamp column."""
+    assert encode_line({"pm25": 10.5}) == "weather_data pm25=10.5"
+
+
+def test_encode_line_skips_missing_values():
+    """Test that None and non finite values are left out."""
+    line = encode_line({"pm25": None, "pm10": float("nan"), "humidity": 50.0, "timestamp": 1})
+
+    assert line == "weather_data humidity=50.0 1"
+
+
+def test_encode_line_escapes_tags():
+    """Test that special characters in tag values are escaped."""
+    line = encode_line({"sensor_temp_hum": "bme 280,a=b", "humidity": 50.0})
+
+    assert line == r"weather_data,sensor_temp_hum=bme\ 280\,a\=b humidity=50.0"
+
+
+def test_encode_line_invalid():
+    """Test that readings without valid fields or with invalid types are rejected."""
+    assert encode_line({}) is None
+    assert encode_line({"unknown_field": 123}) is None
+    assert encode_line({"pm25": "high"}) is None
+    assert encode_line({"pm25": True}) is None
+
+
+def test_encode_lines(sample_data):
+    """Test that many readings are encoded in one pass, skipping invalid ones."""
+    other = dict(sample_data, timestamp=1234567900.0)
+
+    lines = encode_lines([sample_data, {}, {"unknown_field": 1}, other])
+
+    assert len(lines) == 2
+    assert lines[0].endswith(" 1234567890")
+    assert lines[1].endswith(" 1234567900")
+
+
+def test_encode_lines_per_sensor(sample_data):
+    """Test that every named sensor gets its own point tagged with its name."""
+    sample_data["sensors"] = {
+        "mast": {"sensor_temp_hum": "bme280", "temperature_celsius": 21.5},
+        "shelter": {"sensor_temp_hum": "dht22", "humidity": 70.0},
+    }
+
+    lines = encode_lines([sample_data])
+
+    assert len(lines) == 3
+    assert lines[1] == "weather_data,sensor=mast,sensor_temp_hum=bme280 temperature_celsius=21.5 1234567890"
+    assert lines[2] == "weather_data,sensor=shelter,sensor_temp_hum=dht22 humidity=70.0 1234567890"
+
+
+def test_encode_line_rollup():
+    """Test that a rollup record goes to the measurement of its resolution with the statistics as fields."""
+    record = {
+        "timestamp": 1234567800.0,
+        "rollup": "1h",
+        "sensor_temp_hum": "bme280",
+        "count": 60,
+        "temperature_celsius_min": 20.0,
+        "temperature_celsius_max": 22.0,
+        "temperature_celsius": 25.0,
+    }
+
+    assert encode_line(record) == (
+        "weather_data_1h,sensor_temp_hum=bme280 count=60.0,temperature_celsius_min=20.0,"
+        "temperature_celsius_max=22.0 1234567800"
+    )
@@ -12,7 +12,8 @@ sys.modules['adafruit_bme280'] = MagicMock()
 sys.modules['adafruit_bme280.advanced'] = MagicMock()
 sys.modules['sds011'] = MagicMock()
 
-from main import get_weather  # noqa: E402
+from main import check_settings, get_weather  # noqa: E402
+from src.sensors.registry import ConfiguredSensor  # noqa: E402
 
 
 @patch('main.time.time', return_value=1234567890.0)
@@ -60,3 +61,83 @@ def test_get_weather(mock_time):
     assert result["humidity"] == 50.0
     assert result["pressure"] == 1013.25
 
+
+
+@patch('main.SENSOR_CONCURRENT_READ', False)
+@patch('main.time.time', return_value=1234567890.0)
+def test_get_weather_sequential(mock_time):
+    """Test the get_weather function in sequential mode with a failing sensor."""
+    mock_sds = MagicMock()
+    mock_sds.get_measurement.side_effect = Exception("Test error")
+
+    mock_bme = MagicMock()
+    mock_bme.get_measurement.return_value = {
+        "sensor_temp_hum": "bme280",
+        "temperature_celsius": 25.0,
+    }
+
+    result = get_weather(mock_sds, mock_bme)
+
+    assert result == {
+        "timestamp": 1234567890.0,
+        "sensor_temp_hum": "bme280",
+        "temperature_celsius": 25.0,
+    }
+
+
+def test_get_weather_no_sensors():
+    """Test the get_weather function without sensors."""
+    result = get_weather(None, None)
+
+    assert list(result.keys()) == ["timestamp"]
+
+
+@patch('main.time.time', return_value=1234567890.0)
+def test_get_weather_configured_sensors(mock_time):
+    """Test that configured sensors are namespaced and the first of each kind fills the flat keys."""
+    outdoor = MagicMock()
+    outdoor.get_measurement.return_value = {"sensor_temp_hum": "bme280", "temperature_celsius": 20.0}
+    mast = MagicMock()
+    mast.get_measurement.return_value = {"sensor_temp_hum": "bme280", "temperature_celsius": 18.0}
+    particulate = MagicMock()
+    particulate.get_measurement.side_effect = Exception("Serial error")
+    configured = [
+        ConfiguredSensor("outdoor", "i2c", 1, outdoor),
+        ConfiguredSensor("mast", "i2c", 1, mast),
+        ConfiguredSensor("pm_north", "/dev/ttyUSB0", 1, particulate),
+    ]
+
+    result = get_weather(None, None, configured)
+
+    assert result["temperature_celsius"] == 20.0
+    assert result["sensors"] == {
+        "outdoor": {"sensor_temp_hum": "bme280", "temperature_celsius": 20.0},
+        "mast": {"sensor_temp_hum": "bme280", "temperature_celsius": 18.0},
+    }
+
+
+@pytest.mark.parametrize("setting", ["MULTIRATE_ENABLE", "SAMPLING_ENABLE"])
+def test_check_settings_configured_sensors(setting):
+    """Test that settings that only drive the single SDS011 and BME280 are rejected with SENSORS."""
+    with patch('main.SENSORS', '[{"name": "outdoor", "type": "BME280"}]'), patch(f'main.{setting}', True):
+        with pytest.raises(ValueError):
+            check_settings()
+
+    with patch('main.SENSORS', ''), patch(f'main.{setting}', True):
+        check_settings()
+
+
+@pytest.mark.parametrize("loop_enabled, tsdb_enable, rejected", [
+    (False, False, True),
+    (False, True, False),
+    (True, False, False),
+])
+def test_check_settings_rollups(loop_enabled, tsdb_enable, rejected):
+    """Test that rollups in one-shot mode are rejected unless they can be rebuilt from the time series store."""
+    with patch('main.ROLLUP_ENABLE', True), patch('main.LOOP_ENABLED', loop_enabled), \
+            patch('main.TSDB_ENABLE', tsdb_enable), patch('main.SENSORS', ''):
+        if rejected:
+            with pytest.raises(ValueError):
+                check_settings()
+        else:
+            check_settings()
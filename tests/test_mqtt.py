@@ -1,10 +1,14 @@
 """
 Tests for the SendDataMQTT class.
 """
+import json
+import threading
 from unittest.mock import MagicMock, patch
 
+import paho.mqtt.client as mqtt_client
 import pytest
-from src.communication.mqtt import SendDataMQTT
+from src.communication.compact import decode_compact
+from src.communication.mqtt import MQTTSession, SendDataMQTT, get_mqtt_session
 
 
 @pytest.fixture
@@ -23,81 +27,245 @@ def sample_data():
     }
 
 
+@pytest.fixture(autouse=True)
+def reset_session():
+    """Reset the MQTT session before each test."""
+    from src.communication import mqtt
+    mqtt._mqtt_session_instance = None
+    yield
+    mqtt._mqtt_session_instance = None
+
+
+@pytest.fixture
+def mock_client():
+    """Fixture to provide a session whose paho client is mocked."""
+    with patch.object(MQTTSession, '_create_client') as mock_create_client:
+        client = MagicMock()
+        client.publish.return_value = MagicMock(rc=mqtt_client.MQTT_ERR_SUCCESS, mid=1)
+        mock_create_client.return_value = client
+        yield client
+
+
+def connect(session):
+    session._on_connect(None, None, None, MagicMock(is_failure=False), None)
+
+
 @patch('src.communication.mqtt.mqtt.Client')
 @patch('src.communication.mqtt.MQTT_USER', 'test_user')
 @patch('src.communication.mqtt.MQTT_PASSWORD', 'test_password')
-@patch('src.communication.mqtt.MQTT_HOST', 'mqtt.example.com')
-@patch('src.communication.mqtt.MQTT_PORT', '8883')
-def test_mqtt_client(mock_client):
-    """Test the _mqtt_client method."""
+def test_create_client(mock_client_class):
+    """Test the _create_client method."""
     # Configure the mock
     mock_client_instance = MagicMock()
-    mock_client.return_value = mock_client_instance
-    
+    mock_client_class.return_value = mock_client_instance
+
     # Call the method
-    client = SendDataMQTT({})._mqtt_client()
-    
+    client = MQTTSession._create_client()
+
     # Check that the client was created with the correct transport
-    mock_client.assert_called_once_with(transport="websockets")
-    
+    mock_client_class.assert_called_once_with(mqtt_client.CallbackAPIVersion.VERSION2, transport="websockets")
+
     # Check that TLS was set
     mock_client_instance.tls_set.assert_called_once()
-    
+
     # Check that username and password were set
     mock_client_instance.username_pw_set.assert_called_once_with('test_user', 'test_password')
-    
-    # Check that connect was called with the correct parameters
-    mock_client_instance.connect.assert_called_once_with('mqtt.example.com', 8883, 30)
-    
+
     # Check that the client was returned
     assert client == mock_client_instance
 
 
-@patch('json.dumps')
-def test_publish(mock_dumps, sample_data):
-    """Test the _publish method."""
-    # Configure the mock
-    mock_dumps.return_value = '{"key": "value"}'
-    
-    # Create a mock client
-    mock_client = MagicMock()
-    mock_publish_result = MagicMock()
-    mock_client.publish.return_value = mock_publish_result
-    
-    # Call the method
-    SendDataMQTT({})._publish(mock_client, 'test/topic', sample_data)
-    
-    # Check that json.dumps was called with the correct data
-    mock_dumps.assert_called_once_with(sample_data)
-    
-    # Check that client.publish was called with the correct parameters
-    mock_client.publish.assert_called_once_with('test/topic', '{"key": "value"}')
-    
-    # Check that wait_for_publish was called
-    mock_publish_result.wait_for_publish.assert_called_once()
-
-
-@patch.object(SendDataMQTT, '_mqtt_client')
+@patch('src.communication.mqtt.MQTT_HOST', 'mqtt.example.com')
+@patch('src.communication.mqtt.MQTT_PORT', '8883')
+@patch('src.communication.mqtt.MQTT_KEEPALIVE', 45)
+def test_start(mock_client):
+    """Test that the session connects asynchronously and starts the network loop once."""
+    session = MQTTSession()
+    session.start()
+    session.start()
+
+    mock_client.connect_async.assert_called_once_with('mqtt.example.com', 8883, 45)
+    mock_client.loop_start.assert_called_once()
+    mock_client.reconnect_delay_set.assert_called_once()
+
+
+def test_get_mqtt_session_is_shared(mock_client):
+    """Test that every send reuses the same session."""
+    assert get_mqtt_session() is get_mqtt_session()
+    mock_client.loop_start.assert_called_once()
+
+
+def test_publish_connected(mock_client):
+    """Test that a message is published with the configured QoS while connected."""
+    session = MQTTSession(qos=1)
+    session.start()
+    connect(session)
+
+    session.publish('test/topic', 'payload')
+
+    mock_client.publish.assert_called_once_with('test/topic', 'payload', qos=1)
+    assert session.pending() == 1
+
+    # Broker acknowledgement
+    session._on_publish(None, None, 1, None, None)
+    assert session.pending() == 0
+
+
+def test_publish_offline_is_queued_and_flushed(mock_client):
+    """Test that messages published while offline are sent after reconnecting."""
+    session = MQTTSession(qos=1)
+    session.start()
+
+    assert session.publish('test/topic', 'first') is None
+    assert session.publish('test/topic', 'second') is None
+    mock_client.publish.assert_not_called()
+    assert session.pending() == 2
+
+    connect(session)
+
+    assert [c.args[1] for c in mock_client.publish.call_args_list] == ['first', 'second']
+
+
+def test_offline_queue_is_bounded(mock_client):
+    """Test that the offline queue drops the oldest messages when full."""
+    session = MQTTSession(queue_size=2)
+    session.start()
+
+    for payload in ('first', 'second', 'third'):
+        session.publish('test/topic', payload)
+
+    assert list(session._offline_queue) == [('test/topic', 'second'), ('test/topic', 'third')]
+
+
+def test_qos0_requeued_on_disconnect(mock_client):
+    """Test that QoS 0 messages not acknowledged are queued again after a disconnect."""
+    session = MQTTSession(qos=0)
+    session.start()
+    connect(session)
+    session.publish('test/topic', 'payload')
+
+    session._on_disconnect(None, None, None, 7, None)
+
+    assert session.connected is False
+    assert list(session._offline_queue) == [('test/topic', 'payload')]
+
+
+def test_deliver_waits_for_acknowledgement(mock_client):
+    """Test that a delivery waits for the broker acknowledgement."""
+    session = MQTTSession(qos=1)
+    session.start()
+    connect(session)
+    info = mock_client.publish.return_value
+    info.is_published.return_value = True
+
+    session.deliver('test/topic', 'payload', timeout=5)
+
+    mock_client.publish.assert_called_once_with('test/topic', 'payload', qos=1)
+    assert 0 < info.wait_for_publish.call_args.args[0] <= 5
+
+
+def test_deliver_not_connected(mock_client):
+    """Test that a reading is never reported as sent before the session is connected."""
+    session = MQTTSession(qos=1)
+    session.start()
+
+    with pytest.raises(TimeoutError):
+        session.deliver('test/topic', 'first', timeout=0.01)
+    with pytest.raises(TimeoutError):
+        session.deliver('test/topic', 'second', timeout=0.01, queue=False)
+
+    mock_client.publish.assert_not_called()
+    assert list(session._offline_queue) == [('test/topic', 'first')]
+
+
+def test_deliver_not_acknowledged(mock_client):
+    """Test that a message without an acknowledgement in time raises."""
+    session = MQTTSession(qos=1)
+    session.start()
+    connect(session)
+    mock_client.publish.return_value.is_published.return_value = False
+
+    with pytest.raises(TimeoutError):
+        session.deliver('test/topic', 'payload', timeout=0.01)
+
+
+def test_paho_called_without_session_lock(mock_client):
+    """Test that paho is never called with the session lock held, as its network thread calls back into it."""
+    session = MQTTSession(qos=1)
+    session.start()
+    connect(session)
+    locked = []
+
+    def check_lock(*args, **kwargs):
+        locked.append(session._lock.locked())
+        return MagicMock(rc=mqtt_client.MQTT_ERR_SUCCESS, mid=len(locked))
+
+    mock_client.publish.side_effect = check_lock
+    mock_client.loop_stop.side_effect = check_lock
+    session.publish('test/topic', 'payload')
+    session._on_publish(None, None, 1, None, None)
+    session.close(timeout=0)
+
+    assert locked == [False, False]
+
+
+def test_close_waits_for_acknowledgements(mock_client):
+    """Test that close waits for outstanding acknowledgements before disconnecting."""
+    session = MQTTSession(qos=1)
+    session.start()
+    connect(session)
+    session.publish('test/topic', 'payload')
+
+    threading.Timer(0.05, session._on_publish, (None, None, 1, None, None)).start()
+    session.close(timeout=5)
+
+    assert session.pending() == 0
+    mock_client.disconnect.assert_called_once()
+    mock_client.loop_stop.assert_called_once()
+
+
+@patch('src.communication.mqtt.MQTT_PUBLISH_TIMEOUT', 5.0)
+@patch('src.communication.mqtt.OUTBOX_ENABLE', False)
+def test_publish(sample_data):
+    """Test that the reading is delivered and kept in the offline queue if it cannot be."""
+    mock_session = MagicMock()
+
+    SendDataMQTT({})._publish(mock_session, 'test/topic', sample_data)
+
+    mock_session.deliver.assert_called_once_with(
+        'test/topic', json.dumps(sample_data).encode('utf-8'), 5.0, queue=True
+    )
+
+
+@patch('src.communication.mqtt.OUTBOX_ENABLE', True)
+def test_publish_with_outbox(sample_data):
+    """Test that readings are left to the outbox instead of the in-memory queue."""
+    mock_session = MagicMock()
+
+    SendDataMQTT({})._publish(mock_session, 'test/topic', sample_data)
+
+    assert mock_session.deliver.call_args.kwargs["queue"] is False
+
+
+@patch('src.communication.mqtt.MQTT_PAYLOAD_FORMAT', 'compact')
+def test_publish_compact(sample_data):
+    """Test that the reading is published in the compact binary format when enabled."""
+    mock_session = MagicMock()
+
+    SendDataMQTT({})._publish(mock_session, 'test/topic', sample_data)
+
+    payload = mock_session.deliver.call_args.args[1]
+    assert decode_compact(payload) == sample_data
+
+
+@patch('src.communication.mqtt.get_mqtt_session')
 @patch.object(SendDataMQTT, '_publish')
 @patch('src.communication.mqtt.MQTT_TOPIC', 'weather/data')
-def test_send(mock_publish, mock_mqtt_client, sample_data):
+def test_send(mock_publish, mock_get_session, sample_data):
     """Test the send method."""
-    # Configure the mocks
-    mock_client = MagicMock()
-    mock_mqtt_client.return_value = mock_client
-    
     # Call the method
     mqtt = SendDataMQTT(sample_data)
     mqtt.send()
-    
-    # Check that _mqtt_client was called
-    mock_mqtt_client.assert_called_once()
-    
-    # Check that client.loop_start was called
-    mock_client.loop_start.assert_called_once()
-    
-    # Check that _publish was called with the correct parameters
-    mock_publish.assert_called_once_with(mock_client, 'weather/data', sample_data)
-    
-    # Check that client.disconnect was called
-    mock_client.disconnect.assert_called_once()
\ No newline at end of file
+
+    # Check that _publish was called with the shared session
+    mock_publish.assert_called_once_with(mock_get_session.return_value, 'weather/data', sample_data)
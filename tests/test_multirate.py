@@ -0,0 +1,108 @@
+"""
+Tests for the multi-rate acquisition.
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.multirate import ReadingCollector, create_multirate_scheduler, push_sink, read_sensor
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture providing BME280 and SDS011 measurements."""
+    return {
+        "BME280": {"sensor_temp_hum": "BME280", "temperature_celsius": 20.0, "humidity": 50.0},
+        "SDS011": {"sensor_air_quality": "SDS011", "pm25": 10.0, "pm10": 20.0},
+    }
+
+
+def test_latest_mode(sample_data):
+    """Test that a sink gets the latest value of every field."""
+    collector = ReadingCollector(["InfluxDB"])
+    collector.add(sample_data["SDS011"], timestamp=1.0)
+    collector.add(sample_data["BME280"], timestamp=2.0)
+    collector.add({"temperature_celsius": 22.0}, timestamp=3.0)
+
+    data = collector.take("InfluxDB")
+
+    assert data["timestamp"] == 3.0
+    assert data["temperature_celsius"] == 22.0
+    assert data["pm25"] == 10.0
+    assert collector.take("InfluxDB") is None
+
+
+def test_mean_mode_per_sink(sample_data):
+    """Test that every sink gets the mean since its own previous push."""
+    collector = ReadingCollector(["InfluxDB", "Sensor Community"], mode="mean")
+    collector.add(sample_data["SDS011"], timestamp=1.0)
+    collector.add(sample_data["BME280"], timestamp=2.0)
+
+    influx_first = collector.take("InfluxDB")
+    collector.add({"temperature_celsius": 22.0}, timestamp=3.0)
+    influx_second = collector.take("InfluxDB")
+    community = collector.take("Sensor Community")
+
+    assert influx_first["temperature_celsius"] == 20.0
+    assert influx_second == {
+        "timestamp": 3.0,
+        "sensor_temp_hum": "BME280",
+        "sensor_air_quality": "SDS011",
+        "temperature_celsius": 22.0,
+    }
+    assert community["temperature_celsius"] == 21.0
+    assert community["pm25"] == 10.0
+
+
+def test_invalid_mode():
+    """Test that an unknown sink data mode is rejected."""
+    with pytest.raises(ValueError):
+        ReadingCollector(["API"], mode="median")
+
+
+def test_read_sensor(sample_data):
+    """Test that a sensor task adds its measurement to the collector."""
+    collector = ReadingCollector(["API"])
+    sensor = MagicMock()
+    sensor.get_measurement.return_value = sample_data["BME280"]
+
+    read_sensor("BME280", sensor, collector)
+
+    assert collector.take("API")["humidity"] == 50.0
+
+
+@patch('src.multirate.send_data_nowait')
+def test_push_sink(mock_send_data, sample_data):
+    """Test that a sink task hands the collected data to its own sink only, without waiting."""
+    collector = ReadingCollector(["API"])
+    collector.add(sample_data["SDS011"], timestamp=1.0)
+
+    push_sink("API", collector)
+    push_sink("API", collector)
+
+    mock_send_data.assert_called_once()
+    assert mock_send_data.call_args.kwargs == {"sink": "API"}
+
+
+@patch('src.multirate.add_to_rollups', return_value=[{"timestamp": 0.0, "rollup": "1m", "count": 1}])
+@patch('src.multirate.send_data_nowait')
+def test_read_sensor_rollups(mock_send_data, _mock_rollups, sample_data):
+    """Test that finished rollups are handed to the sink thread pool instead of sent on the scheduler thread."""
+    sensor = MagicMock()
+    sensor.get_measurement.return_value = sample_data["BME280"]
+
+    read_sensor("BME280", sensor, ReadingCollector(["API"]))
+
+    mock_send_data.assert_called_once_with({"timestamp": 0.0, "rollup": "1m", "count": 1})
+
+
+@patch('src.multirate.sink_intervals', return_value={"Sensor Community": 145, "InfluxDB": 10})
+@patch('src.settings.BME280_INTERVAL', 5)
+def test_create_multirate_scheduler(_mock_intervals):
+    """Test that enabled sensors and sinks are scheduled on their own intervals."""
+    scheduler = create_multirate_scheduler({"SDS011": None, "BME280": MagicMock()})
+
+    assert {name: interval for name, (interval, _task) in scheduler._tasks.items()} == {
+        "BME280": 5,
+        "Sensor Community": 145,
+        "InfluxDB": 10,
+    }
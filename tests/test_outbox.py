@@ -0,0 +1,228 @@
+"""
+Tests for the Outbox class.
+"""
+import json
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+from src.communication.outbox import Outbox
+from src.reading import ReadingBatch
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    """Fixture to provide an outbox in a temporary directory."""
+    outbox = Outbox(path=str(tmp_path / "outbox.sqlite3"), max_readings=5)
+    yield outbox
+    outbox.close()
+
+
+def test_wal_mode(outbox):
+    """Test that the database uses WAL mode without fsync on every commit."""
+    assert outbox._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # 1 = NORMAL
+    assert outbox._connection.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+
+def test_new_sink_starts_at_latest_reading(outbox):
+    """Test that a sink seen for the first time only gets the latest reading."""
+    outbox.append({"pm25": 1.0})
+    outbox.append({"pm25": 2.0})
+
+    rows = outbox.pending("API", 10)
+
+    assert [data for _id, data in rows] == [{"pm25": 2.0}]
+
+
+def test_cursor_per_sink(outbox):
+    """Test that every sink keeps its own cursor."""
+    first_id = outbox.append({"pm25": 1.0})
+    outbox.pending("API", 10)
+    outbox.pending("MQTT", 10)
+    outbox.ack("API", first_id)
+
+    outbox.append({"pm25": 2.0})
+
+    assert [data for _id, data in outbox.pending("API", 10)] == [{"pm25": 2.0}]
+    assert [data for _id, data in outbox.pending("MQTT", 10)] == [{"pm25": 1.0}, {"pm25": 2.0}]
+    assert outbox.count("API") == 1
+    assert outbox.count("MQTT") == 2
+
+
+def test_pending_limit(outbox):
+    """Test that pending readings are returned oldest first in batches."""
+    outbox.pending("API", 10)
+    for value in range(3):
+        outbox.append({"pm25": float(value)})
+
+    rows = outbox.pending("API", 2)
+
+    assert [data for _id, data in rows] == [{"pm25": 0.0}, {"pm25": 1.0}]
+
+
+def test_acknowledged_readings_are_removed(outbox):
+    """Test that readings acknowledged by every sink are pruned."""
+    reading_id = outbox.append({"pm25": 1.0})
+    outbox.pending("API", 10)
+    outbox.ack("API", reading_id)
+
+    outbox.append({"pm25": 2.0})
+
+    assert outbox.count() == 1
+
+
+def test_disabled_sink_does_not_block_pruning(outbox):
+    """Test that the cursor of a sink that is no longer active is ignored when pruning."""
+    outbox.append({"pm25": 0.0})
+    outbox.pending("MQTT", 10)
+    reading_id = outbox.append({"pm25": 1.0}, active_sinks=["API", "MQTT"])
+    outbox.pending("API", 10)
+    outbox.ack("API", reading_id)
+
+    outbox.append({"pm25": 2.0}, active_sinks=["API", "MQTT"])
+    assert outbox.count() == 3
+
+    # MQTT was disabled, only the API cursor counts
+    outbox.append({"pm25": 3.0}, active_sinks=["API"])
+    assert outbox.count() == 2
+
+
+def test_retention_limit(outbox):
+    """Test that the outbox never holds more than max_readings."""
+    outbox.pending("API", 10)
+    for value in range(8):
+        outbox.append({"pm25": float(value)})
+
+    assert outbox.count() == 5
+    rows = outbox.pending("API", 10)
+    assert rows[0][1] == {"pm25": 3.0}
+
+
+def test_survives_reopen(tmp_path):
+    """Test that readings and cursors are durable across restarts."""
+    path = str(tmp_path / "outbox.sqlite3")
+    outbox = Outbox(path=path)
+    outbox.pending("API", 10)
+    outbox.append({"pm25": 1.0})
+    outbox.close()
+
+    outbox = Outbox(path=path)
+    assert [data for _id, data in outbox.pending("API", 10)] == [{"pm25": 1.0}]
+    outbox.close()
+
+
+def test_reading_for_single_sink(outbox):
+    """Test that a reading addressed to one sink is not delivered to the others."""
+    outbox.pending("API", 10)
+    outbox.pending("MQTT", 10)
+    outbox.append({"pm25": 1.0}, "API")
+    outbox.append({"pm25": 2.0})
+
+    assert [data for _id, data in outbox.pending("API", 10)] == [{"pm25": 1.0}, {"pm25": 2.0}]
+    assert [data for _id, data in outbox.pending("MQTT", 10)] == [{"pm25": 2.0}]
+    assert outbox.count("MQTT") == 1
+
+
+def test_adds_sink_column_to_existing_database(tmp_path):
+    """Test that a database created before per-sink readings is upgraded."""
+    path = str(tmp_path / "outbox.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE readings (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)")
+    connection.execute("INSERT INTO readings (data) VALUES ('{\"pm25\": 1.0}')")
+    connection.commit()
+    connection.close()
+
+    outbox = Outbox(path=path)
+    outbox.append({"pm25": 2.0}, "API")
+
+    assert outbox.count() == 2
+    outbox.close()
+
+
+def test_pending_reuses_stored_json(outbox):
+    """Test that replayed readings carry the stored JSON so sinks do not encode them again."""
+    from src.communication.encoding import encode_json
+
+    outbox.pending("API", 10)
+    outbox.append({"pm25": 1.0})
+
+    [(_id, data)] = outbox.pending("API", 10)
+
+    with patch('src.communication.encoding.json.dumps') as mock_dumps:
+        assert json.loads(encode_json(data)) == {"pm25": 1.0}
+    mock_dumps.assert_not_called()
+
+
+def test_pending_batch(outbox):
+    """Test that a sink that sends batches gets the pending readings as a columnar batch with their stored JSON."""
+    from src.communication.encoding import encode_json
+
+    outbox.pending("API", 10)
+    first_id = outbox.append({"timestamp": 1.0, "pm25": 1.0})
+    second_id = outbox.append({"timestamp": 2.0, "pm25": None})
+
+    ids, batch = outbox.pending_batch("API", 10)
+
+    assert ids == [first_id, second_id]
+    assert isinstance(batch, ReadingBatch)
+    assert batch.view("timestamp").tolist() == [1.0, 2.0]
+    with patch('src.communication.encoding.json.dumps') as mock_dumps:
+        assert json.loads(encode_json(batch)) == [{"timestamp": 1.0, "pm25": 1.0}, {"timestamp": 2.0, "pm25": None}]
+    mock_dumps.assert_not_called()
+
+
+@pytest.fixture
+def compressed_outbox(tmp_path):
+    """Fixture to provide an outbox that compresses its backlog in chunks of 3 readings."""
+    outbox = Outbox(path=str(tmp_path / "outbox.sqlite3"), max_readings=100, compress=True, compress_batch=3)
+    yield outbox
+    outbox.close()
+
+
+def test_backlog_is_compressed(compressed_outbox):
+    """Test that the oldest readings of a backlog move to a compressed chunk and are replayed in order."""
+    compressed_outbox.pending("API", 10)
+    compressed_outbox.pending("MQTT", 10)
+    for value in range(7):
+        sink = "API" if value == 4 else None
+        compressed_outbox.append({"timestamp": 1700000000.0 + value, "pm25": float(value)}, sink)
+
+    chunks = compressed_outbox._connection.execute("SELECT first_id, last_id, count FROM chunks").fetchall()
+    assert chunks == [(1, 3, 3)]
+    assert compressed_outbox.count() == 7
+    assert compressed_outbox.count("MQTT") == 6
+
+    rows = compressed_outbox.pending("API", 4)
+    assert [data["pm25"] for _id, data in rows] == [0.0, 1.0, 2.0, 3.0]
+    compressed_outbox.ack("API", rows[-1][0])
+    assert [data["pm25"] for _id, data in compressed_outbox.pending("API", 10)] == [4.0, 5.0, 6.0]
+
+    assert [data["pm25"] for _id, data in compressed_outbox.pending("MQTT", 10)] == [0.0, 1.0, 2.0, 3.0, 5.0, 6.0]
+
+
+def test_pending_batch_from_compressed_chunk(compressed_outbox):
+    """Test that readings of a compressed chunk and plain rows end up in one batch, oldest first."""
+    compressed_outbox.pending("API", 10)
+    for value in range(6):
+        compressed_outbox.append({"timestamp": 1700000000.0 + value, "pm25": float(value)})
+
+    ids, batch = compressed_outbox.pending_batch("API", 10)
+
+    assert ids == list(range(1, 7))
+    assert batch.view("pm25").tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_compressed_chunk_pruned_once_acknowledged(compressed_outbox):
+    """Test that a chunk is deleted once every sink acknowledged all of its readings."""
+    compressed_outbox.pending("API", 10)
+    for value in range(6):
+        compressed_outbox.append({"pm25": float(value)})
+
+    compressed_outbox.ack("API", 2)
+    compressed_outbox.append({"pm25": 6.0})
+    assert compressed_outbox._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 1
+
+    compressed_outbox.ack("API", 3)
+    compressed_outbox.append({"pm25": 7.0})
+    assert compressed_outbox._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 0
@@ -3,8 +3,10 @@ Tests for the SendDataPostgres class.
 """
 from unittest.mock import MagicMock, patch
 
+import psycopg2
 import pytest
-from src.communication.postgres import SendDataPostgres
+from psycopg2.extras import Json
+from src.communication.postgres import SendDataPostgres, _build_insert_query
 
 
 @pytest.fixture
@@ -23,34 +25,65 @@ def sample_data():
     }
 
 
-@patch('src.communication.postgres.psycopg2.connect')
+@pytest.fixture
+def reset_pool():
+    """Reset the connection pool after each test."""
+    from src.communication import postgres
+    postgres._postgres_pool = None
+    yield
+    postgres._postgres_pool = None
+
+
+@patch('src.communication.postgres.ThreadedConnectionPool')
 @patch('src.communication.postgres.POSTGRES_USER', 'test_user')
 @patch('src.communication.postgres.POSTGRES_PASSWORD', 'test_password')
 @patch('src.communication.postgres.POSTGRES_HOST', 'db.example.com')
 @patch('src.communication.postgres.POSTGRES_PORT', '5432')
 @patch('src.communication.postgres.POSTGRES_DBNAME', 'test_db')
-def test_get_connection(mock_connect):
+@patch('src.communication.postgres.POSTGRES_SSLMODE', 'require')
+@patch('src.communication.postgres.POSTGRES_CHANNELBINDING', 'require')
+@patch('src.communication.postgres.POSTGRES_POOL_MIN', 1)
+@patch('src.communication.postgres.POSTGRES_POOL_MAX', 2)
+def test_get_connection(mock_pool_class, reset_pool):
     """Test the _get_connection method."""
     # Configure the mock
     mock_connection = MagicMock()
-    mock_connect.return_value = mock_connection
-    
-    # Call the method
+    mock_pool_class.return_value.getconn.return_value = mock_connection
+
+    # Call the method twice
     connection = SendDataPostgres({})._get_connection()
-    
-    # Check that psycopg2.connect was called with the correct parameters
-    mock_connect.assert_called_once_with(
+    SendDataPostgres({})._get_connection()
+
+    # Check that the pool was created once with the correct parameters
+    mock_pool_class.assert_called_once_with(
+        1,
+        2,
         user='test_user',
         password='test_password',
         host='db.example.com',
         port='5432',
-        dbname='test_db'
+        dbname='test_db',
+        sslmode='require',
+        channel_binding='require',
     )
-    
+
     # Check that the connection was returned
     assert connection == mock_connection
 
 
+@patch('src.communication.postgres.POSTGRES_TABLE', 'weather_data')
+def test_insert_data_nested_as_json(sample_data):
+    """Test that nested per-sensor measurements are sent as JSON."""
+    sample_data["sensors"] = {"mast": {"temperature_celsius": 21.5}}
+    mock_cursor = MagicMock()
+
+    SendDataPostgres(sample_data)._insert_data(mock_cursor)
+
+    values = mock_cursor.execute.call_args[0][1]
+    assert isinstance(values[-1], Json)
+    assert values[-1].adapted == {"mast": {"temperature_celsius": 21.5}}
+
+
 @patch('src.communication.postgres.POSTGRES_TABLE', 'weather_data')
 def test_insert_data(sample_data):
     """Test the _insert_data method."""
@@ -79,12 +112,14 @@ def test_insert_data(sample_data):
         assert value in values
 
 
+@patch.object(SendDataPostgres, '_release_connection')
 @patch.object(SendDataPostgres, '_get_connection')
 @patch.object(SendDataPostgres, '_insert_data')
-def test_send_success(mock_insert_data, mock_get_connection, sample_data):
+def test_send_success(mock_insert_data, mock_get_connection, mock_release_connection, sample_data):
     """Test the send method with a successful connection."""
     # Configure the mocks
     mock_connection = MagicMock()
+    mock_connection.closed = 0
     mock_cursor = MagicMock()
     mock_connection.cursor.return_value = mock_cursor
     mock_get_connection.return_value = mock_connection
@@ -105,9 +140,68 @@ def test_send_success(mock_insert_data, mock_get_connection, sample_data):
     # Check that connection.commit was called
     mock_connection.commit.assert_called_once()
     
-    # Check that cursor.close and connection.close were called
+    # Check that the cursor was closed and the connection returned to the pool
     mock_cursor.close.assert_called_once()
-    mock_connection.close.assert_called_once()
+    mock_release_connection.assert_called_once_with(mock_connection, close=False)
+    mock_connection.close.assert_not_called()
+
+
+@patch.object(SendDataPostgres, '_release_connection')
+@patch.object(SendDataPostgres, '_get_connection')
+@patch('builtins.print')
+def test_send_broken_connection(mock_print, mock_get_connection, mock_release_connection, sample_data):
+    """Test that a connection that lost the server is dropped from the pool."""
+    mock_connection = MagicMock()
+    mock_connection.closed = 0
+    mock_connection.cursor.return_value.execute.side_effect = psycopg2.OperationalError("server closed")
+    mock_get_connection.return_value = mock_connection
+
+    with pytest.raises(psycopg2.OperationalError):
+        SendDataPostgres(sample_data).send()
+
+    mock_connection.commit.assert_not_called()
+    mock_release_connection.assert_called_once_with(mock_connection, close=True)
+
+
+@patch('src.communication.postgres.POSTGRES_TABLE', 'weather_data')
+@patch('src.communication.postgres.execute_values')
+@patch.object(SendDataPostgres, '_release_connection')
+@patch.object(SendDataPostgres, '_get_connection')
+def test_send_batch(mock_get_connection, mock_release_connection, mock_execute_values, sample_data):
+    """Test that a batch is written with one multi-row insert per column set in one transaction."""
+    mock_connection = MagicMock()
+    mock_connection.closed = 0
+    mock_get_connection.return_value = mock_connection
+    other = {"timestamp": 1234567900.0, "pm25": 11.0}
+
+    SendDataPostgres.send_batch([sample_data, sample_data, other])
+
+    assert mock_execute_values.call_count == 2
+    cursor, query, rows = mock_execute_values.call_args_list[0].args
+    assert query == f"INSERT INTO weather_data ({', '.join(sample_data)}) VALUES %s"
+    assert rows == [list(sample_data.values())] * 2
+    cursor, query, rows = mock_execute_values.call_args_list[1].args
+    assert query == "INSERT INTO weather_data (timestamp, pm25) VALUES %s"
+    assert rows == [[1234567900.0, 11.0]]
+    mock_connection.commit.assert_called_once()
+
+
+def test_build_insert_query_cached():
+    """Test that statements are built and validated once per column set."""
+    _build_insert_query.cache_clear()
+
+    single, batch = _build_insert_query("weather_data", ("pm25", "pm10"))
+    _build_insert_query("weather_data", ("pm25", "pm10"))
+
+    assert single == "INSERT INTO weather_data (pm25, pm10) VALUES (%s, %s)"
+    assert batch == "INSERT INTO weather_data (pm25, pm10) VALUES %s"
+    assert _build_insert_query.cache_info().hits == 1
+
+
+def test_build_insert_query_invalid_column():
+    """Test that invalid column names are rejected."""
+    with pytest.raises(ValueError):
+        _build_insert_query("weather_data", ("pm25; DROP TABLE weather_data",))
 
 
 @patch.object(SendDataPostgres, '_get_connection')
@@ -125,4 +219,27 @@ def test_send_exception(mock_print, mock_get_connection, sample_data):
     mock_get_connection.assert_called_once()
     
     # Check that the error was printed
-    mock_print.assert_called_once_with("Failed to send data to PostgreSQL: Test error")
\ No newline at end of file
+    mock_print.assert_called_once_with("Failed to send data to PostgreSQL: Test error")
+
+@patch('src.communication.postgres.POSTGRES_TABLE', 'weather_data')
+@patch('src.communication.postgres.execute_values')
+@patch.object(SendDataPostgres, '_release_connection')
+@patch.object(SendDataPostgres, '_get_connection')
+def test_send_batch_rollups(mock_get_connection, mock_release_connection, mock_execute_values, sample_data):
+    """Test that rollup records are inserted into the table of their resolution."""
+    mock_connection = MagicMock()
+    mock_connection.closed = 0
+    mock_get_connection.return_value = mock_connection
+    rollup = {"timestamp": 1234567800.0, "rollup": "1h", "count": 60, "pm25_mean": 10.5}
+
+    SendDataPostgres.send_batch([sample_data, rollup])
+
+    _cursor, query, rows = mock_execute_values.call_args_list[1].args
+    assert query == "INSERT INTO weather_data_1h (timestamp, count, pm25_mean) VALUES %s"
+    assert rows == [[1234567800.0, 60, 10.5]]
+
+
+def test_insert_data_invalid_rollup():
+    """Test that a rollup name that is not a valid table suffix is rejected."""
+    with pytest.raises(ValueError):
+        SendDataPostgres({"rollup": "1h; DROP TABLE weather", "count": 1})._insert_data(MagicMock())
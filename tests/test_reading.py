@@ -0,0 +1,121 @@
+import sys
+
+import numpy as np
+import pytest
+from src.reading import DICT_ORDER, Reading, ReadingBatch
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture providing a reading dictionary as built by get_weather."""
+    return {
+        "timestamp": 1700000000.0,
+        "sensor_air_quality": "SDS011",
+        "pm25": 10.5,
+        "pm10": 20.3,
+        "sensor_temp_hum": "BME280",
+        "temperature_farenheit": 77.0,
+        "temperature_celsius": 25.0,
+        "humidity": 60.0,
+        "pressure": 1013.25,
+    }
+
+
+def test_reading_round_trip(sample_data):
+    """Test that a reading converts back to the same dictionary, in the same key order."""
+    reading = Reading.from_dict(sample_data)
+
+    assert reading.to_dict() == sample_data
+    assert list(reading.to_dict()) == list(DICT_ORDER)
+
+
+def test_reading_uses_slots(sample_data):
+    """Test that readings have no per-instance dictionary."""
+    reading = Reading.from_dict(sample_data)
+
+    assert not hasattr(reading, "__dict__")
+    assert sys.getsizeof(reading) < sys.getsizeof(sample_data)
+
+
+def test_reading_unset_and_none_fields():
+    """Test that unset fields are left out and None fields are kept."""
+    reading = Reading(timestamp=1.0)
+    reading.update({"sensor_air_quality": "SDS011", "pm25": None})
+
+    assert reading.to_dict() == {"timestamp": 1.0, "sensor_air_quality": "SDS011", "pm25": None}
+    assert reading.get("pm10", "missing") == "missing"
+
+
+def test_reading_extra_fields(sample_data):
+    """Test that keys outside the schema are kept."""
+    sample_data["sample_count"] = 900
+    reading = Reading.from_dict(sample_data)
+
+    assert reading.get("sample_count") == 900
+    assert reading.to_dict() == sample_data
+
+
+def test_batch_round_trip(sample_data):
+    """Test that a batch returns the readings it was built from, with None, missing and extra keys."""
+    readings = [
+        sample_data,
+        {"timestamp": 1700000060.0, "pm25": None, "sensor_air_quality": "SDS011"},
+        {**sample_data, "sample_count": 900, "sensors": {"outdoor": {"humidity": 40.0}}},
+    ]
+    batch = ReadingBatch(readings)
+
+    assert len(batch) == 3
+    assert batch.to_dicts() == readings
+    assert list(batch) == readings
+    assert batch[-1] == readings[2]
+    assert batch[1:].to_dicts() == readings[1:]
+
+
+def test_batch_columns(sample_data):
+    """Test that numeric fields are stored as float columns and other values are kept as they are."""
+    batch = ReadingBatch([Reading.from_dict(sample_data), {"timestamp": 1700000060, "pm25": "high"}])
+
+    assert batch.columns["pm25"].typecode == "d"
+    assert batch.view("timestamp").tolist() == [1700000000.0, 1700000060.0]
+    assert np.isnan(batch.columns["pm25"][1])
+    assert batch[1] == {"timestamp": 1700000060.0, "pm25": "high"}
+
+
+def test_batch_view_is_zero_copy(sample_data):
+    """Test that a view shares the memory of its column, also through NumPy."""
+    batch = ReadingBatch([sample_data, sample_data])
+    view = batch.view("pm25")
+    values = np.frombuffer(view, dtype=np.float64)
+
+    batch.columns["pm25"][1] = 12.5
+    assert view[1] == 12.5
+    assert values[1] == 12.5
+    values[0] = 11.0
+    assert batch[0]["pm25"] == 11.0
+
+
+def test_batch_cannot_grow_while_viewed(sample_data):
+    """Test that an append fails while a view is alive and leaves every column the same length."""
+    batch = ReadingBatch([sample_data])
+    view = batch.view("humidity")
+
+    with pytest.raises(BufferError):
+        batch.append(sample_data)
+    assert len(batch) == 1
+    assert {len(column) for column in batch.columns.values()} == {1}
+
+    view.release()
+    batch.append(sample_data)
+    assert len(batch) == 2
+
+
+def test_batch_drop_oldest(sample_data):
+    """Test that the oldest readings are dropped without invalidating a view of the old columns."""
+    batch = ReadingBatch({**sample_data, "timestamp": float(second)} for second in range(4))
+    view = batch.view("timestamp")
+
+    batch.drop_oldest(3)
+
+    assert batch.view("timestamp").tolist() == [3.0]
+    assert batch.to_dicts() == [{**sample_data, "timestamp": 3.0}]
+    assert view.tolist() == [0.0, 1.0, 2.0, 3.0]
@@ -0,0 +1,118 @@
+"""
+Tests for the sensor registry.
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.sensors.registry import (
+    SensorConfig,
+    close_sensors,
+    create_configured_sensors,
+    create_sensor,
+    load_sensor_configs,
+)
+from src.sensors.watchdog import SensorWatchdog
+
+
+@patch('src.settings.SDS011_ENABLE', False)
+@patch('src.sensors.registry.timed_import')
+def test_create_sensor_disabled(mock_timed_import):
+    """Test that a disabled sensor is not imported."""
+    assert create_sensor("SDS011") is None
+    mock_timed_import.assert_not_called()
+
+
+@patch('src.settings.SENSOR_WATCHDOG_ENABLE', False)
+@patch('src.settings.BME280_ENABLE', True)
+@patch('src.sensors.registry.timed_import')
+def test_create_sensor_enabled(mock_timed_import):
+    """Test that an enabled sensor is imported and created."""
+    module = MagicMock()
+    mock_timed_import.return_value = module
+
+    sensor = create_sensor("BME280")
+
+    mock_timed_import.assert_called_once_with("src.sensors.bme280sensor")
+    assert sensor == module.BME280Sensor.return_value
+
+
+@patch('src.settings.SENSOR_WATCHDOG_ENABLE', True)
+@patch('src.settings.BME280_ENABLE', True)
+@patch('src.settings.BME280_READ_TIMEOUT', 2)
+@patch('src.sensors.registry.timed_import')
+def test_create_sensor_with_watchdog(mock_timed_import):
+    """Test that an enabled sensor is wrapped in a watchdog with its read timeout."""
+    module = MagicMock()
+    mock_timed_import.return_value = module
+
+    sensor = create_sensor("BME280")
+
+    assert isinstance(sensor, SensorWatchdog)
+    assert sensor.sensor == module.BME280Sensor.return_value
+    assert sensor.timeout == 2
+    sensor.close()
+
+
+@patch('src.settings.SDS011_ENABLE', True)
+@patch('src.sensors.registry.timed_import')
+def test_create_sensor_failure(mock_timed_import):
+    """Test that a sensor that fails to initialize is skipped."""
+    mock_timed_import.return_value.SDS011Sensor.side_effect = Exception("No such device")
+
+    assert create_sensor("SDS011") is None
+
+
+def test_close_sensors():
+    """Test that sensors with a close method are closed and failures do not stop the others."""
+    failing = MagicMock()
+    failing.close.side_effect = Exception("Port error")
+    streaming = MagicMock()
+
+    close_sensors(None, failing, streaming)
+
+    failing.close.assert_called_once()
+    streaming.close.assert_called_once()
+
+
+def test_load_sensor_configs():
+    """Test that sensor instances are parsed with the bus derived from their options."""
+    configs = load_sensor_configs(
+        '[{"name": "outdoor", "type": "BME280", "address": "0x76"},'
+        ' {"name": "mast", "type": "bme280", "address": "0x77", "mux_address": "0x70", "mux_channel": 3},'
+        ' {"name": "pm_north", "type": "SDS011", "port": "/dev/ttyUSB1"},'
+        ' {"name": "shelter", "type": "DHT22", "pin": "D17"}]'
+    )
+
+    assert configs == [
+        SensorConfig("outdoor", "BME280", "i2c", {"address": "0x76"}),
+        SensorConfig("mast", "BME280", "i2c", {"address": "0x77", "mux_address": "0x70", "mux_channel": 3}),
+        SensorConfig("pm_north", "SDS011", "/dev/ttyUSB1", {"port": "/dev/ttyUSB1"}),
+        SensorConfig("shelter", "DHT22", "gpio:D17", {"pin": "D17"}),
+    ]
+
+
+@pytest.mark.parametrize("spec", [
+    '[{"name": "a", "type": "XYZ"}]',
+    '[{"name": "a", "type": "BME280"}, {"name": "a", "type": "DHT22"}]',
+])
+def test_load_sensor_configs_invalid(spec):
+    """Test that unknown types and duplicate names are rejected."""
+    with pytest.raises(ValueError):
+        load_sensor_configs(spec)
+
+
+@patch('src.settings.SENSOR_WATCHDOG_ENABLE', False)
+@patch('src.settings.BME280_READ_TIMEOUT', 2)
+@patch('src.sensors.registry.timed_import')
+def test_create_configured_sensors(mock_timed_import):
+    """Test that every instance is created with its options and failing ones are skipped."""
+    module = mock_timed_import.return_value
+    module.BME280Sensor.side_effect = [MagicMock(), Exception("No device at 0x77")]
+
+    sensors = create_configured_sensors([
+        SensorConfig("outdoor", "BME280", "i2c", {"address": "0x76"}),
+        SensorConfig("mast", "BME280", "i2c", {"address": "0x77"}),
+    ])
+
+    assert [(sensor.name, sensor.bus, sensor.timeout) for sensor in sensors] == [("outdoor", "i2c", 2)]
+    module.BME280Sensor.assert_any_call(address="0x76")
@@ -0,0 +1,163 @@
+"""
+Tests for the incremental rollup engine.
+"""
+import math
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.rollup import RollupEngine, add_to_rollups, parse_resolutions
+
+# 2023-11-14 22:00:00 UTC
+HOUR_START = 1699999200.0
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture to provide a sample reading."""
+    return {
+        "timestamp": HOUR_START,
+        "sensor_air_quality": "sds011",
+        "pm25": 10.5,
+        "pm10": 25.0,
+        "sensor_temp_hum": "bme280",
+        "temperature_farenheit": 77.0,
+        "temperature_celsius": 25.0,
+        "humidity": 50.0,
+        "pressure": 1013.25,
+    }
+
+
+@pytest.fixture
+def engine():
+    """Fixture to provide an engine with the default resolutions."""
+    return RollupEngine(parse_resolutions("1m,1h,1d"))
+
+
+def test_parse_resolutions():
+    """Test that resolutions are parsed into bucket sizes in seconds."""
+    assert parse_resolutions("1m, 1h,1d,") == [("1m", 60), ("1h", 3600), ("1d", 86400)]
+    assert parse_resolutions("30s,15m") == [("30s", 30), ("15m", 900)]
+
+
+@pytest.mark.parametrize("spec", ["1w", "0m", "m", "1.5h", "1h;DROP"])
+def test_parse_resolutions_invalid(spec):
+    """Test that anything but a number and a unit is rejected."""
+    with pytest.raises(ValueError):
+        parse_resolutions(spec)
+
+
+def test_bucket_statistics(engine, sample_data):
+    """Test min, max, mean, count and last of a finished minute, missing and NaN values left out."""
+    for second, temperature in enumerate((20.0, 22.0, None, float("nan"), 21.0)):
+        assert engine.add({**sample_data, "timestamp": HOUR_START + second, "temperature_celsius": temperature}) == []
+
+    finished = engine.add({**sample_data, "timestamp": HOUR_START + 60})
+
+    assert len(finished) == 1
+    record = finished[0]
+    assert record["timestamp"] == HOUR_START
+    assert record["rollup"] == "1m"
+    assert record["count"] == 5
+    assert record["sensor_temp_hum"] == "bme280"
+    assert record["temperature_celsius_min"] == 20.0
+    assert record["temperature_celsius_max"] == 22.0
+    assert record["temperature_celsius_mean"] == 21.0
+    assert record["temperature_celsius_count"] == 3
+    assert record["temperature_celsius_last"] == 21.0
+    assert record["pressure_count"] == 5
+    assert not any(isinstance(value, float) and math.isnan(value) for value in record.values())
+
+
+def test_buckets_finish_per_resolution(engine, sample_data):
+    """Test that a reading in a new hour finishes the open minute and hour, finest first."""
+    engine.add(sample_data)
+    engine.add({**sample_data, "timestamp": HOUR_START + 30, "pm25": 12.5})
+
+    finished = engine.add({**sample_data, "timestamp": HOUR_START + 3600})
+
+    assert [record["rollup"] for record in finished] == ["1m", "1h"]
+    assert [record["timestamp"] for record in finished] == [HOUR_START, HOUR_START]
+    assert finished[1]["pm25_mean"] == 11.5
+    finished = engine.add({**sample_data, "timestamp": HOUR_START + 7200})
+    assert [record["rollup"] for record in finished] == ["1m", "1h", "1d"]
+
+
+def test_late_readings_skipped(engine, sample_data):
+    """Test that a reading older than the open bucket is counted and left out."""
+    engine.add({**sample_data, "timestamp": HOUR_START + 120})
+    assert engine.add(sample_data) == []
+
+    # Late for the minute, but still in the open hour and day
+    assert engine.late == 1
+    hour = next(record for record in engine.pending() if record["rollup"] == "1h")
+    assert hour["count"] == 2
+
+
+def test_pending(engine, sample_data):
+    """Test that the open buckets can be read without finishing them."""
+    assert engine.pending() == []
+    engine.add(sample_data)
+
+    assert [record["rollup"] for record in engine.pending()] == ["1m", "1h", "1d"]
+    assert engine.pending()[2]["timestamp"] == 1699920000.0
+
+
+def test_reading_without_timestamp(engine, sample_data):
+    """Test that readings without a timestamp are ignored."""
+    assert engine.add({**sample_data, "timestamp": None}) == []
+    assert engine.pending() == []
+
+
+def test_rebuild_after_restart(engine, sample_data):
+    """Test that the replayed readings fill the open buckets without finishing any bucket again."""
+    store = MagicMock()
+    store.query.return_value = [
+        {**sample_data, "timestamp": HOUR_START - 3600, "pm25": 2.0},
+        {**sample_data, "timestamp": HOUR_START + 10, "pm25": 4.0},
+        {**sample_data, "timestamp": HOUR_START + 20, "pm25": 6.0},
+    ]
+
+    assert engine.rebuild(store, HOUR_START + 30) == 3
+
+    # From the start of the previous day
+    store.query.assert_called_once_with(1699920000.0 - 86400, HOUR_START + 30)
+    finished = engine.add({**sample_data, "timestamp": HOUR_START + 3600})
+    assert [record["rollup"] for record in finished] == ["1m", "1h"]
+    assert finished[1]["pm25_mean"] == 5.0
+    assert finished[1]["count"] == 2
+    day = next(record for record in engine.pending() if record["rollup"] == "1d")
+    assert day["count"] == 4
+
+
+@patch('src.rollup.TSDB_ENABLE', True)
+@patch('src.rollup.ROLLUP_ENABLE', True)
+@patch('src.rollup.get_tsdb')
+def test_add_to_rollups_rebuilds_from_tsdb(mock_get_tsdb, sample_data):
+    """Test that the shared engine is rebuilt from the readings stored before the first one it gets."""
+    mock_get_tsdb.return_value.query.return_value = [{**sample_data, "timestamp": HOUR_START - 60}]
+
+    with patch('src.rollup._rollup_engine_instance', None):
+        finished = add_to_rollups(sample_data)
+
+    assert mock_get_tsdb.return_value.query.call_args.args[1] == HOUR_START
+    # The minute and hour that were open before the restart
+    assert [record["rollup"] for record in finished] == ["1m", "1h"]
+    assert finished[0]["timestamp"] == HOUR_START - 60
+
+
+@patch('src.rollup.ROLLUP_ENABLE', True)
+@patch('src.rollup.get_rollup_engine')
+def test_add_to_rollups_errors_are_logged(mock_get_engine, sample_data):
+    """Test that a failing engine never breaks the main loop."""
+    mock_get_engine.return_value.add.side_effect = TypeError("unsupported operand")
+
+    assert add_to_rollups(sample_data) == []
+
+
+@patch('src.rollup.ROLLUP_ENABLE', False)
+@patch('src.rollup.get_rollup_engine')
+def test_add_to_rollups_disabled(mock_get_engine, sample_data):
+    """Test that nothing is rolled up when rollups are disabled."""
+    assert add_to_rollups(sample_data) == []
+
+    mock_get_engine.assert_not_called()
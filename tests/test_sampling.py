@@ -0,0 +1,145 @@
+"""
+Tests for the SamplingEngine class.
+"""
+import math
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from src.sampling import SamplingEngine
+from src.sensors.watchdog import SensorWatchdog
+
+
+def make_sensor(values):
+    """Create a mock sensor returning the given (temperature, humidity, pressure) samples in order."""
+    sensor = MagicMock()
+    sensor.get_measurement.side_effect = [
+        {
+            "sensor_temp_hum": "bme280",
+            "temperature_celsius": temperature,
+            "humidity": humidity,
+            "pressure": pressure,
+        }
+        for temperature, humidity, pressure in values
+    ]
+    return sensor
+
+
+def test_get_measurement_aggregates_window():
+    """Test that the window is reduced to mean, min, max, stddev and count."""
+    sensor = make_sensor([(20.0, 40.0, 1010.0), (22.0, 50.0, 1000.0), (24.0, 60.0, 1012.0)])
+    engine = SamplingEngine(sensor, window_size=10)
+    for _ in range(3):
+        engine.sample_once()
+
+    result = engine.get_measurement()
+
+    assert result["sensor_temp_hum"] == "bme280"
+    assert result["sample_count"] == 3
+    assert result["temperature_celsius"] == pytest.approx(22.0)
+    assert result["temperature_celsius_min"] == 20.0
+    assert result["temperature_celsius_max"] == 24.0
+    assert result["temperature_celsius_stddev"] == pytest.approx(math.sqrt(8 / 3))
+    assert result["temperature_farenheit"] == pytest.approx(71.6)
+    assert result["humidity"] == pytest.approx(50.0)
+    # The short pressure dip is kept in the aggregated record
+    assert result["pressure_min"] == 1000.0
+
+
+def test_get_measurement_resets_window():
+    """Test that every report only covers the samples collected since the previous one."""
+    sensor = make_sensor([(20.0, 40.0, 1010.0), (30.0, 40.0, 1010.0)])
+    engine = SamplingEngine(sensor, window_size=10)
+    engine.sample_once()
+    engine.get_measurement()
+    engine.sample_once()
+
+    result = engine.get_measurement()
+
+    assert result["sample_count"] == 1
+    assert result["temperature_celsius"] == 30.0
+
+
+def test_get_measurement_without_samples():
+    """Test that an empty window raises an error."""
+    engine = SamplingEngine(MagicMock(), window_size=10)
+
+    with pytest.raises(RuntimeError):
+        engine.get_measurement()
+
+
+def test_ring_buffer_keeps_latest_samples():
+    """Test that the buffer has a fixed size and overwrites the oldest samples."""
+    sensor = make_sensor([(float(value), 50.0, 1000.0) for value in range(5)])
+    engine = SamplingEngine(sensor, window_size=3)
+    for _ in range(5):
+        engine.sample_once()
+
+    result = engine.get_measurement()
+
+    assert result["sample_count"] == 3
+    assert result["temperature_celsius_min"] == 2.0
+    assert result["temperature_celsius_max"] == 4.0
+
+
+def test_missing_values_are_ignored():
+    """Test that missing values do not count in the statistics of their field."""
+    sensor = make_sensor([(20.0, None, 1000.0), (22.0, None, 1000.0)])
+    engine = SamplingEngine(sensor, window_size=10)
+    engine.sample_once()
+    engine.sample_once()
+
+    result = engine.get_measurement()
+
+    assert result["temperature_celsius"] == pytest.approx(21.0)
+    assert result["humidity"] is None
+    assert "humidity_min" not in result
+
+
+def test_sample_once_sensor_error():
+    """Test that a failed sensor read is skipped."""
+    sensor = MagicMock()
+    sensor.get_measurement.side_effect = Exception("Test error")
+    engine = SamplingEngine(sensor, window_size=10)
+
+    engine.sample_once()
+
+    with pytest.raises(RuntimeError):
+        engine.get_measurement()
+
+
+def test_sample_once_skips_degraded_sensor(caplog):
+    """Test that a sensor marked degraded by the watchdog is not read and does not log an error every sample."""
+    sensor = make_sensor([(20.0, 40.0, 1010.0)])
+    watchdog = SensorWatchdog("BME280", lambda: sensor, timeout=1)
+    engine = SamplingEngine(watchdog, window_size=10)
+    watchdog.degraded = True
+
+    try:
+        engine.sample_once()
+        watchdog.degraded = False
+        engine.sample_once()
+    finally:
+        watchdog.close()
+
+    assert "Error sampling sensor" not in caplog.text
+    assert engine.get_measurement()["sample_count"] == 1
+
+
+def test_background_sampling():
+    """Test that the engine polls the sensor at the configured rate."""
+    sensor = MagicMock()
+    sensor.get_measurement.return_value = {"temperature_celsius": 20.0, "humidity": 50.0, "pressure": 1000.0}
+    engine = SamplingEngine(sensor, rate_hz=100, window_size=1000)
+
+    engine.start()
+    time.sleep(0.2)
+    engine.stop()
+
+    assert 5 <= sensor.get_measurement.call_count <= 30
+
+
+def test_unknown_field_rejected():
+    """Test that only numeric fields of the reading schema can be sampled."""
+    with pytest.raises(ValueError):
+        SamplingEngine(MagicMock(), fields=("temperature_celsius", "wind_speed"))
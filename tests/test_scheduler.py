@@ -0,0 +1,188 @@
+import pytest
+from src.scheduler import MultiRateScheduler, Scheduler
+
+
+class FakeClock:
+    """Monotonic and wall clock that only move when told to."""
+
+    def __init__(self, wall_offset):
+        self.now = 100.0
+        self.wall_offset = wall_offset
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now + self.wall_offset
+
+
+def make_scheduler(clock, interval=900, **kwargs):
+    scheduler = Scheduler(interval, clock=clock.monotonic, wall_clock=clock.time, **kwargs)
+
+    def wait(delay):
+        clock.now += delay
+        return False
+
+    scheduler._wait = wait
+    return scheduler
+
+
+@pytest.fixture
+def clock():
+    """Fixture providing a fake clock at 10:05:00 wall time."""
+    return FakeClock(wall_offset=36300 - 100.0)
+
+
+def test_ticks_align_to_wall_clock(clock):
+    """Test that ticks after the first one fall on wall clock boundaries."""
+    scheduler = make_scheduler(clock)
+    wall_times = []
+
+    scheduler.run(lambda: wall_times.append(clock.time()), max_ticks=3)
+
+    assert wall_times == [36300, 36900, 37800]
+
+
+def test_task_duration_does_not_drift(clock):
+    """Test that the time spent in the task does not add to the period."""
+    scheduler = make_scheduler(clock, align=False)
+    starts = []
+
+    def task():
+        starts.append(clock.monotonic())
+        clock.now += 42
+
+    scheduler.run(task, max_ticks=4)
+
+    assert starts == [100, 1000, 1900, 2800]
+    assert scheduler.last_tick.duration == 42
+    assert scheduler.last_tick.lateness == 0
+
+
+def test_overrun_skips_missed_ticks(clock):
+    """Test that the skip policy drops the ticks missed during an overrun."""
+    scheduler = make_scheduler(clock, align=False)
+    starts = []
+
+    def task():
+        starts.append(clock.monotonic())
+        if len(starts) == 1:
+            clock.now += 2000
+
+    scheduler.run(task, max_ticks=2)
+
+    assert starts == [100, 2800]
+    assert scheduler.overruns == 1
+    assert scheduler.skipped_ticks == 2
+
+
+def test_overrun_compresses_missed_ticks(clock):
+    """Test that the compress policy runs one tick immediately after an overrun."""
+    scheduler = make_scheduler(clock, align=False, overrun_policy="compress")
+    starts = []
+
+    def task():
+        starts.append(clock.monotonic())
+        if len(starts) == 1:
+            clock.now += 2000
+
+    scheduler.run(task, max_ticks=3)
+
+    assert starts == [100, 2100, 2800]
+    assert scheduler.skipped_ticks == 1
+
+
+def test_clock_jump_realigns(clock):
+    """Test that a wall clock jump realigns the schedule to the new wall clock."""
+    scheduler = make_scheduler(clock)
+    wall_times = []
+
+    def task():
+        wall_times.append(clock.time())
+        if len(wall_times) == 2:
+            # NTP sync moves the wall clock 100 seconds forward
+            clock.wall_offset += 100
+
+    scheduler.run(task, max_ticks=4)
+
+    assert wall_times == [36300, 36900, 37800, 38700]
+    assert scheduler.last_tick.scheduled == 38700
+
+
+def test_stop():
+    """Test that stop() ends the loop."""
+    scheduler = Scheduler(60)
+    calls = []
+
+    def task():
+        calls.append(1)
+        scheduler.stop()
+
+    scheduler.run(task)
+
+    assert calls == [1]
+
+
+def test_invalid_policy():
+    """Test that an unknown overrun policy is rejected."""
+    with pytest.raises(ValueError):
+        Scheduler(60, overrun_policy="burst")
+
+
+def make_multirate_scheduler(clock):
+    scheduler = MultiRateScheduler(clock=clock.monotonic, wall_clock=clock.time)
+
+    def wait(delay):
+        clock.now += delay
+        return False
+
+    scheduler._wait = wait
+    return scheduler
+
+
+def test_multirate_runs_each_task_on_its_interval(clock):
+    """Test that tasks with different intervals run from one loop, earliest first."""
+    scheduler = make_multirate_scheduler(clock)
+    runs = []
+    scheduler.add("BME280", 10, lambda: runs.append(("BME280", clock.monotonic() - 100)))
+    scheduler.add("Sensor Community", 145, lambda: runs.append(("Sensor Community", clock.monotonic() - 100)))
+
+    scheduler.run(max_runs=18)
+
+    assert runs[:2] == [("BME280", 0), ("Sensor Community", 0)]
+    assert [t for name, t in runs if name == "Sensor Community"] == [0, 145]
+    assert [t for name, t in runs if name == "BME280"] == list(range(0, 160, 10))
+
+
+def test_multirate_overrun_skips_missed_runs(clock):
+    """Test that a slow task skips the runs it missed without affecting the others."""
+    scheduler = make_multirate_scheduler(clock)
+    runs = []
+
+    def slow():
+        runs.append(("slow", clock.monotonic() - 100))
+        clock.now += 25
+
+    scheduler.add("slow", 10, slow)
+    scheduler.add("fast", 10, lambda: runs.append(("fast", clock.monotonic() - 100)))
+
+    scheduler.run(max_runs=4)
+
+    assert runs == [("slow", 0), ("fast", 25), ("slow", 30), ("fast", 55)]
+    assert scheduler.stats["slow"].skipped == 2
+    assert scheduler.stats["fast"].lateness == 25
+
+
+def test_multirate_task_error_does_not_stop_loop(clock):
+    """Test that a failing task is logged and rescheduled."""
+    scheduler = make_multirate_scheduler(clock)
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("Sensor error")
+
+    scheduler.add("failing", 10, failing)
+    scheduler.run(max_runs=2)
+
+    assert len(calls) == 2
@@ -0,0 +1,142 @@
+"""
+Tests for the streaming SDS011 reader, using a pseudo-terminal as the serial device.
+"""
+import os
+import time
+
+import pytest
+from src.sensors.sds011stream import (
+    CMD_SLEEP,
+    MODE_SLEEP,
+    MODE_WORK,
+    SET,
+    SDS011FrameParser,
+    SDS011StreamSensor,
+    encode_command,
+)
+
+
+def make_frame(pm25, pm10):
+    data = int(pm25 * 10).to_bytes(2, "little") + int(pm10 * 10).to_bytes(2, "little") + b"\x12\x34"
+    return b"\xaa\xc0" + data + bytes([sum(data) & 0xFF, 0xAB])
+
+
+class FakeClock:
+    """Monotonic and wall clock that only move when told to."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        # 10:05:00 wall time
+        return self.now + 36200.0
+
+
+@pytest.fixture
+def fake_serial():
+    """Fixture providing a pseudo-terminal: the device path and the file descriptor of the sensor side."""
+    device, port = os.openpty()
+    yield device, os.ttyname(port)
+    os.close(device)
+    os.close(port)
+
+
+def read_commands(device, count):
+    data = b""
+    while len(data) < count * 19:
+        data += os.read(device, 19 * count - len(data))
+    return [data[i:i + 19] for i in range(0, len(data), 19)]
+
+
+def test_parser_handles_split_and_corrupt_frames():
+    """Test that frames split across reads, command replies and corrupt frames are handled."""
+    parser = SDS011FrameParser()
+    corrupt = bytearray(make_frame(1.0, 2.0))
+    corrupt[8] ^= 0xFF
+    reply = b"\xaa\xc5\x06\x01\x00\x00\x12\x34\x4d\xab"
+    stream = b"\x00\x01" + bytes(corrupt) + reply + make_frame(12.3, 45.6) + make_frame(7.0, 8.0)
+
+    values = []
+    for i in range(0, len(stream), 3):
+        values += parser.feed(stream[i:i + 3])
+
+    assert values == [(12.3, 45.6), (7.0, 8.0)]
+    assert parser.errors == 1
+
+
+def test_encode_command():
+    """Test the checksum and layout of a command frame."""
+    command = encode_command(CMD_SLEEP, SET, MODE_SLEEP)
+
+    assert len(command) == 19
+    assert command[:5] == b"\xaa\xb4\x06\x01\x00"
+    assert command[-1] == 0xAB
+    assert command[-2] == sum(command[2:17]) & 0xFF
+
+
+def test_streams_frames_into_ring_buffer(fake_serial):
+    """Test that the background reader averages the frames written by the device."""
+    device, port = fake_serial
+    # The warm-up covers the whole interval, so the sensor never sleeps
+    sensor = SDS011StreamSensor(port=port, interval=60, warmup=60, settle=0, window_size=2)
+    try:
+        with pytest.raises(RuntimeError):
+            sensor.get_measurement()
+
+        os.write(device, make_frame(10.0, 20.0) + make_frame(20.0, 40.0)[:4])
+        os.write(device, make_frame(20.0, 40.0)[4:] + make_frame(30.0, 60.0))
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                if sensor.get_measurement()["pm25"] == 25.0:
+                    break
+            except RuntimeError:
+                pass
+            time.sleep(0.01)
+
+        measurement = sensor.get_measurement()
+        assert measurement == {"sensor_air_quality": "sds011", "pm25": 25.0, "pm10": 50.0}
+    finally:
+        sensor.close()
+
+
+def test_duty_cycle(fake_serial):
+    """Test that the sensor sleeps after a report and wakes up with the warm-up lead."""
+    device, port = fake_serial
+    clock = FakeClock()
+    sensor = SDS011StreamSensor(
+        port=port, interval=900, warmup=45, settle=30, clock=clock.monotonic, wall_clock=clock.time, start=False
+    )
+    wake = encode_command(CMD_SLEEP, SET, MODE_WORK)
+    sleep = encode_command(CMD_SLEEP, SET, MODE_SLEEP)
+
+    # Report mode, work period, then sleep until 10:14:15
+    assert read_commands(device, 3)[2] == sleep
+    assert not sensor.awake
+
+    clock.now += 554
+    sensor._update_duty_cycle(clock.now)
+    assert not sensor.awake
+
+    clock.now += 1
+    sensor._update_duty_cycle(clock.now)
+    assert sensor.awake
+    assert read_commands(device, 1) == [wake]
+
+    # Frames before the sensor settled are dropped
+    sensor._store([(99.0, 99.0)], clock.now + 10)
+    sensor._store([(10.0, 20.0)], clock.now + 31)
+    assert sensor.get_measurement()["pm25"] == 10.0
+
+    # Report at 10:15:00, then sleep until the next warm-up
+    clock.now += 45
+    sensor._update_duty_cycle(clock.now)
+    assert not sensor.awake
+    assert read_commands(device, 1) == [sleep]
+    # The last report stays available while the sensor sleeps
+    assert sensor.get_measurement()["pm10"] == 20.0
+    sensor.close()
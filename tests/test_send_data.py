@@ -1,10 +1,14 @@
 """
 Tests for the send_data module.
 """
+import logging
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
-from src.communication.send_data import send_data
+from src.communication.send_data import send_data, send_data_nowait, sink_intervals
+from src.reading import Reading, ReadingBatch
 
 
 @pytest.fixture
@@ -23,10 +27,10 @@ def sample_data():
     }
 
 
-@patch('src.communication.send_data.API_ENABLE', True)
-@patch('src.communication.send_data.MQTT_ENABLE', False)
-@patch('src.communication.send_data.SQS_ENABLE', False)
-@patch('src.communication.send_data.POSTGRES_ENABLE', False)
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
 @patch('src.communication.send_data.SendDataAPI')
 def test_send_data_api(mock_api, sample_data):
     """Test send_data function with API_ENABLE=True."""
@@ -43,10 +47,38 @@ def test_send_data_api(mock_api, sample_data):
     mock_api_instance.send.assert_called_once()
 
 
-@patch('src.communication.send_data.API_ENABLE', False)
-@patch('src.communication.send_data.MQTT_ENABLE', True)
-@patch('src.communication.send_data.SQS_ENABLE', False)
-@patch('src.communication.send_data.POSTGRES_ENABLE', False)
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.communication.send_data.SendDataAPI')
+def test_send_data_reading(mock_api, sample_data):
+    """Test that a Reading is turned into a dictionary once, where it is encoded for the sinks."""
+    send_data(Reading.from_dict(sample_data))
+
+    sent = mock_api.call_args.args[0]
+    assert isinstance(sent, dict)
+    assert sent == sample_data
+
+
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.communication.send_data.SendDataAPI')
+def test_send_data_logs_summary(mock_api, sample_data, caplog):
+    """Test that only a one-line summary of the reading is logged at INFO, the reading itself at DEBUG."""
+    with caplog.at_level(logging.INFO, logger="src.communication.send_data"):
+        send_data(dict(sample_data, timestamp=1700000000))
+
+    messages = [record.getMessage() for record in caplog.records if record.getMessage().startswith("Data processed")]
+    assert messages == ["Data processed: timestamp 1700000000, 1 sinks"]
+
+
+@patch('src.settings.API_ENABLE', False)
+@patch('src.settings.MQTT_ENABLE', True)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
 @patch('src.communication.send_data.SendDataMQTT')
 def test_send_data_mqtt(mock_mqtt, sample_data):
     """Test send_data function with MQTT_ENABLE=True."""
@@ -63,10 +95,10 @@ def test_send_data_mqtt(mock_mqtt, sample_data):
     mock_mqtt_instance.send.assert_called_once()
 
 
-@patch('src.communication.send_data.API_ENABLE', False)
-@patch('src.communication.send_data.MQTT_ENABLE', False)
-@patch('src.communication.send_data.SQS_ENABLE', True)
-@patch('src.communication.send_data.POSTGRES_ENABLE', False)
+@patch('src.settings.API_ENABLE', False)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', True)
+@patch('src.settings.POSTGRES_ENABLE', False)
 @patch('src.communication.send_data.SQSClient')
 def test_send_data_sqs(mock_sqs, sample_data):
     """Test send_data function with SQS_ENABLE=True."""
@@ -83,10 +115,10 @@ def test_send_data_sqs(mock_sqs, sample_data):
     mock_sqs_instance.send.assert_called_once()
 
 
-@patch('src.communication.send_data.API_ENABLE', False)
-@patch('src.communication.send_data.MQTT_ENABLE', False)
-@patch('src.communication.send_data.SQS_ENABLE', False)
-@patch('src.communication.send_data.POSTGRES_ENABLE', True)
+@patch('src.settings.API_ENABLE', False)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', True)
 @patch('src.communication.send_data.SendDataPostgres')
 def test_send_data_postgres(mock_postgres, sample_data):
     """Test send_data function with POSTGRES_ENABLE=True."""
@@ -103,10 +135,10 @@ def test_send_data_postgres(mock_postgres, sample_data):
     mock_postgres_instance.send.assert_called_once()
 
 
-@patch('src.communication.send_data.API_ENABLE', False)
-@patch('src.communication.send_data.MQTT_ENABLE', False)
-@patch('src.communication.send_data.SQS_ENABLE', False)
-@patch('src.communication.send_data.POSTGRES_ENABLE', False)
+@patch('src.settings.API_ENABLE', False)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
 @patch('builtins.print')
 def test_send_data_print(mock_print, sample_data):
     """Test send_data function with all options disabled."""
@@ -114,4 +146,262 @@ def test_send_data_print(mock_print, sample_data):
     send_data(sample_data)
     
     # Check that print was called with the correct data
-    mock_print.assert_called_once_with(sample_data)
\ No newline at end of file
+    mock_print.assert_called_once_with(sample_data)
+
+@pytest.fixture
+def reset_dispatcher():
+    """Reset the sink thread pool after each test."""
+    from src.communication import send_data as send_data_module
+    yield
+    send_data_module.close_send_data()
+
+
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', True)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.SendDataMQTT')
+@patch('src.communication.send_data.SendDataAPI')
+def test_send_data_results(mock_api, mock_mqtt, sample_data, reset_dispatcher):
+    """Test that send_data reports success and latency of every sink."""
+    mock_mqtt.return_value.send.side_effect = Exception("Test error")
+
+    results = send_data(sample_data)
+
+    assert set(results) == {"API", "MQTT"}
+    assert results["API"].success is True
+    assert results["API"].error is None
+    assert results["API"].latency >= 0
+    assert results["MQTT"].success is False
+    assert results["MQTT"].error == "Test error"
+
+
+@patch('src.communication.send_data.SEND_DATA_CONCURRENT', False)
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.SendDataAPI')
+def test_send_data_sequential(mock_api, sample_data):
+    """Test send_data function with the dispatcher disabled."""
+    results = send_data(sample_data)
+
+    mock_api.assert_called_once_with(sample_data)
+    assert results["API"].success is True
+
+
+@patch('src.communication.send_data.SEND_DATA_CONCURRENT', False)
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', True)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.SendDataMQTT')
+@patch('src.communication.send_data.SendDataAPI')
+def test_send_data_single_sink(mock_api, mock_mqtt, sample_data):
+    """Test that send_data only sends to the requested sink."""
+    results = send_data(sample_data, sink="MQTT")
+
+    assert set(results) == {"MQTT"}
+    mock_mqtt.assert_called_once_with(sample_data)
+    mock_api.assert_not_called()
+
+
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', True)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_SEND_INTERVAL', 145)
+def test_sink_intervals():
+    """Test that the push interval of every enabled sink is reported."""
+    intervals = sink_intervals()
+
+    assert set(intervals) == {"API", "Sensor Community"}
+    assert intervals["Sensor Community"] == 145
+
+
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', True)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.settings.API_SEND_TIMEOUT', 0.1)
+@patch('src.communication.send_data.SendDataMQTT')
+@patch('src.communication.send_data.SendDataAPI')
+def test_send_data_timeout(mock_api, mock_mqtt, sample_data, reset_dispatcher):
+    """Test that a hung sink misses its deadline and does not delay the others."""
+    release = threading.Event()
+    mock_api.return_value.send.side_effect = lambda: release.wait(5)
+
+    start = time.monotonic()
+    results = send_data(sample_data)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1
+    assert results["API"].success is False
+    assert results["API"].error == "timeout after 0.1s"
+    assert results["MQTT"].success is True
+
+    # The hung sink is skipped while its previous send is still running
+    results = send_data(sample_data)
+    assert results["API"].error == "previous send still running"
+    assert mock_api.call_count == 1
+    assert mock_mqtt.call_count == 2
+
+    release.set()
+
+
+@patch('src.communication.send_data.OUTBOX_ENABLE', True)
+@patch('src.communication.send_data.OUTBOX_REPLAY_BATCH', 2)
+@patch('src.settings.API_ENABLE', False)
+@patch('src.settings.MQTT_ENABLE', True)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.SendDataMQTT')
+def test_send_data_outbox_replay(mock_mqtt, tmp_path, reset_dispatcher):
+    """Test that readings missed during an outage are replayed once the sink is back."""
+    from src.communication import outbox as outbox_module
+    outbox_module._outbox_instance = outbox_module.Outbox(path=str(tmp_path / "outbox.sqlite3"))
+
+    # First reading goes through
+    send_data({"pm25": 1.0})
+    assert mock_mqtt.call_count == 1
+
+    # Outage: the next two readings fail and stay in the outbox
+    mock_mqtt.return_value.send.side_effect = Exception("Test error")
+    assert send_data({"pm25": 2.0})["MQTT"].success is False
+    assert send_data({"pm25": 3.0})["MQTT"].success is False
+
+    # Reconnect: everything missed is replayed in order
+    mock_mqtt.reset_mock()
+    mock_mqtt.return_value.send.side_effect = None
+    results = send_data({"pm25": 4.0})
+
+    assert results["MQTT"].success is True
+    assert [c.args[0] for c in mock_mqtt.call_args_list] == [
+        {"pm25": 2.0},
+        {"pm25": 3.0},
+        {"pm25": 4.0},
+    ]
+    assert outbox_module._outbox_instance.count("MQTT") == 0
+
+
+@patch('src.communication.send_data.OUTBOX_ENABLE', True)
+@patch('src.settings.API_ENABLE', False)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', True)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.SendDataPostgres')
+def test_send_data_outbox_replay_batch(mock_postgres, tmp_path, reset_dispatcher):
+    """Test that sinks with send_batch replay missed readings in one call."""
+    from src.communication import outbox as outbox_module
+    outbox_module._outbox_instance = outbox_module.Outbox(path=str(tmp_path / "outbox.sqlite3"))
+
+    mock_postgres.send_batch.side_effect = Exception("Test error")
+    send_data({"pm25": 1.0})
+    send_data({"pm25": 2.0})
+
+    mock_postgres.send_batch.reset_mock()
+    mock_postgres.send_batch.side_effect = None
+    send_data({"pm25": 3.0})
+
+    mock_postgres.send_batch.assert_called_once()
+    batch = mock_postgres.send_batch.call_args.args[0]
+    assert isinstance(batch, ReadingBatch)
+    assert batch.view("pm25").tolist() == [1.0, 2.0, 3.0]
+    assert batch.to_dicts() == [{"pm25": 1.0}, {"pm25": 2.0}, {"pm25": 3.0}]
+    mock_postgres.assert_not_called()
+
+
+@patch('src.communication.send_data.OUTBOX_ENABLE', True)
+@patch('src.settings.API_ENABLE', False)
+@patch('src.settings.MQTT_ENABLE', True)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', True)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.SendDataSensorCommunity')
+@patch('src.communication.send_data.SendDataMQTT')
+def test_send_data_rollup(mock_mqtt, mock_sensor_community, tmp_path, reset_dispatcher):
+    """Test that rollup records only reach sinks that store rollups, also when replayed from the outbox."""
+    from src.communication import outbox as outbox_module
+    outbox_module._outbox_instance = outbox_module.Outbox(path=str(tmp_path / "outbox.sqlite3"))
+    rollup = {"timestamp": 1234567800.0, "rollup": "1m", "count": 2, "pm25_mean": 1.5}
+
+    send_data({"pm25": 1.0})
+    results = send_data(rollup)
+    send_data({"pm25": 2.0})
+
+    assert list(results) == ["MQTT"]
+    assert [c.args[0] for c in mock_mqtt.call_args_list] == [{"pm25": 1.0}, rollup, {"pm25": 2.0}]
+    assert [c.args[0] for c in mock_sensor_community.call_args_list] == [{"pm25": 1.0}, {"pm25": 2.0}]
+
+
+@patch('src.settings.API_ENABLE', False)
+@patch('src.settings.MQTT_ENABLE', True)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.timed_import')
+def test_load_enabled_sinks_imports_only_enabled(mock_timed_import):
+    """Test that only the modules of enabled sinks are imported."""
+    from src.communication import send_data as send_data_module
+    with patch.dict(send_data_module.__dict__):
+        send_data_module.__dict__.pop('SendDataMQTT', None)
+        send_data_module.load_enabled_sinks()
+
+    mock_timed_import.assert_called_once_with('src.communication.mqtt')
+
+
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', False)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.timed_import', side_effect=ImportError("No module named 'requests'"))
+def test_send_data_missing_sink_dependency(mock_timed_import, sample_data):
+    """Test that a sink whose dependency is missing is skipped."""
+    from src.communication import send_data as send_data_module
+    with patch.dict(send_data_module.__dict__):
+        send_data_module.__dict__.pop('SendDataAPI', None)
+        results = send_data(sample_data)
+
+    assert results == {}
+
+
+@patch('src.settings.API_ENABLE', True)
+@patch('src.settings.MQTT_ENABLE', True)
+@patch('src.settings.SQS_ENABLE', False)
+@patch('src.settings.POSTGRES_ENABLE', False)
+@patch('src.settings.SENSOR_COMMUNITY_ENABLE', False)
+@patch('src.settings.INFLUXDB_ENABLE', False)
+@patch('src.communication.send_data.SendDataMQTT')
+@patch('src.communication.send_data.SendDataAPI')
+def test_send_data_nowait(mock_api, mock_mqtt, sample_data, reset_dispatcher):
+    """Test that sinks run on the thread pool without the caller waiting for a slow one."""
+    release = threading.Event()
+    mock_api.return_value.send.side_effect = lambda: release.wait(5)
+
+    start = time.monotonic()
+    futures = send_data_nowait(sample_data)
+    assert time.monotonic() - start < 1
+
+    assert futures["MQTT"].result(timeout=5).success is True
+    assert send_data_nowait(sample_data, sink="API") == {}
+
+    release.set()
+    assert futures["API"].result(timeout=5).success is True
@@ -1,3 +1,4 @@
+import json
 import pytest
 import requests
 from unittest.mock import patch, Mock
@@ -49,7 +50,7 @@ def test_send_sensor_community_success(mock_post, sample_data):
     args, kwargs = call_args_list[0]
     assert args[0] == "https://api.sensor.community/v1/push-sensor-data/"
     assert kwargs['headers'] == expected_headers_pm
-    assert kwargs['json'] == expected_json_pm
+    assert json.loads(kwargs['data']) == expected_json_pm
     assert kwargs['timeout'] == 10
 
     # Verify BME call
@@ -71,7 +72,7 @@ def test_send_sensor_community_success(mock_post, sample_data):
     args, kwargs = call_args_list[1]
     assert args[0] == "https://api.sensor.community/v1/push-sensor-data/"
     assert kwargs['headers'] == expected_headers_bme
-    assert kwargs['json'] == expected_json_bme
+    assert json.loads(kwargs['data']) == expected_json_bme
     assert kwargs['timeout'] == 10
 
 @patch('src.communication.sensor_community.requests.post')
@@ -81,7 +82,8 @@ def test_send_sensor_community_failure(mock_post, sample_data):
     
     # Initialize and send
     sender = SendDataSensorCommunity(sample_data)
-    # Should not raise exception as it is caught and logged
-    sender.send()
+    # Both pushes are tried, then the error is raised so the reading is not acknowledged
+    with pytest.raises(requests.exceptions.RequestException):
+        sender.send()
     
     assert mock_post.call_count == 2
@@ -1,10 +1,13 @@
 """
 Tests for the SQSClient class.
 """
+import base64
 from unittest.mock import MagicMock, patch
 
 import pytest
-from src.communication.sqs import SQSClient
+from src.communication.compact import decode_compact
+from src.communication.sqs import SQSClient, reset_sqs_queue
+from src.reading import ReadingBatch
 
 
 @pytest.fixture
@@ -23,6 +26,14 @@ def sample_data():
     }
 
 
+@pytest.fixture(autouse=True)
+def reset_queue():
+    """Reset the cached queue before each test."""
+    reset_sqs_queue()
+    yield
+    reset_sqs_queue()
+
+
 @patch('src.communication.sqs.boto3.resource')
 @patch('src.communication.sqs.SQS_URL', 'https://sqs.example.com')
 @patch('src.communication.sqs.SQS_ACCESS_KEY', 'test_access_key')
@@ -92,6 +103,17 @@ def test_publish_dict(mock_dumps, sample_data):
     mock_queue.send_message.assert_called_once_with(MessageBody='{"key": "value"}')
 
 
+@patch('src.communication.sqs.SQS_PAYLOAD_FORMAT', 'compact')
+def test_publish_compact(sample_data):
+    """Test that the reading is sent in the compact binary format, base64 encoded, when enabled."""
+    mock_queue = MagicMock()
+
+    SQSClient({})._publish(mock_queue, sample_data)
+
+    body = mock_queue.send_message.call_args.kwargs['MessageBody']
+    assert decode_compact(base64.b64decode(body)) == sample_data
+
+
 def test_publish_string():
     """Test the _publish method with a string payload."""
     # Create a mock queue
@@ -120,4 +142,113 @@ def test_send(mock_publish, mock_get_queue, sample_data):
     mock_get_queue.assert_called_once()
     
     # Check that _publish was called with the correct parameters
-    mock_publish.assert_called_once_with(mock_queue, sample_data)
\ No newline at end of file
+    mock_publish.assert_called_once_with(mock_queue, sample_data)
+
+
+@patch.object(SQSClient, '_sqs_client')
+def test_get_queue_cached(mock_sqs_client):
+    """Test that the resource and queue URL are resolved once across sends."""
+    queue = SQSClient({})._get_queue()
+
+    assert SQSClient({})._get_queue() is queue
+    mock_sqs_client.assert_called_once()
+    mock_sqs_client.return_value.get_queue_by_name.assert_called_once()
+
+
+@patch.object(SQSClient, '_sqs_client')
+def test_send_error_resets_queue(mock_sqs_client, sample_data):
+    """Test that a failed send resolves the queue again on the next send."""
+    mock_sqs_client.return_value.get_queue_by_name.return_value.send_message.side_effect = Exception("Test error")
+
+    with pytest.raises(Exception):
+        SQSClient(sample_data).send()
+    with pytest.raises(Exception):
+        SQSClient(sample_data).send()
+
+    assert mock_sqs_client.call_count == 2
+
+
+@patch.object(SQSClient, '_get_queue')
+@patch('src.communication.sqs.SQS_BATCH_SIZE', 10)
+def test_send_batch(mock_get_queue):
+    """Test that readings are grouped into SendMessageBatch calls of at most 10."""
+    mock_queue = MagicMock()
+    mock_queue.send_messages.return_value = {"Successful": [], "Failed": []}
+    mock_get_queue.return_value = mock_queue
+    readings = [{"pm25": float(value)} for value in range(25)]
+
+    SQSClient.send_batch(readings)
+
+    sizes = [len(c.kwargs["Entries"]) for c in mock_queue.send_messages.call_args_list]
+    assert sizes == [10, 10, 5]
+    first_entry = mock_queue.send_messages.call_args_list[0].kwargs["Entries"][0]
+    assert first_entry == {"Id": "0", "MessageBody": '{"pm25": 0.0}'}
+
+
+@patch.object(SQSClient, '_get_queue')
+@patch('src.communication.sqs.SQS_BATCH_RETRIES', 2)
+def test_send_batch_partial_failure_retried(mock_get_queue):
+    """Test that only the failed entries of a batch are sent again."""
+    mock_queue = MagicMock()
+    mock_queue.send_messages.side_effect = [
+        {"Failed": [{"Id": "1", "SenderFault": False, "Message": "Throttled"}]},
+        {"Failed": []},
+    ]
+    mock_get_queue.return_value = mock_queue
+
+    SQSClient.send_batch([{"pm25": 1.0}, {"pm25": 2.0}, {"pm25": 3.0}])
+
+    retry_entries = mock_queue.send_messages.call_args_list[1].kwargs["Entries"]
+    assert retry_entries == [{"Id": "1", "MessageBody": '{"pm25": 2.0}'}]
+
+
+@patch.object(SQSClient, '_get_queue')
+def test_send_batch_sender_fault_raises(mock_get_queue):
+    """Test that entries rejected by the queue are not retried and raise an error."""
+    mock_queue = MagicMock()
+    mock_queue.send_messages.return_value = {
+        "Failed": [{"Id": "0", "SenderFault": True, "Message": "Invalid message"}]
+    }
+    mock_get_queue.return_value = mock_queue
+
+    with pytest.raises(RuntimeError):
+        SQSClient.send_batch([{"pm25": 1.0}])
+
+    mock_queue.send_messages.assert_called_once()
+
+
+@patch('src.communication.sqs.SQSClient._get_queue')
+def test_send_batch_sender_fault_reported_after_retry(mock_get_queue):
+    """Test that a sender fault is still reported when the retried entries of the same batch succeed."""
+    mock_queue = mock_get_queue.return_value
+    mock_queue.send_messages.side_effect = [
+        {"Failed": [
+            {"Id": "0", "SenderFault": True, "Message": "Invalid message"},
+            {"Id": "1", "SenderFault": False, "Message": "Throttled"},
+        ]},
+        {"Failed": []},
+    ]
+
+    with pytest.raises(RuntimeError, match="1 of 2 messages"):
+        SQSClient.send_batch([{"pm25": 1.0}, {"pm25": 2.0}])
+
+    retried = mock_queue.send_messages.call_args_list[1].kwargs["Entries"]
+    assert [entry["Id"] for entry in retried] == ["1"]
+
+
+@patch.object(SQSClient, '_get_queue')
+@patch('src.communication.sqs.SQS_BATCH_SIZE', 10)
+def test_send_batch_reading_batch(mock_get_queue):
+    """Test that a ReadingBatch is split into SendMessageBatch calls and sent with its stored JSON."""
+    mock_queue = mock_get_queue.return_value
+    mock_queue.send_messages.return_value = {"Failed": []}
+    batch = ReadingBatch()
+    for value in range(12):
+        batch.append({"pm25": float(value)}, b'{"pm25": "stored"}' if value == 11 else None)
+
+    SQSClient.send_batch(batch)
+
+    calls = mock_queue.send_messages.call_args_list
+    assert [len(c.kwargs["Entries"]) for c in calls] == [10, 2]
+    assert calls[0].kwargs["Entries"][0]["MessageBody"] == '{"pm25": 0.0}'
+    assert calls[1].kwargs["Entries"][1]["MessageBody"] == '{"pm25": "stored"}'
@@ -0,0 +1,35 @@
+"""
+Tests for the startup module.
+"""
+import logging
+import sys
+
+from src import startup
+
+
+def test_timed_import_records_first_import():
+    """Test that the first import of a module is timed and later ones are not."""
+    sys.modules.pop("colorsys", None)
+    startup.IMPORT_TIMES.pop("colorsys", None)
+
+    module = startup.timed_import("colorsys")
+
+    assert module is sys.modules["colorsys"]
+    assert startup.IMPORT_TIMES["colorsys"] >= 0
+
+    startup.IMPORT_TIMES.pop("colorsys")
+    assert startup.timed_import("colorsys") is module
+    assert "colorsys" not in startup.IMPORT_TIMES
+
+
+def test_log_startup_report(caplog):
+    """Test that the report includes the startup time, memory and import times."""
+    startup.IMPORT_TIMES["fake_backend"] = 0.25
+
+    with caplog.at_level(logging.INFO, logger="src.startup"):
+        startup.log_startup_report()
+
+    startup.IMPORT_TIMES.pop("fake_backend")
+    assert "Startup took" in caplog.text
+    assert "peak RSS" in caplog.text
+    assert "fake_backend 250 ms" in caplog.text
@@ -0,0 +1,200 @@
+"""
+Tests for the on-device time-series store.
+"""
+import os
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+from src.tsdb import HEADER_SIZE, PAGE_SIZE, RECORD, Segment, TimeSeriesStore, store_reading
+
+# 2023-11-14 22:00:00 UTC
+DAY_START = 1699999200.0
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture to provide a sample reading."""
+    return {
+        "timestamp": DAY_START,
+        "sensor_air_quality": "sds011",
+        "pm25": 10.5,
+        "pm10": 25.0,
+        "sensor_temp_hum": "bme280",
+        "temperature_farenheit": 77.0,
+        "temperature_celsius": 25.0,
+        "humidity": 50.0,
+        "pressure": 1013.25,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Fixture to provide a store that only flushes full pages."""
+    store = TimeSeriesStore(path=str(tmp_path), flush_interval=3600, retention_days=0)
+    yield store
+    store.close()
+
+
+def test_append_and_query(store, sample_data):
+    """Test that readings are returned in a time range with missing values as None, before and after a flush."""
+    for second in range(10):
+        store.append({**sample_data, "timestamp": DAY_START + second, "pm25": None if second == 3 else 10.5})
+
+    readings = store.query(DAY_START + 2, DAY_START + 5)
+    assert [reading["timestamp"] for reading in readings] == [DAY_START + 2, DAY_START + 3, DAY_START + 4]
+    assert readings[1]["pm25"] is None
+    assert readings[0]["pressure"] == 1013.25
+    assert "sensor_air_quality" not in readings[0]
+
+    store.flush()
+    assert store.query(DAY_START + 2, DAY_START + 5) == readings
+
+
+def test_page_sized_flushes(store, sample_data):
+    """Test that records are kept in memory until a page is full."""
+    records_per_page = -(-PAGE_SIZE // RECORD.size)
+    with patch.object(Segment, "write", autospec=True, side_effect=Segment.write) as mock_write:
+        for second in range(records_per_page - 1):
+            store.append({**sample_data, "timestamp": DAY_START + second})
+        mock_write.assert_not_called()
+
+        store.append({**sample_data, "timestamp": DAY_START + records_per_page})
+
+    mock_write.assert_called_once()
+    assert len(mock_write.call_args.args[1]) == records_per_page * RECORD.size
+
+
+def test_flush_interval(tmp_path, sample_data):
+    """Test that buffered records are written once the flush interval passed."""
+    now = [0.0]
+    store = TimeSeriesStore(path=str(tmp_path), flush_interval=60, retention_days=0, clock=lambda: now[0])
+    store.append(sample_data)
+    assert store._segment.count == 0
+
+    now[0] = 60.0
+    store.append({**sample_data, "timestamp": DAY_START + 1})
+    assert store._segment.count == 2
+    store.close()
+
+
+def test_out_of_order_readings_dropped(store, sample_data):
+    """Test that readings older than the last stored one are dropped so segments stay sorted."""
+    assert store.append({**sample_data, "timestamp": DAY_START + 10})
+    assert not store.append({**sample_data, "timestamp": DAY_START + 5})
+    assert not store.append({**sample_data, "timestamp": None})
+
+    assert store.dropped == 1
+    assert len(store.query(DAY_START, DAY_START + 100)) == 1
+
+
+def test_readings_ahead_of_clock_dropped(tmp_path, sample_data):
+    """Test that a reading far ahead of the wall clock is dropped instead of blocking the later ones."""
+    store = TimeSeriesStore(path=str(tmp_path), retention_days=0, max_future=300, wall_clock=lambda: DAY_START)
+
+    assert not store.append({**sample_data, "timestamp": DAY_START + 86400 * 365})
+    assert store.append({**sample_data, "timestamp": DAY_START + 60})
+
+    assert store.dropped == 1
+    store.close()
+
+
+def test_realign_after_clock_step_back(tmp_path, sample_data):
+    """Test that readings stored by a clock that was ahead are discarded once it steps back, also after a restart."""
+    future = DAY_START + 86400 * 365
+    store = TimeSeriesStore(path=str(tmp_path), retention_days=0, wall_clock=lambda: future)
+    store.append(sample_data)
+    store.append({**sample_data, "timestamp": DAY_START + 60})
+    store.append({**sample_data, "timestamp": future})
+    store.close()
+
+    store = TimeSeriesStore(path=str(tmp_path), retention_days=0, realign_after=3600)
+    # A small step back is still dropped
+    assert store.append({**sample_data, "timestamp": DAY_START + 30}) is True
+    assert not store.append({**sample_data, "timestamp": DAY_START + 10})
+
+    timestamps = [reading["timestamp"] for reading in store.query(DAY_START, future + 1)]
+    assert timestamps == [DAY_START, DAY_START + 30]
+    assert store.days() == [date(2023, 11, 14)]
+    store.close()
+
+
+def test_empty_segment_file(tmp_path, sample_data):
+    """Test that an empty file left by a crash right after it was created is used as a new segment."""
+    (tmp_path / "2023-11-14.tsdb").write_bytes(b"")
+
+    store = TimeSeriesStore(path=str(tmp_path), retention_days=0)
+    assert store.append(sample_data)
+    store.close()
+
+    assert os.path.getsize(tmp_path / "2023-11-14.tsdb") == HEADER_SIZE + RECORD.size
+
+
+def test_daily_rotation_and_reopen(tmp_path, sample_data):
+    """Test that every UTC day gets its own segment, truncated on rotation and appended to after a restart."""
+    store = TimeSeriesStore(path=str(tmp_path), retention_days=0)
+    store.append(sample_data)
+    store.append({**sample_data, "timestamp": DAY_START + 7200})
+    store.close()
+
+    assert store.days() == [date(2023, 11, 14), date(2023, 11, 15)]
+    assert os.path.getsize(tmp_path / "2023-11-14.tsdb") == HEADER_SIZE + RECORD.size
+
+    store = TimeSeriesStore(path=str(tmp_path), retention_days=0)
+    assert not store.append({**sample_data, "timestamp": DAY_START + 3600})
+    store.append({**sample_data, "timestamp": DAY_START + 7201})
+
+    timestamps = [reading["timestamp"] for reading in store.query(DAY_START - 3600, DAY_START + 86400)]
+    assert timestamps == [DAY_START, DAY_START + 7200, DAY_START + 7201]
+    store.close()
+
+
+def test_retention(tmp_path, sample_data):
+    """Test that segments older than the retention are deleted when the day changes."""
+    store = TimeSeriesStore(path=str(tmp_path), retention_days=2)
+    for day in range(5):
+        store.append({**sample_data, "timestamp": DAY_START + day * 86400})
+    store.close()
+
+    assert store.days() == [date(2023, 11, 16), date(2023, 11, 17), date(2023, 11, 18)]
+
+
+def test_binary_search(tmp_path):
+    """Test that the first record at or after a timestamp is found."""
+    segment = Segment(str(tmp_path / "2023-11-14.tsdb"), date(2023, 11, 14))
+    segment.write(b"".join(RECORD.pack(DAY_START + 2 * index, *[0.0] * 6) for index in range(1000)))
+
+    assert segment.capacity >= 1000
+    assert segment.bisect(DAY_START) == 0
+    assert segment.bisect(DAY_START + 101) == 51
+    assert segment.bisect(DAY_START + 5000) == 1000
+    segment.close()
+
+
+def test_invalid_segment(tmp_path):
+    """Test that a file that is not a segment is rejected."""
+    path = tmp_path / "2023-11-14.tsdb"
+    path.write_bytes(b"\0" * HEADER_SIZE)
+
+    with pytest.raises(ValueError):
+        Segment(str(path), date(2023, 11, 14))
+
+
+@patch('src.tsdb.TSDB_ENABLE', True)
+@patch('src.tsdb.get_tsdb')
+def test_store_reading_errors_are_logged(mock_get_tsdb, sample_data):
+    """Test that a failing store never breaks the main loop."""
+    mock_get_tsdb.return_value.append.side_effect = OSError("No space left on device")
+
+    store_reading(sample_data)
+
+    mock_get_tsdb.return_value.append.assert_called_once_with(sample_data)
+
+
+@patch('src.tsdb.TSDB_ENABLE', False)
+@patch('src.tsdb.get_tsdb')
+def test_store_reading_disabled(mock_get_tsdb, sample_data):
+    """Test that nothing is stored when the store is disabled."""
+    store_reading(sample_data)
+
+    mock_get_tsdb.assert_not_called()
@@ -0,0 +1,125 @@
+"""
+Tests for the SensorWatchdog class.
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from src.sensors.watchdog import SensorWatchdog
+
+
+@pytest.fixture
+def sample_data():
+    """Fixture providing a sensor measurement."""
+    return {"sensor_temp_hum": "bme280", "temperature_celsius": 25.0}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_read(sample_data):
+    """Test that a read runs in the worker and returns the measurement."""
+    sensor = MagicMock()
+    sensor.get_measurement.return_value = sample_data
+    watchdog = SensorWatchdog("BME280", lambda: sensor, timeout=1)
+
+    assert watchdog.get_measurement() == sample_data
+    assert not watchdog.degraded
+    watchdog.close()
+
+
+def test_read_error_is_raised(sample_data):
+    """Test that a sensor error is raised to the caller without degrading the sensor."""
+    sensor = MagicMock()
+    sensor.get_measurement.side_effect = OSError("Remote I/O error")
+    watchdog = SensorWatchdog("BME280", lambda: sensor, timeout=1)
+
+    with pytest.raises(OSError):
+        watchdog.get_measurement()
+    assert not watchdog.degraded
+    watchdog.close()
+
+
+def test_hung_read_degrades_and_reinitializes(sample_data):
+    """Test that a hung read marks the sensor degraded until a new one is created."""
+    release = threading.Event()
+    hung = MagicMock()
+    hung.get_measurement.side_effect = lambda: release.wait(5)
+    healthy = MagicMock()
+    healthy.get_measurement.return_value = sample_data
+    sensors = iter([hung, healthy])
+    watchdog = SensorWatchdog("SDS011", lambda: next(sensors), timeout=0.1, reinit_interval=0.05)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        watchdog.get_measurement()
+    assert time.monotonic() - start < 1
+    assert watchdog.timeouts == 1
+
+    assert wait_for(lambda: not watchdog.degraded)
+    assert watchdog.get_measurement() == sample_data
+    release.set()
+    watchdog.close()
+
+
+def test_reinitialize_closes_old_sensor_first(sample_data):
+    """Test that the old sensor is closed before the new one is created, so they never share a port."""
+    release = threading.Event()
+    events = []
+    hung = MagicMock()
+    hung.get_measurement.side_effect = lambda: release.wait(5)
+    hung.close.side_effect = lambda: events.append("close")
+    healthy = MagicMock()
+    healthy.get_measurement.return_value = sample_data
+    sensors = iter([hung, healthy])
+
+    def factory():
+        events.append("create")
+        return next(sensors)
+
+    watchdog = SensorWatchdog("SDS011", factory, timeout=0.1, reinit_interval=0.05)
+    with pytest.raises(TimeoutError):
+        watchdog.get_measurement()
+
+    assert wait_for(lambda: not watchdog.degraded)
+    assert events == ["create", "close", "create"]
+    release.set()
+    watchdog.close()
+
+
+def test_reinitialize_deadline(sample_data):
+    """Test that a hung initialization is abandoned and retried, and the late sensor is closed."""
+    release = threading.Event()
+    hung = MagicMock()
+    hung.get_measurement.side_effect = lambda: release.wait(5)
+    late = MagicMock()
+    healthy = MagicMock()
+    healthy.get_measurement.return_value = sample_data
+    calls = iter([lambda: hung, lambda: release.wait(5) and late, lambda: healthy])
+    watchdog = SensorWatchdog("BME280", lambda: next(calls)(), timeout=0.1, reinit_interval=0.05, init_timeout=0.1)
+
+    with pytest.raises(TimeoutError):
+        watchdog.get_measurement()
+
+    assert wait_for(lambda: not watchdog.degraded)
+    assert watchdog.sensor is healthy
+    release.set()
+    assert wait_for(lambda: late.close.called)
+    watchdog.close()
+
+
+def test_degraded_read_fails_fast():
+    """Test that reads of a degraded sensor fail without waiting for the deadline."""
+    sensor = MagicMock()
+    watchdog = SensorWatchdog("SDS011", lambda: sensor, timeout=1, reinit_interval=60)
+    watchdog.degraded = True
+
+    with pytest.raises(RuntimeError):
+        watchdog.get_measurement()
+    sensor.get_measurement.assert_not_called()
+    watchdog.close()